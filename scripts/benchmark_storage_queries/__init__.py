@@ -0,0 +1 @@
+"""Benchmark the storage component queries."""
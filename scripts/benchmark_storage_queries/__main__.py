@@ -0,0 +1,195 @@
+"""Benchmark the storage component queries.
+
+Fills a dedicated schema with synthetic files, files_meta and recordings rows and
+records the plans of the queries used by the tier handlers and the HLS API.
+
+Example, 20 cameras with 30 days of recordings:
+    python -m scripts.benchmark_storage_queries --cameras 20 --days 30
+        --url postgresql+psycopg2://viseron@localhost/viseron --output plans.txt
+"""
+import argparse
+import datetime
+import sys
+import time
+
+from sqlalchemy import Engine, create_engine, text
+
+from viseron.components.storage.models import Base, Files, FilesMeta, Recordings
+from viseron.components.storage.queries import (
+    files_to_move_query,
+    recordings_to_move_query,
+    time_period_fragments_query,
+)
+
+SCHEMA = "viseron_benchmark"
+SEGMENT_LENGTH = 5
+RECORDING_INTERVAL = 600
+RECORDING_LENGTH = 60
+SNAPSHOT_INTERVAL = 60
+TABLES = [Files.__table__, FilesMeta.__table__, Recordings.__table__]
+
+
+def create_schema(engine: Engine) -> None:
+    """Create an empty schema containing the tables and their indexes."""
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    Base.metadata.create_all(engine, tables=TABLES)
+
+
+def drop_indexes(engine: Engine) -> None:
+    """Drop all secondary indexes declared in the models."""
+    with engine.begin() as conn:
+        for table in TABLES:
+            for index in table.indexes:
+                if index.name and index.name.startswith("ix_"):
+                    conn.execute(text(f"DROP INDEX {index.name}"))
+
+
+def populate(engine: Engine, cameras: int, days: int, start: datetime.datetime):
+    """Insert segments, snapshots and recordings for each camera."""
+    seconds = days * 86400
+    with engine.begin() as conn:
+        for camera in range(cameras):
+            params = {
+                "camera": f"camera_{camera}",
+                "start": start,
+                "seconds": seconds,
+                "segment_length": SEGMENT_LENGTH,
+                "snapshot_interval": SNAPSHOT_INTERVAL,
+                "recording_interval": RECORDING_INTERVAL,
+                "recording_length": RECORDING_LENGTH,
+            }
+            conn.execute(
+                text(
+                    """--sql
+                INSERT INTO files (tier_id, tier_path, camera_identifier, category,
+                                   subcategory, path, directory, filename, size)
+                SELECT 0, '/segments/', :camera, 'recorder', 'segments',
+                       '/segments/' || :camera || '/' || s || '.m4s',
+                       '/segments/' || :camera, s || '.m4s', 500000
+                  FROM generate_series(0, :seconds, :segment_length) s
+                 UNION ALL
+                SELECT 0, '/snapshots/', :camera, 'snapshots', 'object_detector',
+                       '/snapshots/' || :camera || '/' || s || '.jpg',
+                       '/snapshots/' || :camera, s || '.jpg', 50000
+                  FROM generate_series(0, :seconds, :snapshot_interval) s;
+
+                INSERT INTO files_meta (path, orig_ctime, meta)
+                SELECT '/segments/' || :camera || '/' || s || '.m4s',
+                       :start + make_interval(secs => s),
+                       jsonb_build_object(
+                           'm3u8', jsonb_build_object('EXTINF', :segment_length)
+                       )
+                  FROM generate_series(0, :seconds, :segment_length) s
+                 UNION ALL
+                SELECT '/snapshots/' || :camera || '/' || s || '.jpg',
+                       :start + make_interval(secs => s),
+                       '{}'::jsonb
+                  FROM generate_series(0, :seconds, :snapshot_interval) s;
+
+                INSERT INTO recordings (camera_identifier, start_time, end_time,
+                                        created_at)
+                SELECT :camera,
+                       :start + make_interval(secs => s),
+                       :start + make_interval(secs => s + :recording_length),
+                       :start + make_interval(secs => s)
+                  FROM generate_series(0, :seconds, :recording_interval) s;
+                """
+                ),
+                params,
+            )
+        for table in TABLES:
+            conn.execute(text(f"ANALYZE {table.name}"))
+
+
+def explain(engine: Engine, name: str, stmt) -> str:
+    """Return the plan of a statement."""
+    sql = str(
+        stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    )
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        rows = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {sql}").all()
+        elapsed = time.perf_counter() - started
+    plan = "\n".join(row[0] for row in rows)
+    return f"=== {name} ({elapsed * 1000:.1f} ms)\n{plan}\n"
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument("--url", required=True, help="SQLAlchemy database URL")
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument(
+        "--without-indexes",
+        action="store_true",
+        help="Drop the secondary indexes before recording the plans",
+    )
+    parser.add_argument("--output", help="File to write the plans to")
+    args = parser.parse_args()
+
+    engine = create_engine(
+        args.url, connect_args={"options": f"-csearch_path={SCHEMA}"}
+    )
+    start = datetime.datetime(2024, 1, 1)
+    now = start + datetime.timedelta(days=args.days)
+
+    create_schema(engine)
+    if args.without_indexes:
+        drop_indexes(engine)
+    populate(engine, args.cameras, args.days, start)
+
+    camera = "camera_0"
+    utc_timestamp = now.replace(tzinfo=datetime.timezone.utc).timestamp()
+    queries = {
+        "files_to_move_query": files_to_move_query(
+            "snapshots",
+            "object_detector",
+            0,
+            camera,
+            max_bytes=100 * 1024 * 1024,
+            min_age_timestamp=utc_timestamp - 60,
+            min_bytes=0,
+            max_age_timestamp=utc_timestamp - 86400,
+        ),
+        "recordings_to_move_query": recordings_to_move_query(
+            SEGMENT_LENGTH,
+            0,
+            camera,
+            lookback=5,
+            max_bytes=10 * 1024 * 1024 * 1024,
+            min_age_timestamp=utc_timestamp - 60,
+            min_bytes=0,
+            max_age_timestamp=utc_timestamp - 86400,
+            file_min_age_timestamp=utc_timestamp - SEGMENT_LENGTH * 5,
+        ),
+        "time_period_fragments_query": time_period_fragments_query(
+            camera,
+            int(utc_timestamp - 3600),
+            None,
+            now=now,
+        ),
+    }
+
+    output = (
+        open(args.output, "w", encoding="utf-8")  # pylint: disable=consider-using-with
+        if args.output
+        else sys.stdout
+    )
+    output.write(
+        f"cameras={args.cameras} days={args.days} "
+        f"indexes={not args.without_indexes}\n\n"
+    )
+    for name, stmt in queries.items():
+        output.write(explain(engine, name, stmt))
+    if output is not sys.stdout:
+        output.close()
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
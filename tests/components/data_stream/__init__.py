@@ -0,0 +1 @@
+"""DataStream tests."""
@@ -0,0 +1,191 @@
+"""Tests for the data_stream component."""
+from __future__ import annotations
+
+import threading
+import time
+from queue import Queue
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from viseron.components.data_stream import (
+    LANE_BULK,
+    LANE_EVENTS,
+    LANE_REALTIME,
+    CallbackLane,
+    CallbackWorkerPool,
+    DataStream,
+)
+from viseron.components.data_stream.statistics import MAX_TOPICS, DataStreamStatistics
+
+
+def test_callback_lane_order_and_drops() -> None:
+    """Test that a lane delivers in order and drops the oldest items when full."""
+    received: list[int] = []
+    lane = CallbackLane(received.append, maxlen=3)
+
+    assert lane.push(1) is True
+    for i in range(2, 6):
+        assert lane.push(i) is False
+    lane.drain()
+
+    assert received == [3, 4, 5]
+    assert lane.dropped == 2
+    assert lane.scheduled is False
+
+
+def test_callback_lane_on_delivered() -> None:
+    """Test that on_delivered is called right before the callback."""
+    calls: list[tuple] = []
+    lane = CallbackLane(
+        lambda data: calls.append(("callback", data)),
+        maxlen=3,
+        on_delivered=lambda lane, published_at: calls.append(
+            ("delivered", lane, published_at)
+        ),
+    )
+
+    lane.push(1, LANE_REALTIME, 10.0)
+    lane.drain()
+
+    assert calls == [("delivered", LANE_REALTIME, 10.0), ("callback", 1)]
+
+
+def test_statistics_topics_evicted() -> None:
+    """Test that the topic not published to for the longest time is evicted."""
+    statistics = DataStreamStatistics([LANE_REALTIME])
+    for i in range(MAX_TOPICS):
+        statistics.published(f"test/{i}", 0.0)
+    statistics.published("test/0", 1.0)
+    statistics.published("test/new", 1.0)
+
+    assert len(statistics.topics) == MAX_TOPICS
+    assert "test/0" in statistics.topics
+    assert "test/1" not in statistics.topics
+    assert "test/new" in statistics.topics
+
+
+def test_executor_dispatch() -> None:
+    """Test that callbacks are run on the worker pool in publish order."""
+    data_stream = DataStream(MagicMock())
+    received: list[int] = []
+    done = threading.Event()
+
+    def callback(data: int) -> None:
+        # Shutdown joins all non-daemon threads, callback workers must not block it
+        assert threading.current_thread().daemon
+        received.append(data)
+        if data == 100:
+            done.set()
+
+    unique_id = data_stream.subscribe_data("test/executor", callback)
+    for i in range(1, 101):
+        data_stream.publish_data("test/executor", i)
+
+    assert done.wait(5)
+    assert received == list(range(1, 101))
+    assert DataStream.dropped_callback_data() == {}
+
+    data_stream.unsubscribe_data("test/executor", unique_id)
+    assert not data_stream.has_subscribers("test/executor")
+
+
+def test_signal_worker_pool() -> None:
+    """Test that blocking signal handlers run on their own worker pool."""
+    data_stream = DataStream(MagicMock())
+    barrier = threading.Barrier(3, timeout=5)
+    thread_names: list[str] = []
+
+    def callback() -> None:
+        thread_names.append(threading.current_thread().name)
+        barrier.wait()
+
+    unique_ids = [
+        data_stream.subscribe_data("viseron/signal/test", callback) for _ in range(2)
+    ]
+    # Only one callback worker, the handlers deadlock if they are queued on it
+    with patch.object(data_stream, "_worker_pool", CallbackWorkerPool(1)):
+        data_stream.publish_data("viseron/signal/test")
+        barrier.wait()
+
+    assert all(name.startswith("data_stream_signal") for name in thread_names)
+    for unique_id in unique_ids:
+        data_stream.unsubscribe_data("viseron/signal/test", unique_id)
+
+
+def test_wildcard_matches_cache() -> None:
+    """Test that wildcard matches are cached and invalidated on (un)subscribe."""
+    topic = "test/camera_one/wildcard"
+    assert DataStream.wildcard_matches(topic) == ()
+
+    unique_id = DataStream.subscribe_data("test/*/wildcard", MagicMock())
+    assert DataStream.wildcard_matches(topic) == ("test/*/wildcard",)
+    # Cached matches are returned without matching the patterns again
+    with patch("viseron.components.data_stream.fnmatch.fnmatch") as mock_fnmatch:
+        assert DataStream.wildcard_matches(topic) == ("test/*/wildcard",)
+        assert DataStream.has_subscribers(topic)
+    mock_fnmatch.assert_not_called()
+
+    DataStream.unsubscribe_data("test/*/wildcard", unique_id)
+    assert DataStream.wildcard_matches(topic) == ()
+    assert not DataStream.has_subscribers(topic)
+
+
+@pytest.mark.parametrize(
+    "data_topic, lane, expected_lane",
+    [
+        ("camera_one/camera/frame_bytes", None, LANE_REALTIME),
+        ("object_detector/camera_one/scan", None, LANE_REALTIME),
+        ("event/state_changed", None, LANE_EVENTS),
+        ("viseron/signal/shutdown", None, LANE_EVENTS),
+        ("camera_one/nvr/processed_frame", LANE_BULK, LANE_BULK),
+    ],
+)
+def test_publish_data_lanes(data_topic, lane, expected_lane) -> None:
+    """Test that data is published to the correct lane."""
+    data_stream = DataStream(MagicMock())
+    data_queues = data_stream._data_queues  # pylint: disable=protected-access
+    with patch("viseron.components.data_stream.helpers.pop_if_full") as pop_if_full:
+        data_stream.publish_data(data_topic, "data", lane=lane)
+    assert pop_if_full.call_args[0][0] is data_queues[expected_lane]
+
+
+def test_publish_data_on_drop() -> None:
+    """Test that data dropped from a full lane is passed to on_drop."""
+    data_stream = DataStream(MagicMock())
+    lane_queue: Queue = Queue(maxsize=1)
+    dropped: list[int] = []
+    with patch.dict(
+        data_stream._data_queues,  # pylint: disable=protected-access
+        {LANE_REALTIME: lane_queue},
+    ):
+        data_stream.publish_data("test/on_drop", 1, on_drop=dropped.append)
+        data_stream.publish_data("test/on_drop", 2, on_drop=dropped.append)
+    assert dropped == [1]
+    assert lane_queue.get()["data"] == 2
+
+
+def test_statistics() -> None:
+    """Test that drops and delivery latency are counted."""
+    data_stream = DataStream(MagicMock())
+    subscriber_queue: Queue = Queue(maxsize=1)
+    unique_id = data_stream.subscribe_data("test/statistics", subscriber_queue)
+    for i in range(1, 4):
+        data_stream.publish_data("test/statistics", i)
+
+    for _ in range(50):
+        if subscriber_queue.queue and subscriber_queue.queue[0] == 3:
+            break
+        time.sleep(0.01)
+
+    statistics = data_stream.statistics()
+    assert statistics["topics"]["test/statistics"]["published"] == 3
+    assert statistics["lanes"][LANE_REALTIME]["latency"]["count"] == 3
+    subscriber = next(
+        subscriber
+        for subscriber in statistics["subscribers"]
+        if subscriber["unique_id"] == str(unique_id)
+    )
+    assert subscriber["depth"] == 1
+    assert subscriber["dropped"] == 2
+    data_stream.unsubscribe_data("test/statistics", unique_id)
@@ -1,6 +1,7 @@
 """FFmpeg stream tests."""
 from __future__ import annotations
 
+import io
 from contextlib import nullcontext
 from typing import Any
 from unittest.mock import MagicMock, patch
@@ -42,6 +43,7 @@ from viseron.const import (
     ENV_RASPBERRYPI3,
     ENV_RASPBERRYPI4,
 )
+from viseron.domains.camera.shared_frames import SharedFrames
 from viseron.exceptions import StreamInformationError
 
 from tests.common import MockCamera
@@ -206,6 +208,37 @@ class TestStream:
                 stream.get_audio_codec(config, stream_audio_codec) == expected_audio_cmd
             )
 
+    def test_read(self) -> None:
+        """Test that frames are read and a short read returns its buffer."""
+        mocked_camera = MockCamera(identifier="test_camera_identifier")
+        mocked_camera.shared_frames = SharedFrames()
+        with patch.object(
+            Stream, "__init__", MagicMock(spec=Stream, return_value=None)
+        ):
+            stream = Stream(CONFIG, mocked_camera, "test_camera_identifier")
+        # pylint: disable=protected-access
+        stream._logger = MagicMock()
+        stream._camera = mocked_camera
+        stream._camera_identifier = "test_camera_identifier"
+        stream._color_plane_width = 2
+        stream._color_plane_height = 3
+        stream._pixel_format = "gray"
+        stream._frame_bytes_size = 6
+        stream._substream = None
+        stream._mainstream = MagicMock(width=2, height=3)
+        stream._pipe = MagicMock(stdout=io.BufferedReader(io.BytesIO(b"012345678")))
+        # pylint: enable=protected-access
+
+        shared_frame = stream.read()
+        assert shared_frame is not None
+        decoded_frame = mocked_camera.shared_frames.get_decoded_frame(shared_frame)
+        assert decoded_frame.tobytes() == b"012345"
+        assert mocked_camera.shared_frames.acquired_slots() == 1
+
+        # Only 3 of 6 bytes are left before EOF
+        assert stream.read() is None
+        assert mocked_camera.shared_frames.acquired_slots() == 1
+
     def test_get_stream_url(self) -> None:
         """Test that the correct stream url is returned."""
         mocked_camera = MockCamera(identifier="test_camera_identifier")
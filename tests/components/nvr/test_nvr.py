@@ -0,0 +1,73 @@
+"""Tests for the NVR."""
+from __future__ import annotations
+
+import time
+from unittest.mock import MagicMock, patch
+
+from viseron import Viseron
+from viseron.components.data_stream import (
+    COMPONENT as DATA_STREAM_COMPONENT,
+    DataStream,
+)
+from viseron.components.nvr.nvr import NVR
+from viseron.components.nvr.sensor import OperationStateSensor
+from viseron.domains.camera.shared_frames import (
+    PIXEL_FORMAT_YUV420P,
+    SharedFrame,
+    SharedFrames,
+)
+from viseron.states import States
+
+
+def test_frame_queue_overflow(vis: Viseron) -> None:
+    """Test that frames dropped from a full frame queue return their buffer."""
+    shared_frames = SharedFrames()
+    camera = MagicMock(
+        identifier="test",
+        output_fps=5,
+        shared_frames=shared_frames,
+        frame_bytes_topic="test/camera/frame_bytes",
+    )
+    data_stream = DataStream(vis)
+    vis.data[DATA_STREAM_COMPONENT] = data_stream
+
+    # Frames are never consumed, so the frame queue overflows
+    with patch.object(vis, "get_registered_domain", return_value=camera), patch.object(
+        vis, "add_entity"
+    ), patch.object(NVR, "run"):
+        nvr = NVR(vis, {}, "test", False, False)
+    frame_queue = nvr._frame_queue  # pylint: disable=protected-access
+    assert frame_queue.maxsize == shared_frames.frame_queue_size == 10
+
+    for _ in range(500):
+        shared_frame = SharedFrame(4, 6, PIXEL_FORMAT_YUV420P, (4, 4), "test")
+        shared_frames.create(shared_frame, bytes(24))
+        data_stream.publish_data(
+            camera.frame_bytes_topic, shared_frame, on_drop=shared_frames.remove
+        )
+
+    for _ in range(100):
+        if shared_frames.acquired_slots() == frame_queue.maxsize:
+            break
+        time.sleep(0.01)
+    # Only the frames waiting in the queue are referenced
+    assert shared_frames.acquired_slots() == frame_queue.maxsize
+    shared_frames.close()
+
+
+def test_operation_state_sensor_volatile() -> None:
+    """Test that operation state changes are not stored."""
+    vis = MagicMock()
+    nvr = MagicMock()
+    nvr.camera.identifier = "test"
+    nvr.camera.name = "Test"
+    sensor = OperationStateSensor(vis, nvr)
+    sensor.entity_id = "sensor.test_operation_state"
+    states = States(vis)
+
+    for operation_state in ("idle", "scanning_for_objects", "idle"):
+        sensor._state = operation_state  # pylint: disable=protected-access
+        states.set_state(sensor)
+    assert [call.kwargs["store"] for call in vis.dispatch_event.call_args_list] == [
+        False
+    ] * 3
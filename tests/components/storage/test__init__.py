@@ -9,6 +9,7 @@ from typing import TYPE_CHECKING
 from unittest.mock import MagicMock, Mock
 
 import pytest
+from watchdog.events import FileCreatedEvent, FileDeletedEvent
 
 from viseron.components.storage import Storage, _get_tier_config
 from viseron.components.storage.const import (
@@ -158,3 +159,35 @@ class TestStorage:
                 "test_subcategory",
                 os.path.join(tier1, "test_path"),
             ) == os.path.join(tier2, "test_path")
+
+    def test_register_file(self) -> None:
+        """Test that registered files are passed to the monitoring tier handler."""
+        tier_handler1 = Mock()
+        tier_handler2 = Mock()
+        self._storage._tier_handlers_by_path = {
+            "/tier1/recorder/segments/test_camera": tier_handler1,
+            "/tier2/recorder/segments/test_camera": tier_handler2,
+        }
+
+        self._storage.register_file_created(
+            "/tier1/recorder/segments/test_camera/1.m4s"
+        )
+        event = tier_handler1.on_any_event.call_args.args[0]
+        assert isinstance(event, FileCreatedEvent)
+        assert event.src_path == "/tier1/recorder/segments/test_camera/1.m4s"
+
+        self._storage.register_file_moved(
+            "/tier1/recorder/segments/test_camera/1.m4s",
+            "/tier2/recorder/segments/test_camera/1.m4s",
+        )
+        assert isinstance(
+            tier_handler1.on_any_event.call_args.args[0], FileDeletedEvent
+        )
+        assert isinstance(
+            tier_handler2.on_any_event.call_args.args[0], FileCreatedEvent
+        )
+
+        # Files outside of the tiers are ignored
+        self._storage.register_file_deleted("/tmp/1.m4s")
+        assert tier_handler1.on_any_event.call_count == 2
+        assert tier_handler2.on_any_event.call_count == 1
@@ -0,0 +1,187 @@
+"""Test the fragment index."""
+from __future__ import annotations
+
+import datetime
+from unittest.mock import Mock, patch
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from viseron.components.storage.fragment_index import FragmentIndex
+from viseron.components.storage.models import Files, FilesMeta
+from viseron.helpers import utcnow
+
+NOW = datetime.datetime(2024, 1, 1, 12, 0, 0, tzinfo=datetime.timezone.utc)
+
+
+def _loaded_index() -> FragmentIndex:
+    """Return an index that has been loaded from an empty database."""
+    fragment_index = FragmentIndex("test")
+    with patch(
+        "viseron.components.storage.fragment_index.get_time_period_fragments",
+        return_value=[],
+    ), patch("viseron.components.storage.fragment_index.utcnow", return_value=NOW):
+        fragment_index.fragments(Mock(), int(NOW.timestamp()))
+    return fragment_index
+
+
+def _timestamp(seconds: int) -> int:
+    """Return the timestamp seconds after NOW."""
+    return int(NOW.timestamp()) + seconds
+
+
+def test_fragments() -> None:
+    """Test that fragments overlapping the time period are returned in order."""
+    fragment_index = _loaded_index()
+    for seconds in (10, 0, 5, 20):
+        fragment_index.add(
+            f"/tier1/{_timestamp(seconds)}.m4s",
+            5,
+            NOW + datetime.timedelta(seconds=seconds),
+        )
+    fragment_index.add(f"/tier1/{_timestamp(30)}.m4s", 0, NOW)
+
+    with patch("viseron.components.storage.fragment_index.utcnow", return_value=NOW):
+        fragments = fragment_index.fragments(Mock(), _timestamp(3), _timestamp(10))
+    assert [fragment.filename for fragment in fragments] == [
+        f"{_timestamp(0)}.m4s",
+        f"{_timestamp(5)}.m4s",
+        f"{_timestamp(10)}.m4s",
+    ]
+    assert len(fragment_index) == 4
+
+
+def test_move_and_remove() -> None:
+    """Test that moved fragments keep their position and removed ones disappear."""
+    fragment_index = _loaded_index()
+    tier1 = f"/tier1/{_timestamp(0)}.m4s"
+    tier2 = f"/tier2/{_timestamp(0)}.m4s"
+    fragment_index.add(tier1, 5, NOW)
+
+    fragment_index.move(tier1, tier2)
+    # The deletion of the old path is reported after the move
+    fragment_index.remove([tier1])
+    with patch("viseron.components.storage.fragment_index.utcnow", return_value=NOW):
+        fragments = fragment_index.fragments(Mock(), _timestamp(0))
+    assert [fragment.path for fragment in fragments] == [tier2]
+
+    fragment_index.remove([tier2])
+    assert len(fragment_index) == 0
+
+
+def test_fragments_database(
+    get_db_session: sessionmaker[Session],
+) -> None:
+    """Test that the index is loaded from the database and used as a fallback."""
+    now = utcnow()
+    with get_db_session() as session:
+        for seconds in (-2 * 86400, -10, -5):
+            orig_ctime = now + datetime.timedelta(seconds=seconds)
+            path = f"/tier1/{int(orig_ctime.timestamp())}.m4s"
+            session.execute(
+                insert(Files).values(
+                    tier_id=0,
+                    tier_path="/tier1/",
+                    camera_identifier="test",
+                    category="recorder",
+                    subcategory="segments",
+                    path=path,
+                    directory="/tier1",
+                    filename=path.split("/")[-1],
+                    size=10,
+                )
+            )
+            session.execute(
+                insert(FilesMeta).values(
+                    path=path, orig_ctime=orig_ctime, meta={"m3u8": {"EXTINF": 5}}
+                )
+            )
+        session.commit()
+
+    fragment_index = FragmentIndex("test")
+    get_session = Mock(side_effect=get_db_session)
+    fragments = fragment_index.fragments(get_session, int(now.timestamp()) - 60)
+    assert len(fragments) == 2
+    assert len(fragment_index) == 2
+
+    # Served from memory once loaded
+    get_session.reset_mock()
+    assert len(fragment_index.fragments(get_session, int(now.timestamp()) - 60)) == 2
+    get_session.assert_not_called()
+
+    # Older than the index, queried from the database
+    fragments = fragment_index.fragments(get_session, int(now.timestamp()) - 3 * 86400)
+    assert len(fragments) == 3
+    get_session.assert_called_once()
+
+
+def test_coverage_timespans(get_db_session: sessionmaker[Session]) -> None:
+    """Test that timespans are loaded per day and updated incrementally."""
+    midnight = (int(utcnow().timestamp()) // 86400 - 2) * 86400
+    with get_db_session() as session:
+        # Spans midnight, followed by a gap
+        for timestamp in (-10, -5, 0, 5, 100, 105):
+            orig_ctime = datetime.datetime.fromtimestamp(
+                midnight + timestamp, datetime.timezone.utc
+            )
+            path = f"/tier1/{midnight + timestamp}.m4s"
+            session.execute(
+                insert(Files).values(
+                    tier_id=0,
+                    tier_path="/tier1/",
+                    camera_identifier="test",
+                    category="recorder",
+                    subcategory="segments",
+                    path=path,
+                    directory="/tier1",
+                    filename=path.split("/")[-1],
+                    size=10,
+                )
+            )
+            session.execute(
+                insert(FilesMeta).values(
+                    path=path, orig_ctime=orig_ctime, meta={"m3u8": {"EXTINF": 5}}
+                )
+            )
+        session.commit()
+
+    fragment_index = FragmentIndex("test")
+    get_session = Mock(side_effect=get_db_session)
+    assert fragment_index.coverage.timespans(get_session, midnight - 3600) == [
+        {"start": midnight - 10, "end": midnight + 10, "duration": 20},
+        {"start": midnight + 100, "end": midnight + 110, "duration": 10},
+    ]
+    # Clipped to the requested time period
+    assert fragment_index.coverage.timespans(get_session, midnight, midnight + 102) == [
+        {"start": midnight, "end": midnight + 10, "duration": 10},
+        {"start": midnight + 100, "end": midnight + 102, "duration": 2},
+    ]
+
+    # Closing the gap joins the timespans without querying the database
+    get_session.reset_mock()
+    for timestamp in range(10, 100, 5):
+        fragment_index.add(
+            f"/tier1/{midnight + timestamp}.m4s",
+            5,
+            datetime.datetime.fromtimestamp(
+                midnight + timestamp, datetime.timezone.utc
+            ),
+        )
+    assert fragment_index.coverage.timespans(get_session, midnight - 3600) == [
+        {"start": midnight - 10, "end": midnight + 110, "duration": 120},
+    ]
+    get_session.assert_not_called()
+
+    # Deleted fragments cause their day to be reloaded from the database, which
+    # does not have the fragments that were only added to the index
+    with get_db_session() as session:
+        session.execute(
+            delete(Files).where(Files.path == f"/tier1/{midnight + 105}.m4s")
+        )
+        session.commit()
+    fragment_index.remove([f"/tier1/{midnight + 105}.m4s"])
+    assert fragment_index.coverage.timespans(get_session, midnight - 3600) == [
+        {"start": midnight - 10, "end": midnight + 10, "duration": 20},
+        {"start": midnight + 100, "end": midnight + 105, "duration": 5},
+    ]
+    get_session.assert_called_once()
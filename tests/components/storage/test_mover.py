@@ -0,0 +1,109 @@
+"""Test the file mover."""
+from __future__ import annotations
+
+import errno
+import os
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from viseron.components.storage.mover import (
+    METHOD_COPY,
+    METHOD_LINK,
+    FileMover,
+    copy_file,
+    transfer_file,
+)
+from viseron.components.storage.sensor import FileMoverSensor
+
+
+def _create_file(path: Path, content: bytes = b"segment") -> str:
+    """Create a file and return its path."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_transfer_file_link(tmp_path: Path) -> None:
+    """Test that files on the same filesystem are linked."""
+    src = _create_file(tmp_path / "tier1" / "1.m4s")
+    dst = str(tmp_path / "tier2" / "1.m4s")
+
+    result = transfer_file(src, dst)
+    assert result.method == METHOD_LINK
+    assert result.size == len(b"segment")
+    assert not os.path.exists(src)
+    assert Path(dst).read_bytes() == b"segment"
+
+
+def test_transfer_file_replaces_dst(tmp_path: Path) -> None:
+    """Test that a file left behind by a failed move is replaced."""
+    src = _create_file(tmp_path / "tier1" / "1.m4s")
+    dst = _create_file(tmp_path / "tier2" / "1.m4s", b"partial")
+
+    assert transfer_file(src, dst).method == METHOD_LINK
+    assert Path(dst).read_bytes() == b"segment"
+
+
+def test_transfer_file_copy(tmp_path: Path) -> None:
+    """Test that files are copied when they cannot be linked."""
+    src = _create_file(tmp_path / "tier1" / "1.m4s")
+    dst = str(tmp_path / "tier2" / "1.m4s")
+
+    with patch("os.link", side_effect=OSError(errno.EXDEV, "cross-device link")):
+        result = transfer_file(src, dst)
+    assert result.method == METHOD_COPY
+    assert not os.path.exists(src)
+    assert Path(dst).read_bytes() == b"segment"
+
+
+def test_transfer_file_missing(tmp_path: Path) -> None:
+    """Test that a missing source raises FileNotFoundError."""
+    with pytest.raises(FileNotFoundError):
+        transfer_file(str(tmp_path / "missing"), str(tmp_path / "tier2" / "missing"))
+
+
+def test_copy_file_fallback(tmp_path: Path) -> None:
+    """Test that shutil.copy is used if copy_file_range is not supported."""
+    src = _create_file(tmp_path / "src", b"x" * 1024)
+    dst = str(tmp_path / "dst")
+
+    with patch(
+        "viseron.components.storage.mover._copy_file_range",
+        side_effect=OSError(errno.EXDEV, "cross-device link"),
+    ):
+        copy_file(src, dst)
+    assert Path(dst).read_bytes() == b"x" * 1024
+
+
+def test_file_mover(tmp_path: Path) -> None:
+    """Test that submitted functions run and transfers are recorded per tier."""
+    file_mover = FileMover(workers=2)
+    try:
+        futures = [
+            file_mover.submit(
+                transfer_file,
+                _create_file(tmp_path / "tier1" / f"{i}.m4s"),
+                str(tmp_path / "tier2" / f"{i}.m4s"),
+            )
+            for i in range(4)
+        ]
+        for future in futures:
+            file_mover.record(str(tmp_path / "tier2"), future.result())
+
+        failed = file_mover.submit(transfer_file, "/missing", "/missing")
+        with pytest.raises(FileNotFoundError):
+            failed.result()
+    finally:
+        file_mover.stop()
+
+    statistics = file_mover.statistics()[str(tmp_path / "tier2")]
+    assert statistics["files"] == 4
+    assert statistics["bytes"] == 4 * len(b"segment")
+    assert statistics["linked"] == 4
+    assert statistics["copied"] == 0
+
+    sensor = FileMoverSensor(MagicMock(), file_mover)
+    assert sensor.state == 4
+    assert sensor.extra_attributes == {"tiers": file_mover.statistics()}
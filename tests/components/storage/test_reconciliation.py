@@ -0,0 +1,143 @@
+"""Test the files reconciliation."""
+from __future__ import annotations
+
+import datetime
+import os
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import Mock
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from viseron.components.storage.models import Files, FilesMeta
+from viseron.components.storage.reconciliation import reconcile_files, scan_directories
+from viseron.components.storage.triggers import setup_triggers
+
+
+def _write(path: Path, size: int) -> str:
+    """Write a file of size bytes and return its path."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"0" * size)
+    return str(path)
+
+
+def _tier_handler(path: str, tier_path: str) -> Mock:
+    """Return a mocked tier handler."""
+    return Mock(
+        path=path,
+        tier_id=0,
+        tier={"path": tier_path},
+        category="recorder",
+        subcategory="segments",
+        is_ignored=lambda path: os.path.basename(path) == "init.mp4",
+    )
+
+
+def _file(path: str, size: int, tier_path: str) -> dict:
+    """Return a Files row."""
+    return {
+        "tier_id": 0,
+        "tier_path": tier_path,
+        "camera_identifier": "test",
+        "category": "recorder",
+        "subcategory": "segments",
+        "path": path,
+        "directory": os.path.dirname(path),
+        "filename": os.path.basename(path),
+        "size": size,
+    }
+
+
+def test_scan_directories(tmp_path: Path) -> None:
+    """Test that all files below the roots are found."""
+    _write(tmp_path / "a" / "1.m4s", 1)
+    _write(tmp_path / "a" / "sub" / "2.m4s", 2)
+    _write(tmp_path / "b" / "3.m4s", 3)
+
+    result = scan_directories(
+        [str(tmp_path / "a"), str(tmp_path / "b"), str(tmp_path / "missing")],
+        workers=2,
+    )
+    assert sorted((path, size) for path, size, _ in result[0]) == [
+        (str(tmp_path / "a" / "1.m4s"), 1),
+        (str(tmp_path / "a" / "sub" / "2.m4s"), 2),
+    ]
+    assert [(path, size) for path, size, _ in result[1]] == [
+        (str(tmp_path / "b" / "3.m4s"), 3)
+    ]
+    assert result[2] == []
+
+
+def test_reconcile_files(get_db_session: Callable[[], Session], tmp_path: Path) -> None:
+    """Test that the files table is made to match the tier directory."""
+    tier_path = f"{tmp_path}/"
+    segments = tmp_path / "recorder" / "segments" / "test"
+    unchanged = _write(segments / "1.m4s", 10)
+    resized = _write(segments / "2.m4s", 20)
+    untracked = _write(segments / "3.m4s", 30)
+    untracked_with_meta = _write(segments / "7.m4s", 70)
+    _write(segments / "init.mp4", 5)
+    stale = str(segments / "4.m4s")
+    recent = str(segments / "5.m4s")
+    other_tier = "/other/recorder/segments/test/6.m4s"
+
+    orig_ctime = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+    with get_db_session() as session:
+        setup_triggers(session.get_bind())
+        session.execute(
+            insert(FilesMeta).values(
+                path=untracked_with_meta,
+                orig_ctime=orig_ctime,
+                meta={"m3u8": {"EXTINF": 2.0}},
+            )
+        )
+        session.execute(
+            insert(Files),
+            [
+                _file(unchanged, 10, tier_path),
+                _file(resized, 5, tier_path),
+                _file(stale, 40, tier_path),
+                _file(other_tier, 60, "/other/"),
+            ],
+        )
+        # Created after the scan started, its file might not have been scanned
+        session.execute(
+            insert(Files).values(
+                **_file(recent, 50, tier_path),
+                created_at=datetime.datetime.now(datetime.timezone.utc)
+                + datetime.timedelta(hours=1),
+            )
+        )
+        session.commit()
+
+    fragment_index = Mock()
+    reconcile_files(
+        get_db_session,
+        "test",
+        [_tier_handler(str(segments), tier_path)],
+        fragment_index,
+    )
+    fragment_index.remove.assert_called_once_with([stale])
+    fragment_index.add.assert_called_once_with(untracked_with_meta, 2.0, orig_ctime)
+
+    with get_db_session() as session:
+        assert session.execute(
+            select(Files.path, Files.size).order_by(Files.path)
+        ).all() == [
+            (other_tier, 60),
+            (unchanged, 10),
+            (resized, 20),
+            (untracked, 30),
+            (recent, 50),
+            (untracked_with_meta, 70),
+        ]
+        assert set(session.execute(select(FilesMeta.path)).scalars()) == {
+            other_tier,
+            unchanged,
+            resized,
+            untracked,
+            recent,
+            untracked_with_meta,
+        }
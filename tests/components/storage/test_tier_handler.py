@@ -1,10 +1,15 @@
 """Test the TierHandler class."""
 
+import datetime
+import os
+from collections.abc import Callable, Generator
 from dataclasses import dataclass
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from watchdog.events import FileCreatedEvent, FileDeletedEvent, FileModifiedEvent
 
 from viseron import Viseron
 from viseron.components.storage import Storage
@@ -12,19 +17,54 @@ from viseron.components.storage.const import (
     COMPONENT as STORAGE_COMPONENT,
     CONFIG_RECORDER,
 )
-from viseron.components.storage.models import Recordings
+from viseron.components.storage.models import (
+    Files,
+    FilesMeta,
+    FilesTierStats,
+    Recordings,
+)
+from viseron.components.storage.mover import FileMover
 from viseron.components.storage.tier_handler import (
+    FileEventBatch,
     RecordingsTierHandler,
     SegmentsTierHandler,
     ThumbnailTierHandler,
+    delete_files,
     find_next_tier_segments,
+    get_files_to_move,
     handle_file,
+    tier_threshold_reached,
 )
+from viseron.components.storage.triggers import setup_triggers
+from viseron.components.storage.util import RequestedFilesCount
 from viseron.domains.camera.const import CONFIG_LOOKBACK
 
 from tests.common import BaseTestWithRecordings
 
 
+def test_file_event_batch() -> None:
+    """Test that events are collapsed per path."""
+    batch = FileEventBatch()
+    batch.add(FileCreatedEvent("/created"))
+    batch.add(FileModifiedEvent("/created"))
+    batch.add(FileCreatedEvent("/created_deleted"))
+    batch.add(FileDeletedEvent("/created_deleted"))
+    batch.add(FileDeletedEvent("/recreated"))
+    batch.add(FileCreatedEvent("/recreated"))
+    batch.add(FileModifiedEvent("/modified"))
+
+    assert batch.take() == (
+        ["/created", "/recreated"],
+        ["/created_deleted", "/recreated"],
+        [],
+    )
+    assert batch
+    assert 0 < batch.timeout() <= 1
+    assert batch.take(force=True) == ([], [], ["/modified"])
+    assert not batch
+    assert batch.timeout() is None
+
+
 @patch("viseron.components.storage.tier_handler.delete_file")
 def test_handle_file_delete(
     mock_delete_file: Mock,
@@ -116,6 +156,19 @@ def _get_tier_config(events: bool, continuous: bool):
     }
 
 
+@pytest.fixture(name="file_mover")
+def fixture_file_mover(vis: Viseron) -> Generator[FileMover, None, None]:
+    """Add a FileMover and requested files count to the mocked Storage."""
+    file_mover = FileMover(workers=1)
+    vis.data[STORAGE_COMPONENT].file_mover = file_mover
+    vis.data[STORAGE_COMPONENT].camera_requested_files_count = {
+        "test": RequestedFilesCount()
+    }
+    yield file_mover
+    file_mover.stop()
+
+
+@pytest.mark.usefixtures("file_mover")
 class TestSegmentsTierHandler(BaseTestWithRecordings):
     """Test the SegmentsTierHandler class."""
 
@@ -162,7 +215,7 @@ class TestSegmentsTierHandler(BaseTestWithRecordings):
         ) as mock_get_files_to_move, patch(
             "viseron.components.storage.tier_handler.files_to_move_overlap"
         ) as mock_files_to_move_overlap, patch(
-            "viseron.components.storage.tier_handler.handle_file"
+            "viseron.components.storage.tier_handler.handle_file", return_value=None
         ):
             mock_get_recordings_to_move.return_value = [
                 MockRecordingsQueryResult(1, 1, "/tmp/test1.mp4", "/tmp/"),
@@ -258,6 +311,7 @@ class TestSegmentsTierHandler(BaseTestWithRecordings):
         next_tier_index: int | None,
         move_thumbnail_called: bool,
         move_event_clip_called: bool,
+        file_mover: FileMover,
     ):
         """Test that check_tier finds the correct tier."""
         mock_camera = Mock()
@@ -296,8 +350,10 @@ class TestSegmentsTierHandler(BaseTestWithRecordings):
         ) as mock_get_recordings_to_move, patch(
             "viseron.components.storage.tier_handler.get_files_to_move"
         ) as mock_get_files_to_move, patch(
-            "viseron.components.storage.tier_handler.handle_file"
-        ) as mock_handle_file:
+            "viseron.components.storage.tier_handler.handle_file", return_value=None
+        ) as mock_handle_file, patch(
+            "viseron.components.storage.tier_handler.delete_files"
+        ) as mock_delete_files:
             mock_get_recordings_to_move.return_value = [
                 MockRecordingsQueryResult(recording_id, 1, "/tmp/test1.mp4", "/tmp/"),
             ]
@@ -307,17 +363,28 @@ class TestSegmentsTierHandler(BaseTestWithRecordings):
             tier_handlers[0]._check_tier(  # pylint: disable=protected-access
                 self._get_db_session
             )
-            mock_handle_file.assert_called_once_with(
-                self._get_db_session,
-                tier_handlers[0]._storage,  # pylint: disable=protected-access
-                tier_handlers[0]._camera.identifier,  # pylint: disable=protected-access
-                tier_handlers[0].tier,
-                tier_handlers[next_tier_index].tier if next_tier_index else None,
-                "/tmp/test1.mp4",
-                "/tmp/",
-                tier_handlers[0]._logger,  # pylint: disable=protected-access
-                force_delete=force_delete,
-            )
+            if force_delete:
+                mock_handle_file.assert_not_called()
+                mock_delete_files.assert_called_once_with(
+                    self._get_db_session,
+                    ["/tmp/test1.mp4"],
+                    tier_handlers[0]._logger,  # pylint: disable=protected-access
+                    file_mover,
+                )
+            else:
+                mock_delete_files.assert_not_called()
+                mock_handle_file.assert_called_once_with(
+                    self._get_db_session,
+                    tier_handlers[0]._storage,  # pylint: disable=protected-access
+                    # pylint: disable-next=protected-access
+                    tier_handlers[0]._camera.identifier,
+                    tier_handlers[0].tier,
+                    tier_handlers[next_tier_index].tier,
+                    "/tmp/test1.mp4",
+                    "/tmp/",
+                    tier_handlers[0]._logger,  # pylint: disable=protected-access
+                    False,
+                )
             if move_thumbnail_called:
                 thumbnail_tier_handler.move_thumbnail.assert_called_once_with(
                     1, tier_handlers[next_tier_index].tier if next_tier_index else None
@@ -393,3 +460,171 @@ def test_find_next_tier_segments(vis: Viseron):
 
     result = find_next_tier_segments(mock_storage, 2, mock_camera, "events")
     assert result is None
+
+
+def _insert_file(
+    session: Session, path: str, size: int, orig_ctime: datetime.datetime
+) -> None:
+    """Insert a file and its metadata."""
+    session.execute(insert(FilesMeta).values(path=path, orig_ctime=orig_ctime, meta={}))
+    session.execute(
+        insert(Files).values(
+            tier_id=0,
+            tier_path="/tier1/",
+            camera_identifier="test",
+            category="snapshots",
+            subcategory="object_detector",
+            path=path,
+            directory="/tier1/",
+            filename=path.split("/")[-1],
+            size=size,
+        )
+    )
+
+
+def test_files_tier_stats(get_db_session: Callable[[], Session]) -> None:
+    """Test that the tier stats are kept up to date by the triggers."""
+    now = datetime.datetime(2024, 1, 1, 12, tzinfo=datetime.timezone.utc)
+    with get_db_session() as session:
+        _insert_file(session, "/tier1/1.jpg", 10, now - datetime.timedelta(hours=2))
+        _insert_file(session, "/tier1/2.jpg", 20, now - datetime.timedelta(hours=1))
+        session.execute(
+            update(Files).where(Files.path == "/tier1/2.jpg").values(size=30)
+        )
+        session.execute(delete(Files).where(Files.path == "/tier1/1.jpg"))
+        session.commit()
+
+        stats = session.execute(select(FilesTierStats)).scalar_one()
+        assert stats.total_bytes == 30
+        assert stats.file_count == 1
+        # Not raised when files are deleted
+        assert stats.oldest_orig_ctime == now - datetime.timedelta(hours=2)
+
+        # Too few bytes and the oldest file is not too old
+        assert not tier_threshold_reached(
+            session,
+            "snapshots",
+            "object_detector",
+            0,
+            "test",
+            100,
+            0,
+            datetime.timedelta(hours=3),
+            now,
+        )
+        assert tier_threshold_reached(
+            session,
+            "snapshots",
+            "object_detector",
+            0,
+            "test",
+            30,
+            0,
+            datetime.timedelta(hours=3),
+            now,
+        )
+        # The oldest file is refreshed before deciding on the age
+        assert not tier_threshold_reached(
+            session,
+            "snapshots",
+            "object_detector",
+            0,
+            "test",
+            0,
+            0,
+            datetime.timedelta(minutes=90),
+            now,
+        )
+        assert session.execute(
+            select(FilesTierStats.oldest_orig_ctime)
+        ).scalar_one() == now - datetime.timedelta(hours=1)
+        assert tier_threshold_reached(
+            session,
+            "snapshots",
+            "object_detector",
+            0,
+            "test",
+            0,
+            0,
+            datetime.timedelta(minutes=30),
+            now,
+        )
+
+
+@pytest.mark.parametrize(
+    "sizes, max_bytes, min_bytes, max_age, expected",
+    [
+        # Oldest files until the tier is below max_bytes
+        ([10, 10, 10, 10], 25, 0, None, [0, 1]),
+        # Files older than max_age as long as min_bytes is left
+        ([10, 10, 10, 10], 0, 25, datetime.timedelta(minutes=150), [0, 1]),
+        ([10, 10, 10, 10], 0, 35, datetime.timedelta(minutes=150), [0]),
+        # The average size underestimates the files to move, read another page
+        ([1, 1, 1, 1, 96], 97, 0, None, [0, 1, 2, 3]),
+        ([10, 10, 10, 10], 50, 0, None, []),
+    ],
+)
+def test_get_files_to_move(
+    get_db_session: Callable[[], Session],
+    sizes: list[int],
+    max_bytes: int,
+    min_bytes: int,
+    max_age: datetime.timedelta | None,
+    expected: list[int],
+) -> None:
+    """Test that the oldest files are selected using the tier stats."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    paths = [f"/tier1/{i}.jpg" for i in range(len(sizes))]
+    with get_db_session() as session:
+        for i, (path, size) in enumerate(zip(paths, sizes)):
+            _insert_file(
+                session, path, size, now - datetime.timedelta(hours=len(sizes) - i)
+            )
+        session.commit()
+
+        files = get_files_to_move(
+            session,
+            "snapshots",
+            "object_detector",
+            0,
+            "test",
+            max_bytes,
+            datetime.timedelta(0),
+            min_bytes,
+            max_age,
+        )
+    assert [file.path for file in files] == [paths[i] for i in expected]
+
+
+def test_delete_files(get_db_session: Callable[[], Session], tmp_path) -> None:
+    """Test that files and their rows are deleted in chunks."""
+    now = datetime.datetime(2024, 1, 1, 12, tzinfo=datetime.timezone.utc)
+    paths = [str(tmp_path / f"{i}.jpg") for i in range(5)]
+    with get_db_session() as session:
+        setup_triggers(session.get_bind())
+        for path in paths:
+            _insert_file(session, path, 10, now)
+        session.commit()
+    # The last file is already gone from disk
+    for path in paths[:-1]:
+        with open(path, "wb") as file:
+            file.write(b"0" * 10)
+
+    logger = MagicMock()
+    file_mover = FileMover(workers=2)
+    try:
+        with patch(
+            "viseron.components.storage.tier_handler.DELETE_CHUNK_SIZE", 2
+        ), patch("viseron.components.storage.tier_handler.REMOVE_CHUNK_SIZE", 2):
+            delete_files(get_db_session, paths, logger, file_mover)
+    finally:
+        file_mover.stop()
+
+    assert not any(os.path.exists(path) for path in paths)
+    logger.error.assert_called_once()
+    with get_db_session() as session:
+        assert session.execute(select(Files)).all() == []
+        assert session.execute(select(FilesMeta)).all() == []
+        stats = session.execute(select(FilesTierStats)).scalar_one()
+        assert stats.total_bytes == 0
+        assert stats.file_count == 0
@@ -0,0 +1,72 @@
+"""Test the storage database triggers."""
+from __future__ import annotations
+
+from collections.abc import Callable
+
+import pytest
+from sqlalchemy import Delete, delete, insert, select
+from sqlalchemy.orm import Session
+
+from viseron.components.storage.models import Files, FilesMeta
+from viseron.components.storage.triggers import deleted_paths, setup_triggers
+
+
+def _file(path: str) -> dict[str, str | int]:
+    """Return a Files row."""
+    return {
+        "tier_id": 0,
+        "tier_path": "/tier1/",
+        "camera_identifier": "test",
+        "category": "recorder",
+        "subcategory": "segments",
+        "path": path,
+        "directory": "/tier1/",
+        "filename": path.split("/")[-1],
+        "size": 1,
+    }
+
+
+def test_files_meta_triggers(get_db_session: Callable[[], Session]) -> None:
+    """Test that FilesMeta follows single and bulk changes to Files."""
+    with get_db_session() as session:
+        setup_triggers(session.get_bind())
+        session.execute(insert(Files).values(_file("/tier1/1.m4s")))
+        session.execute(insert(Files), [_file("/tier1/2.m4s"), _file("/tier1/3.m4s")])
+        session.execute(insert(Files), [_file("/tier1/4.m4s")])
+        session.commit()
+        assert session.execute(
+            select(FilesMeta.path).order_by(FilesMeta.path)
+        ).scalars().all() == [
+            "/tier1/1.m4s",
+            "/tier1/2.m4s",
+            "/tier1/3.m4s",
+            "/tier1/4.m4s",
+        ]
+
+        session.execute(delete(Files).where(Files.path == "/tier1/1.m4s"))
+        session.execute(
+            delete(Files).where(
+                Files.path.in_(["/tier1/2.m4s", "/tier1/3.m4s", "/tier1/4.m4s"])
+            )
+        )
+        session.commit()
+        assert session.execute(select(FilesMeta.path)).scalars().all() == []
+
+
+@pytest.mark.parametrize(
+    "stmt, expected",
+    [
+        (delete(Files).where(Files.path == "/tier1/1.m4s"), ["/tier1/1.m4s"]),
+        (
+            delete(Files).where(Files.path.in_(["/tier1/1.m4s", "/tier1/2.m4s"])),
+            ["/tier1/1.m4s", "/tier1/2.m4s"],
+        ),
+        (delete(Files).where(Files.path.in_([])), []),
+        (delete(Files).where(Files.path.like("/tier1/%")), None),
+        (delete(Files).where(Files.size == 1), None),
+        (delete(Files), None),
+    ],
+)
+def test_deleted_paths(stmt: Delete, expected: list[str] | None) -> None:
+    """Test that deleted paths are read from the statement without compiling it."""
+    assert deleted_paths(stmt) == expected
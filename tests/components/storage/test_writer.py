@@ -0,0 +1,98 @@
+"""Test the buffered database writers."""
+from __future__ import annotations
+
+import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from viseron.components.storage.models import Events, Motion, MotionContours
+from viseron.components.storage.writer import BatchWriter, MotionWriter
+
+
+def test_batch_writer(get_db_session: sessionmaker[Session]) -> None:
+    """Test that rows are written in batches and flushed on stop."""
+    writer = BatchWriter(get_db_session, Events, max_batch=2, max_delay=60)
+    created_at = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    for i in range(3):
+        writer.insert({"name": f"event_{i}", "data": "{}", "created_at": created_at})
+    writer.stop()
+
+    with get_db_session() as session:
+        events = session.execute(select(Events).order_by(Events.id)).scalars().all()
+    assert [event.name for event in events] == ["event_0", "event_1", "event_2"]
+    assert events[0].created_at == created_at
+    assert writer.written == 3
+    assert writer.dropped == 0
+
+
+def test_batch_writer_full_buffer(get_db_session: sessionmaker[Session]) -> None:
+    """Test that rows are dropped and counted when the buffer is full."""
+    writer = BatchWriter(
+        get_db_session, Events, max_batch=10, max_delay=60, max_buffer=2
+    )
+    for i in range(3):
+        writer.insert({"name": f"event_{i}", "data": "{}"})
+    writer.stop()
+
+    with get_db_session() as session:
+        events = session.execute(select(Events)).scalars().all()
+    assert len(events) == 2
+    assert writer.dropped == 1
+
+
+def test_batch_writer_after_stop(get_db_session: sessionmaker[Session]) -> None:
+    """Test that rows inserted after stop are written right away."""
+    writer = BatchWriter(get_db_session, Events, max_delay=60)
+    writer.stop()
+    writer.insert({"name": "event_0", "data": "{}"})
+
+    with get_db_session() as session:
+        events = session.execute(select(Events)).scalars().all()
+    assert [event.name for event in events] == ["event_0"]
+
+
+def test_batch_writer_bad_row(get_db_session: sessionmaker[Session]) -> None:
+    """Test that a bad row does not discard the rest of the batch."""
+    writer = BatchWriter(get_db_session, Events, max_delay=60)
+    writer.insert({"name": "event_0", "data": "{}"})
+    writer.insert({"name": "event_1", "data": "{}", "created_at": "not a date"})
+    writer.insert({"name": "event_2", "data": "{}"})
+    writer.stop()
+
+    with get_db_session() as session:
+        events = session.execute(select(Events).order_by(Events.id)).scalars().all()
+    assert [event.name for event in events] == ["event_0", "event_2"]
+    assert writer.written == 2
+    assert writer.dropped == 1
+
+
+def test_motion_writer(get_db_session: sessionmaker[Session]) -> None:
+    """Test that motion events are started and ended by token."""
+    writer = MotionWriter(get_db_session, max_delay=60)
+    start_time = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    end_time = start_time + datetime.timedelta(seconds=10)
+    writer.insert(
+        {
+            "token": "a",
+            "camera_identifier": "test",
+            "start_time": start_time,
+            "contours": [b"contour_1", b"contour_2"],
+        }
+    )
+    writer.insert({"token": "b", "camera_identifier": "test", "start_time": end_time})
+    writer.insert({"token": "a", "end_time": end_time})
+    # End of an event whose start was never written is ignored
+    writer.insert({"token": "c", "end_time": end_time})
+    writer.stop()
+
+    with get_db_session() as session:
+        motion = session.execute(select(Motion).order_by(Motion.id)).scalars().all()
+        contours = (
+            session.execute(select(MotionContours).order_by(MotionContours.id))
+            .scalars()
+            .all()
+        )
+    assert [event.end_time for event in motion] == [end_time, None]
+    assert [contour.motion_id for contour in contours] == [motion[0].id] * 2
+    assert [contour.contour for contour in contours] == [b"contour_1", b"contour_2"]
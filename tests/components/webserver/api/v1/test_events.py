@@ -1,12 +1,15 @@
 """Test the Events API handler."""
 
 import datetime
+import json
 from unittest.mock import patch
 
+import numpy as np
 from sqlalchemy import insert
 
-from viseron.components.storage.models import Motion
+from viseron.components.storage.models import Motion, MotionContours
 from viseron.domains.camera.const import CONFIG_LOOKBACK, CONFIG_RECORDER
+from viseron.domains.motion_detector.contours import encode_contour
 
 from tests.common import BaseTestWithRecordings, MockCamera
 from tests.components.webserver.common import TestAppBaseNoAuth
@@ -54,3 +57,57 @@ class TestEventsApiHandler(TestAppBaseNoAuth, BaseTestWithRecordings):
                 "/api/v1/events/test?time_from=0&time_to=100000000000"
             )
         assert response.code == 200
+
+    def test_get_motion_contours(self):
+        """Test getting the decoded contours of a motion event."""
+        with self._get_db_session() as session:
+            motion_id = session.execute(
+                insert(Motion)
+                .values(
+                    camera_identifier="test",
+                    start_time=datetime.datetime.fromtimestamp(10),
+                )
+                .returning(Motion.id)
+            ).scalar_one()
+            session.execute(
+                insert(MotionContours),
+                [
+                    {
+                        "motion_id": motion_id,
+                        "contour": encode_contour(
+                            np.array([[0.1, 0.1], [0.5, 0.1], [0.5, 0.5]]),
+                            epsilon=0,
+                        ),
+                    },
+                    {
+                        "motion_id": motion_id,
+                        "contour": np.array([[1, 2], [3, 4]], np.int32).tobytes(),
+                    },
+                ],
+            )
+            session.commit()
+
+        mocked_camera = MockCamera(identifier="test")
+        with patch(
+            (
+                "viseron.components.webserver.request_handler.ViseronRequestHandler."
+                "_get_camera"
+            ),
+            return_value=mocked_camera,
+        ), patch(
+            (
+                "viseron.components.webserver.request_handler.ViseronRequestHandler"
+                "._get_session"
+            ),
+            return_value=self._get_db_session(),
+        ):
+            response = self.fetch(f"/api/v1/events/test/motion/{motion_id}/contours")
+            missing_response = self.fetch(
+                f"/api/v1/events/test/motion/{motion_id + 1}/contours"
+            )
+        assert response.code == 200
+        assert json.loads(response.body)["contours"] == [
+            {"points": [[0.1, 0.1], [0.5, 0.1], [0.5, 0.5]], "relative": True},
+            {"points": [[1, 2], [3, 4]], "relative": False},
+        ]
+        assert missing_response.code == 404
@@ -3,15 +3,15 @@ from __future__ import annotations
 
 import datetime
 import json
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
-from sqlalchemy import delete, insert, update
+from sqlalchemy import delete, insert, select, update
 
+from viseron.components.storage.const import COMPONENT as STORAGE_COMPONENT
+from viseron.components.storage.fragment_index import IndexedFragment
 from viseron.components.storage.models import Files, FilesMeta, Recordings
-from viseron.components.webserver.api.v1.hls import count_files_removed
+from viseron.components.webserver.api.v1.hls import HlsAPIHandler, HlsClients
 from viseron.domains.camera.const import CONFIG_LOOKBACK, CONFIG_RECORDER
-from viseron.domains.camera.fragmenter import Fragment
-from viseron.helpers import utcnow
 
 from tests.common import BaseTestWithRecordings, MockCamera
 from tests.components.webserver.common import TestAppBaseNoAuth
@@ -164,6 +164,159 @@ class TestHlsApiHandler(TestAppBaseNoAuth, BaseTestWithRecordings):
         assert response_string.count("#EXT-X-DISCONTINUITY") == 4
         assert response_string.count("#EXT-X-ENDLIST") == 0
 
+    def test_get_hls_playlist_blocking_reload(self):
+        """Test blocking playlist reloads and delta updates."""
+        mocked_camera = MockCamera(
+            identifier="test", config={CONFIG_RECORDER: {CONFIG_LOOKBACK: 5}}
+        )
+        url = (
+            f"/api/v1/hls/test/index.m3u8?start_timestamp={int(self._now.timestamp())}"
+        )
+        with patch(
+            (
+                "viseron.components.webserver.request_handler.ViseronRequestHandler."
+                "_get_camera"
+            ),
+            return_value=mocked_camera,
+        ), patch(
+            (
+                "viseron.components.webserver.request_handler.ViseronRequestHandler"
+                "._get_session"
+            ),
+            return_value=self._get_db_session(),
+        ), patch(
+            "viseron.components.webserver.api.v1.hls._get_init_file",
+            return_value="/test/init.mp4",
+        ), patch(
+            "viseron.components.storage.queries.utcnow",
+            return_value=self._now + datetime.timedelta(seconds=3600),
+        ), patch(
+            "viseron.components.webserver.api.v1.hls.BLOCKING_RELOAD_TIMEOUT", 0.1
+        ):
+            response = self.fetch(url)
+            assert response.code == 200
+            response_string = response.body.decode()
+            assert response_string.count("#EXTINF") == 15
+            assert "#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES" in response_string
+
+            # Segment 14 exists, returned right away
+            response = self.fetch(f"{url}&_HLS_msn=14&_HLS_skip=YES")
+            assert response.code == 200
+            response_string = response.body.decode()
+            assert "#EXT-X-SKIP:SKIPPED-SEGMENTS=9" in response_string
+            assert response_string.count("#EXTINF") == 6
+
+            # Segment 15 is not created before the timeout
+            response = self.fetch(f"{url}&_HLS_msn=15")
+            assert response.code == 200
+            assert response.body.decode().count("#EXTINF") == 15
+
+            response = self.fetch(f"{url}&_HLS_msn=17")
+            assert response.code == 400
+
+    def test_get_hls_playlist_client(self):
+        """Test media sequence tracking and viewer counts of live playlists."""
+        mocked_camera = MockCamera(
+            identifier="test", config={CONFIG_RECORDER: {CONFIG_LOOKBACK: 5}}
+        )
+        start_timestamp = int(self._now.timestamp())
+        url = f"/api/v1/hls/test/index.m3u8?start_timestamp={start_timestamp}"
+        headers = {"Hls-Client-Id": "client1"}
+        with patch(
+            (
+                "viseron.components.webserver.request_handler.ViseronRequestHandler."
+                "_get_camera"
+            ),
+            return_value=mocked_camera,
+        ), patch(
+            (
+                "viseron.components.webserver.request_handler.ViseronRequestHandler"
+                "._get_session"
+            ),
+            return_value=self._get_db_session(),
+        ), patch(
+            "viseron.components.webserver.api.v1.hls._get_init_file",
+            return_value="/test/init.mp4",
+        ), patch(
+            "viseron.components.storage.queries.utcnow",
+            return_value=self._now + datetime.timedelta(seconds=3600),
+        ), patch.object(
+            HlsAPIHandler, "hls_clients", HlsClients()
+        ):
+            response = self.fetch(url, headers=headers)
+            assert response.code == 200
+            assert "#EXT-X-MEDIA-SEQUENCE:0" in response.body.decode()
+
+            # Fragments deleted from the start of the playlist
+            fragment_index = self.vis.data[STORAGE_COMPONENT].get_fragment_index("test")
+            fragments = fragment_index.fragments(Mock(), start_timestamp)
+            fragment_index.remove([fragment.path for fragment in fragments[:2]])
+            response = self.fetch(url, headers=headers)
+            assert response.code == 200
+            response_string = response.body.decode()
+            assert "#EXT-X-MEDIA-SEQUENCE:2" in response_string
+            assert response_string.count("#EXTINF") == 13
+
+            response = self.fetch("/api/v1/hls/test/viewers")
+            assert response.code == 200
+            assert json.loads(response.body) == {"viewers": 1}
+
+    def test_get_hls_playlist_client_database(self):
+        """Test media sequence tracking of live playlists older than the index."""
+        mocked_camera = MockCamera(
+            identifier="test", config={CONFIG_RECORDER: {CONFIG_LOOKBACK: 5}}
+        )
+        start_timestamp = int(self._now.timestamp())
+        url = f"/api/v1/hls/test/index.m3u8?start_timestamp={start_timestamp}"
+        headers = {"Hls-Client-Id": "client1"}
+        with patch(
+            (
+                "viseron.components.webserver.request_handler.ViseronRequestHandler."
+                "_get_camera"
+            ),
+            return_value=mocked_camera,
+        ), patch(
+            (
+                "viseron.components.webserver.request_handler.ViseronRequestHandler"
+                "._get_session"
+            ),
+            return_value=self._get_db_session(),
+        ), patch(
+            "viseron.components.webserver.api.v1.hls._get_init_file",
+            return_value="/test/init.mp4",
+        ), patch(
+            "viseron.components.storage.queries.utcnow",
+            return_value=self._now + datetime.timedelta(seconds=3600),
+        ), patch(
+            "viseron.components.storage.fragment_index.INDEX_RETENTION",
+            datetime.timedelta(0),
+        ), patch.object(
+            HlsAPIHandler, "hls_clients", HlsClients()
+        ):
+            response = self.fetch(url, headers=headers)
+            assert response.code == 200
+            assert "#EXT-X-MEDIA-SEQUENCE:0" in response.body.decode()
+
+            # Fragments deleted from the start of the playlist by the retention
+            with self._get_db_session() as session:
+                paths = (
+                    session.execute(
+                        select(Files.path)
+                        .where(Files.camera_identifier == "test")
+                        .order_by(Files.filename)
+                        .limit(2)
+                    )
+                    .scalars()
+                    .all()
+                )
+                session.execute(delete(Files).where(Files.path.in_(paths)))
+                session.commit()
+            response = self.fetch(url, headers=headers)
+            assert response.code == 200
+            response_string = response.body.decode()
+            assert "#EXT-X-MEDIA-SEQUENCE:2" in response_string
+            assert response_string.count("#EXTINF") == 13
+
     def test_get_available_timespans(self):
         """Test getting available HLS timespans."""
         mocked_camera = MockCamera(
@@ -226,67 +379,45 @@ class TestHlsApiHandler(TestAppBaseNoAuth, BaseTestWithRecordings):
         assert len(json.loads(response.body)["timespans"]) == 2
 
 
-def test_count_files_removed_no_files_removed():
-    """Test count_files_removed with no files removed."""
-    prev_list = [
-        Fragment("file1", "file1", 1, utcnow()),
-        Fragment("file2", "file2", 1, utcnow()),
-        Fragment("file3", "file3", 1, utcnow()),
-    ]
-    curr_list = [
-        Fragment("file1", "file1", 1, utcnow()),
-        Fragment("file2", "file2", 1, utcnow()),
-        Fragment("file3", "file3", 1, utcnow()),
+def _fragments(*seconds: int) -> list[IndexedFragment]:
+    """Return fragments starting the given number of seconds after the epoch."""
+    return [
+        IndexedFragment(
+            f"{second}.m4s",
+            f"/test/{second}.m4s",
+            5,
+            datetime.datetime.fromtimestamp(second, datetime.timezone.utc),
+        )
+        for second in seconds
     ]
-    assert count_files_removed(prev_list, curr_list) == 0
-
 
-def test_count_files_removed_one_file_removed():
-    """Test count_files_removed with one file removed."""
-    prev_list = [
-        Fragment("file1", "file1", 1, utcnow()),
-        Fragment("file2", "file2", 1, utcnow()),
-        Fragment("file3", "file3", 1, utcnow()),
-    ]
-    curr_list = [
-        Fragment("file2", "file2", 1, utcnow()),
-        Fragment("file3", "file3", 1, utcnow()),
-    ]
-    assert count_files_removed(prev_list, curr_list) == 1
 
+def test_hls_clients():
+    """Test that media sequences follow the fragments dropped from the start."""
+    hls_clients = HlsClients(timeout=10)
+    with patch("viseron.components.webserver.api.v1.hls.time.monotonic") as now:
+        now.return_value = 0
+        assert hls_clients.update("client1", "test", _fragments(0, 5, 10)) == 0
+        assert hls_clients.update("client2", "test", _fragments(0, 5, 10)) == 0
+        assert hls_clients.update("client3", "test2", []) == 0
+        assert hls_clients.active_viewers("test") == 2
+        assert hls_clients.active_viewers("test2") == 1
 
-def test_count_files_removed_all_files_removed():
-    """Test count_files_removed with all files removed."""
-    prev_list = [
-        Fragment("file1", "file1", 1, utcnow()),
-        Fragment("file2", "file2", 1, utcnow()),
-        Fragment("file3", "file3", 1, utcnow()),
-    ]
-    curr_list: list[Fragment] = []
-    assert count_files_removed(prev_list, curr_list) == 3
+        now.return_value = 5
+        assert hls_clients.update("client1", "test", _fragments(0, 5, 10, 15)) == 0
+        assert hls_clients.update("client1", "test", _fragments(10, 15, 20)) == 2
+        # All fragments dropped
+        assert hls_clients.update("client1", "test", []) == 5
+        assert hls_clients.update("client1", "test", _fragments(25)) == 5
+        assert hls_clients.update("client1", "test", _fragments(30)) == 6
+        assert hls_clients.update("client3", "test2", _fragments(0)) == 0
 
+        # client2 has timed out
+        now.return_value = 12
+        assert hls_clients.active_viewers("test") == 1
+        assert hls_clients.update("client2", "test", _fragments(10)) == 0
+        assert hls_clients.active_viewers("test") == 2
 
-def test_count_files_removed_empty_previous_list():
-    """Test count_files_removed with an empty previous list."""
-    prev_list: list[Fragment] = []
-    curr_list = [
-        Fragment("file1", "file1", 1, utcnow()),
-        Fragment("file2", "file2", 1, utcnow()),
-        Fragment("file3", "file3", 1, utcnow()),
-    ]
-    assert count_files_removed(prev_list, curr_list) == 0
-
-
-def test_count_files_removed_all_files_changed():
-    """Test count_files_removed with all files changed."""
-    prev_list = [
-        Fragment("file1", "file1", 1, utcnow()),
-        Fragment("file2", "file2", 1, utcnow()),
-        Fragment("file3", "file3", 1, utcnow()),
-    ]
-    curr_list = [
-        Fragment("file4", "file4", 1, utcnow()),
-        Fragment("file5", "file5", 1, utcnow()),
-        Fragment("file6", "file6", 1, utcnow()),
-    ]
-    assert count_files_removed(prev_list, curr_list) == 3
+        now.return_value = 30
+        assert hls_clients.active_viewers("test") == 0
+        assert len(hls_clients) == 0
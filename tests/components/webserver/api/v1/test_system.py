@@ -0,0 +1,55 @@
+"""Test the System API handler."""
+import json
+from http import HTTPStatus
+from unittest.mock import PropertyMock, patch
+
+from viseron.components.data_stream import LANE_QUEUE_SIZES
+from viseron.components.webserver.auth import Group, User
+
+from tests.components.webserver.common import TestAppBaseAuth, TestAppBaseNoAuth
+
+
+class TestSystemApiHandler(TestAppBaseNoAuth):
+    """Test the System API handler."""
+
+    def test_get_data_stream_statistics(self):
+        """Test getting data stream statistics."""
+        self.vis.data["data_stream"].publish_data("test/statistics", "data")
+        response = self.fetch("/api/v1/system/data_stream")
+        assert response.code == 200
+        body = json.loads(response.body)
+        assert set(body["lanes"]) == set(LANE_QUEUE_SIZES)
+        assert body["topics"]["test/statistics"]["published"] == 1
+        for lane_statistics in body["lanes"].values():
+            assert set(lane_statistics) == {"depth", "maxsize", "dropped", "latency"}
+
+
+class TestSystemApiHandlerAuth(TestAppBaseAuth):
+    """Test the System API handler with auth enabled."""
+
+    def test_get_data_stream_statistics_admin(self):
+        """Test that admins can get data stream statistics."""
+        response = self.fetch_with_auth("/api/v1/system/data_stream")
+        assert response.code == HTTPStatus.OK
+
+    def test_get_data_stream_statistics_requires_admin(self):
+        """Test that getting data stream statistics requires the admin group."""
+        with patch(
+            "viseron.components.webserver.api.handlers.BaseAPIHandler.validate_auth_header",  # pylint: disable=line-too-long
+            return_value=True,
+        ), patch(
+            "viseron.components.webserver.request_handler.ViseronRequestHandler.current_user",  # pylint: disable=line-too-long
+            new_callable=PropertyMock,
+            return_value=User(
+                name="Test",
+                username="test",
+                password="test",
+                group=Group.READ,
+            ),
+        ):
+            response = self.fetch("/api/v1/system/data_stream")
+            assert response.code == HTTPStatus.FORBIDDEN
+            assert json.loads(response.body) == {
+                "error": "Insufficient permissions",
+                "status": HTTPStatus.FORBIDDEN,
+            }
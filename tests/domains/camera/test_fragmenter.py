@@ -40,6 +40,28 @@ def test_generate_playlist() -> None:
     )
 
 
+def test_generate_playlist_skip() -> None:
+    """Test that delta playlists skip fragments older than the skip boundary."""
+    now = utcnow()
+    fragments = [
+        Fragment(f"test{i}.m4s", f"/test/test{i}.m4s", 5, now) for i in range(10)
+    ]
+
+    playlist = generate_playlist(
+        fragments, "/test/init.mp4", server_control=True, skip=True
+    )
+    assert "#EXT-X-VERSION:9" in playlist
+    assert "#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES,CAN-SKIP-UNTIL=30.0" in playlist
+    assert "#EXT-X-SKIP:SKIPPED-SEGMENTS=4" in playlist
+    assert playlist.count("#EXTINF") == 6
+    assert "/test/test4.m4s" in playlist
+    assert "/test/test3.m4s" not in playlist
+
+    playlist = generate_playlist(fragments, "/test/init.mp4", server_control=True)
+    assert "#EXT-X-SKIP" not in playlist
+    assert playlist.count("#EXTINF") == 10
+
+
 class TestFragmenter:
     """Tests for Fragmenter."""
 
@@ -0,0 +1,179 @@
+"""Tests for shared frames."""
+from __future__ import annotations
+
+import threading
+from collections.abc import Generator
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+
+from viseron.domains.camera.shared_frames import (
+    FRAME_RETENTION,
+    PIXEL_FORMAT_YUV420P,
+    SharedFrame,
+    SharedFrames,
+)
+
+WIDTH = 4
+HEIGHT = 4
+FRAME_SIZE = int(WIDTH * HEIGHT * 1.5)
+
+
+def _create_frame(shared_frames: SharedFrames, value: int) -> SharedFrame:
+    """Create a frame filled with value."""
+    shared_frame = SharedFrame(
+        WIDTH,
+        int(HEIGHT * 1.5),
+        PIXEL_FORMAT_YUV420P,
+        (WIDTH, HEIGHT),
+        "test_camera_identifier",
+    )
+    shared_frames.create(shared_frame, bytes([value]) * FRAME_SIZE)
+    return shared_frame
+
+
+@pytest.fixture(name="shared_frames")
+def fixture_shared_frames() -> Generator[SharedFrames, None, None]:
+    """Return SharedFrames and release the shared memory afterwards."""
+    shared_frames = SharedFrames()
+    yield shared_frames
+    shared_frames.close()
+
+
+class TestSharedFrames:
+    """Test the SharedFrames class."""
+
+    def test_create(self, shared_frames: SharedFrames) -> None:
+        """Test that frames are stored in separate slots."""
+        frame_1 = _create_frame(shared_frames, 1)
+        frame_2 = _create_frame(shared_frames, 2)
+        assert frame_1.slot == 0
+        assert frame_2.slot == 1
+        assert (shared_frames.get_decoded_frame(frame_1) == 1).all()
+        assert (shared_frames.get_decoded_frame(frame_2) == 2).all()
+
+    def test_slot_reused(self, shared_frames: SharedFrames) -> None:
+        """Test that removed frames return their slot to the pool."""
+        frame_1 = _create_frame(shared_frames, 1)
+        shared_frames.remove(frame_1)
+
+        # Slot is kept intact during the retention period
+        frame_2 = _create_frame(shared_frames, 2)
+        assert frame_2.slot != frame_1.slot
+        assert (shared_frames.get_decoded_frame(frame_1) == 1).all()
+
+        with patch("viseron.domains.camera.shared_frames.FRAME_RETENTION", 0):
+            frame_3 = _create_frame(shared_frames, 3)
+        assert frame_3.slot == frame_1.slot
+        with pytest.raises(KeyError):
+            shared_frames.get_decoded_frame(frame_1)
+
+        # Removing an already removed frame must not release the new owner's slot
+        shared_frames.remove(frame_1)
+        with patch("viseron.domains.camera.shared_frames.FRAME_RETENTION", 0):
+            frame_4 = _create_frame(shared_frames, 4)
+        assert frame_4.slot not in (frame_2.slot, frame_3.slot)
+        assert (shared_frames.get_decoded_frame(frame_3) == 3).all()
+
+    def test_reference_count(self) -> None:
+        """Test that a referenced frame is not reused."""
+        shared_frames = SharedFrames(max_slots=2)
+        with patch("viseron.domains.camera.shared_frames.FRAME_RETENTION", 0):
+            frame_1 = _create_frame(shared_frames, 1)
+            with frame_1:
+                shared_frames.remove(frame_1)
+                frame_2 = _create_frame(shared_frames, 2)
+                shared_frames.remove(frame_2)
+                frame_3 = _create_frame(shared_frames, 3)
+                assert frame_3.slot == frame_2.slot
+                assert (shared_frames.get_decoded_frame(frame_1) == 1).all()
+            frame_4 = _create_frame(shared_frames, 4)
+        assert frame_4.slot == frame_1.slot
+        shared_frames.close()
+
+    def test_max_slots(self) -> None:
+        """Test that the pool never grows beyond max_slots."""
+        shared_frames = SharedFrames(max_slots=2)
+        frames = [_create_frame(shared_frames, i) for i in range(3)]
+        assert [frame.slot for frame in frames] == [0, 1, 0]
+        with pytest.raises(KeyError):
+            shared_frames.get_decoded_frame(frames[0])
+        shared_frames.close()
+
+    def test_set_fps(self, shared_frames: SharedFrames) -> None:
+        """Test that the pool is sized from the fps."""
+        shared_frames.set_fps(5)
+        assert shared_frames.frame_queue_size == 5 * FRAME_RETENTION
+        frames = [_create_frame(shared_frames, i) for i in range(100)]
+        assert max(frame.slot for frame in frames) == 5 * FRAME_RETENTION * 2 + 9
+        assert shared_frames.acquired_slots() == 5 * FRAME_RETENTION * 2 + 10
+
+    def test_get_decoded_frame_gray(self, shared_frames: SharedFrames) -> None:
+        """Test that the gray frame is a read-only view of the luma plane."""
+        shared_frame = _create_frame(shared_frames, 7)
+        gray_frame = shared_frames.get_decoded_frame_gray(shared_frame)
+        assert gray_frame.shape == (HEIGHT, WIDTH)
+        assert np.shares_memory(
+            gray_frame, shared_frames.get_decoded_frame(shared_frame)
+        )
+        assert not gray_frame.flags.writeable
+
+        resized_frame = shared_frames.get_decoded_frame_gray_resized(
+            shared_frame, (2, 2)
+        )
+        assert resized_frame.shape == (2, 2)
+        assert (resized_frame == 7).all()
+
+    def test_color_convert_cache(self, shared_frames: SharedFrames) -> None:
+        """Test that each frame is only converted once."""
+        shared_frame = _create_frame(shared_frames, 128)
+        with patch(
+            "viseron.domains.camera.shared_frames.cv2.cvtColor", wraps=cv2.cvtColor
+        ) as mock_cvt_color:
+            threads = [
+                threading.Thread(
+                    target=shared_frames.get_decoded_frame_rgb, args=(shared_frame,)
+                )
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert shared_frames.get_decoded_frame_rgb(shared_frame).shape == (
+                HEIGHT,
+                WIDTH,
+                3,
+            )
+            assert mock_cvt_color.call_count == 1
+
+            with patch("viseron.domains.camera.shared_frames.FRAME_RETENTION", 0):
+                shared_frames.remove(shared_frame)
+                new_frame = _create_frame(shared_frames, 128)
+            assert new_frame.slot == shared_frame.slot
+            shared_frames.get_decoded_frame_rgb(new_frame)
+            assert mock_cvt_color.call_count == 2
+
+    @pytest.mark.parametrize("letterbox", [False, True])
+    def test_get_decoded_frame_rgb_resized(
+        self, shared_frames: SharedFrames, letterbox: bool
+    ) -> None:
+        """Test that frames are resized from the YUV planes and cached."""
+        shared_frame = _create_frame(shared_frames, 128)
+        resized_frame = shared_frames.get_decoded_frame_rgb_resized(
+            shared_frame, (3, 2), letterbox=letterbox
+        )
+        assert resized_frame.shape == (2, 3, 3)
+        full_frame = shared_frames.get_decoded_frame_rgb(shared_frame)
+        if not letterbox:
+            assert (resized_frame == full_frame[0, 0]).all()
+
+        assert (
+            shared_frames.get_decoded_frame_rgb_resized(
+                shared_frame, (3, 2), letterbox=letterbox
+            )
+            is resized_frame
+        )
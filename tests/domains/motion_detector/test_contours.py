@@ -0,0 +1,40 @@
+"""Tests for motion contours."""
+from __future__ import annotations
+
+import numpy as np
+
+from viseron.domains.motion_detector.contours import (
+    CONTOUR_SCALE,
+    decode_contour,
+    encode_contour,
+)
+
+
+def test_encode_decode_contour() -> None:
+    """Test that an encoded contour decodes to the quantized relative points."""
+    rel_contour = np.array([[[0.1, 0.2]], [[0.5, 0.25]], [[0.45, 0.9]], [[0.0, 1.0]]])
+    data = encode_contour(rel_contour, epsilon=0)
+    assert len(data) == 1 + len(rel_contour) * 4
+
+    points, relative = decode_contour(data)
+    assert relative
+    np.testing.assert_allclose(
+        points, rel_contour.reshape(-1, 2), atol=1 / CONTOUR_SCALE
+    )
+
+
+def test_encode_contour_simplify() -> None:
+    """Test that points on a straight line are removed."""
+    rel_contour = np.array(
+        [[x / 100, 0.1] for x in range(10, 91)] + [[0.9, 0.9], [0.1, 0.9]]
+    )
+    points, _ = decode_contour(encode_contour(rel_contour))
+    assert len(points) == 4
+
+
+def test_decode_legacy_contour() -> None:
+    """Test that contours stored as raw int32 points are decoded."""
+    contour = np.array([[[10, 20]], [[30, 40]]], dtype=np.int32)
+    points, relative = decode_contour(contour.tobytes())
+    assert not relative
+    assert points.tolist() == [[10, 20], [30, 40]]
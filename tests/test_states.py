@@ -0,0 +1,105 @@
+"""Test the states registry."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+from viseron.const import EVENT_STATE_CHANGED
+from viseron.helpers.entity.sensor import SensorEntity
+from viseron.states import States
+
+
+class MockSensor(SensorEntity):
+    """Sensor used for testing."""
+
+    def __init__(self) -> None:
+        self.entity_id = "sensor.test"
+        self.name = "Test"
+        self._state = 1
+        self.attr = 1
+
+    @property
+    def state(self):
+        """Return entity state."""
+        return self._state
+
+    @property
+    def extra_attributes(self):
+        """Return entity attributes."""
+        return {"attr": self.attr}
+
+
+def _state_changes(vis: MagicMock) -> list:
+    """Return the state changed events dispatched so far."""
+    return [
+        call
+        for call in vis.dispatch_event.call_args_list
+        if call.args[0] == EVENT_STATE_CHANGED
+    ]
+
+
+def test_set_state_unchanged() -> None:
+    """Test that unchanged states are not dispatched."""
+    vis = MagicMock()
+    states = States(vis)
+    entity = MockSensor()
+
+    states.set_state(entity)
+    states.set_state(entity)
+    assert len(_state_changes(vis)) == 1
+
+    entity.force_update = True
+    states.set_state(entity)
+    assert len(_state_changes(vis)) == 2
+
+
+def test_set_state_volatile() -> None:
+    """Test that volatile entities are not stored."""
+    vis = MagicMock()
+    states = States(vis)
+    entity = MockSensor()
+    entity.volatile = True
+
+    states.set_state(entity)
+    assert _state_changes(vis)[0].kwargs["store"] is False
+
+
+def test_set_state_rate_limited() -> None:
+    """Test that attribute updates are coalesced."""
+    vis = MagicMock()
+    states = States(vis)
+    entity = MockSensor()
+    entity.min_state_interval = 10
+
+    with patch("viseron.states.time.time", return_value=100):
+        states.set_state(entity)
+        entity.attr = 2
+        states.set_state(entity)
+        entity.attr = 3
+        states.set_state(entity)
+    assert len(_state_changes(vis)) == 1
+    vis.background_scheduler.add_job.assert_called_once()
+
+    # State changes are not rate limited
+    entity._state = 2  # pylint: disable=protected-access
+    with patch("viseron.states.time.time", return_value=101):
+        states.set_state(entity)
+    assert len(_state_changes(vis)) == 2
+
+    entity.attr = 4
+    with patch("viseron.states.time.time", return_value=102):
+        states.set_state(entity)
+        states._set_rate_limited_states()  # pylint: disable=protected-access
+    assert len(_state_changes(vis)) == 2
+
+    with patch("viseron.states.time.time", return_value=111):
+        states._set_rate_limited_states()  # pylint: disable=protected-access
+    changes = _state_changes(vis)
+    assert len(changes) == 3
+    assert changes[2].args[1].current_state.attributes["attr"] == 4
+    # Nothing is waiting, the job is removed until the next rate limited update
+    vis.background_scheduler.add_job.return_value.remove.assert_called_once()
+
+    entity.attr = 5
+    with patch("viseron.states.time.time", return_value=112):
+        states.set_state(entity)
+    assert vis.background_scheduler.add_job.call_count == 2
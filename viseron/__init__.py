@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import concurrent.futures
+import datetime
 import json
 import logging
 import multiprocessing.process
@@ -18,7 +19,6 @@ from typing import TYPE_CHECKING, Any, Literal, overload
 import voluptuous as vol
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.schedulers.base import SchedulerNotRunningError
-from sqlalchemy import insert
 
 from viseron.components import (
     CriticalComponentsConfigStore,
@@ -37,7 +37,6 @@ from viseron.components.nvr.const import (
 )
 from viseron.components.storage import Storage
 from viseron.components.storage.const import COMPONENT as STORAGE_COMPONENT
-from viseron.components.storage.models import Events
 from viseron.config import load_config
 from viseron.const import (
     DOMAIN_FAILED,
@@ -277,7 +276,7 @@ class Viseron:
         return unsubscribe
 
     def _insert_event(self, event: Event[EventData]) -> None:
-        """Insert event into database."""
+        """Queue event to be written to the database in the background."""
         if self.storage:
             event_data_json = "{}"
             if event.data and event.data.json_serializable:
@@ -291,13 +290,15 @@ class Viseron:
                     )
                     return
 
-            with self.storage.get_session() as session:
-                stmt = insert(Events).values(
-                    name=event.name,
-                    data=event_data_json,
-                )
-                session.execute(stmt)
-                session.commit()
+            self.storage.events_writer.insert(
+                {
+                    "name": event.name,
+                    "data": event_data_json,
+                    "created_at": datetime.datetime.fromtimestamp(
+                        event.timestamp, tz=datetime.timezone.utc
+                    ),
+                }
+            )
 
     def dispatch_event(self, event: str, data: EventData, store: bool = True) -> None:
         """Dispatch an event."""
@@ -8,7 +8,6 @@ from viseron import Viseron
 from viseron.domains.object_detector import AbstractObjectDetector
 from viseron.domains.object_detector.const import DOMAIN
 from viseron.domains.object_detector.detected_object import DetectedObject
-from viseron.helpers import letterbox_resize
 
 from .const import (
     COMPONENT,
@@ -58,14 +57,20 @@ class ObjectDetector(AbstractObjectDetector):
 
         vis.register_domain(DOMAIN, camera_identifier, self)
 
+    @property
+    def preprocess_resolution(self) -> tuple[int, int] | None:
+        """Return resolution of the frame passed to preprocess."""
+        if self._config[CONFIG_IMAGE_SIZE]:
+            return self._config[CONFIG_IMAGE_SIZE], self._config[CONFIG_IMAGE_SIZE]
+        return None
+
+    @property
+    def preprocess_letterbox(self) -> bool:
+        """Return if the frame passed to preprocess should be letterboxed."""
+        return True
+
     def preprocess(self, frame):
         """Preprocess frame before detection."""
-        if self._config[CONFIG_IMAGE_SIZE]:
-            frame = letterbox_resize(
-                frame,
-                self._config[CONFIG_IMAGE_SIZE],
-                self._config[CONFIG_IMAGE_SIZE],
-            )
         return cv2.imencode(".jpg", frame)[1].tobytes()
 
     def postprocess(self, detections):
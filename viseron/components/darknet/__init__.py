@@ -22,7 +22,7 @@ from viseron.domains.object_detector import BASE_CONFIG_SCHEMA
 from viseron.domains.object_detector.const import CONFIG_CAMERAS
 from viseron.domains.object_detector.detected_object import DetectedObject
 from viseron.exceptions import ComponentNotReady, ViseronError
-from viseron.helpers import letterbox_resize, pop_if_full
+from viseron.helpers import pop_if_full
 from viseron.helpers.child_process_worker import ChildProcessWorker
 from viseron.helpers.logs import CTypesLogPipe
 from viseron.helpers.schemas import FLOAT_MIN_ZERO_MAX_ONE
@@ -207,9 +207,17 @@ class BaseDarknet(ABC):
         """Return trained model resolution."""
         return self.model_width, self.model_height
 
+    @property
+    def letterbox(self) -> bool:
+        """Return if frames should be letterboxed before detection."""
+        return False
+
     @abstractmethod
     def preprocess(self, frame):
-        """Pre process frame before detection."""
+        """Pre process frame before detection.
+
+        The frame is already resized to the model resolution.
+        """
 
     @abstractmethod
     def detect(self, frame, camera_identifier, result_queue, min_confidence):
@@ -261,11 +269,7 @@ class DarknetDNN(BaseDarknet):
 
     def preprocess(self, frame):
         """Pre process frame before detection."""
-        return cv2.resize(
-            cv2.UMat(frame),
-            (self.model_width, self.model_height),
-            interpolation=cv2.INTER_LINEAR,
-        )
+        return cv2.UMat(frame)
 
     def detect(self, frame, _camera_identifier, _object_result_queue, min_confidence):
         """Run detection on frame."""
@@ -388,9 +392,14 @@ class DarknetNative(BaseDarknet, ChildProcessWorker):
         """Put result into queue."""
         pop_if_full(self._result_queues[item["camera_identifier"]], item)
 
+    @property
+    def letterbox(self) -> bool:
+        """Return if frames should be letterboxed before detection."""
+        return True
+
     def preprocess(self, frame):
         """Pre process frame before detection."""
-        return letterbox_resize(frame, self.model_width, self.model_height).tobytes()
+        return frame.tobytes()
 
     def detect(self, frame, camera_identifier, result_queue, min_confidence):
         """Perform detection."""
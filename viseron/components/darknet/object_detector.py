@@ -36,6 +36,16 @@ class ObjectDetector(AbstractObjectDetector):
 
         vis.register_domain(DOMAIN, camera_identifier, self)
 
+    @property
+    def preprocess_resolution(self) -> tuple[int, int]:
+        """Return resolution of the frame passed to preprocess."""
+        return self._darknet.model_res
+
+    @property
+    def preprocess_letterbox(self) -> bool:
+        """Return if the frame passed to preprocess should be letterboxed."""
+        return self._darknet.letterbox
+
     def preprocess(self, frame):
         """Return preprocessed frame before performing object detection."""
         return self._darknet.preprocess(frame)
@@ -4,10 +4,12 @@ from __future__ import annotations
 import fnmatch
 import logging
 import multiprocessing as mp
+import os
 import subprocess
 import threading
 import time
 import uuid
+from collections import deque
 from collections.abc import Callable
 from queue import Queue
 from typing import Any, TypedDict
@@ -16,10 +18,34 @@ from tornado.ioloop import IOLoop
 from tornado.queues import Queue as tornado_queue
 
 from viseron import helpers
+from viseron.components.data_stream.sensor import DataStreamLaneSensor
+from viseron.components.data_stream.statistics import DataStreamStatistics
+from viseron.const import ENV_DATA_STREAM_DISPATCH
 from viseron.watchdog.thread_watchdog import RestartableThread
 
 COMPONENT = "data_stream"
 
+DISPATCH_EXECUTOR = "executor"
+DISPATCH_THREAD = "thread"
+DEFAULT_MAX_WORKERS = 64
+DEFAULT_CALLBACK_BACKLOG = 100
+MAX_WILDCARD_CACHE_SIZE = 10000
+
+# Published data is consumed from separate lanes so that a burst in one kind of
+# traffic does not delay the others
+LANE_REALTIME = "realtime"  # Frames, scan requests and detector results
+LANE_EVENTS = "events"  # Events and signals
+LANE_BULK = "bulk"  # Best effort data like MJPEG stream frames
+LANE_QUEUE_SIZES = {
+    LANE_REALTIME: 100,
+    LANE_EVENTS: 1000,
+    LANE_BULK: 10,
+}
+# Dropping stale frames is expected, dropping events is worth a warning
+LANE_WARN_ON_DROP = {LANE_EVENTS}
+SIGNAL_TOPIC_PREFIX = "viseron/signal/"
+EVENTS_LANE_TOPIC_PREFIXES = ("event/", SIGNAL_TOPIC_PREFIX)
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -28,6 +54,120 @@ class DataSubscriber(TypedDict):
 
     callback: Callable | Queue | tornado_queue
     ioloop: IOLoop | None
+    # Called with items dropped from the subscribers full queue
+    on_drop: Callable[[Any], None] | None
+
+
+def _data_item_dropped(data_item: dict[str, Any]) -> None:
+    """Let the publisher release data dropped from a full lane."""
+    if data_item["on_drop"]:
+        data_item["on_drop"](data_item["data"])
+
+
+class CallbackLane:
+    """Ordered backlog of data waiting to be delivered to one callback subscriber.
+
+    Only one worker drains a lane at a time, which keeps delivery in FIFO order.
+    When the backlog is full the oldest item is dropped and counted.
+    on_delivered is called with the data stream lane and publish time of each item
+    right before it is handed to the callback.
+    """
+
+    def __init__(
+        self,
+        callback: Callable,
+        maxlen: int,
+        on_drop: Callable[[Any], None] | None = None,
+        on_delivered: Callable[[str, float], None] | None = None,
+    ) -> None:
+        self.callback = callback
+        self.on_drop = on_drop
+        self.on_delivered = on_delivered
+        self.backlog: deque[tuple[Any, str | None, float | None]] = deque(maxlen=maxlen)
+        self.lock = threading.Lock()
+        self.scheduled = False
+        self.dropped = 0
+
+    def push(
+        self, data: Any, lane: str | None = None, published_at: float | None = None
+    ) -> bool:
+        """Add data to the backlog.
+
+        Returns True if the lane needs to be scheduled on a worker.
+        """
+        with self.lock:
+            if len(self.backlog) == self.backlog.maxlen:
+                if self.on_drop:
+                    self.on_drop(self.backlog[0][0])
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 100 == 0:
+                    LOGGER.warning(
+                        f"Callback {self.callback} is not keeping up, "
+                        f"dropped {self.dropped} items so far"
+                    )
+            self.backlog.append((data, lane, published_at))
+            if self.scheduled:
+                return False
+            self.scheduled = True
+            return True
+
+    def drain(self) -> None:
+        """Deliver the backlog to the callback until it is empty."""
+        while True:
+            with self.lock:
+                if not self.backlog:
+                    self.scheduled = False
+                    return
+                data, lane, published_at = self.backlog.popleft()
+
+            if self.on_delivered and lane is not None and published_at is not None:
+                self.on_delivered(lane, published_at)
+            try:
+                if data:
+                    self.callback(data)
+                else:
+                    self.callback()
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception(f"Error in data stream callback {self.callback}")
+
+
+class CallbackWorkerPool:
+    """Pool of worker threads that drain callback lanes.
+
+    Workers are started on demand up to max_workers. They are daemon threads since
+    Viseron joins all non-daemon threads on shutdown.
+    """
+
+    def __init__(self, max_workers: int, name: str = "data_stream_callback") -> None:
+        self._max_workers = max_workers
+        self._name = name
+        self._lanes: Queue[CallbackLane] = Queue()
+        self._idle_semaphore = threading.Semaphore(0)
+        self._workers = 0
+        self._lock = threading.Lock()
+
+    def submit(self, lane: CallbackLane) -> None:
+        """Schedule lane to be drained by a worker."""
+        self._lanes.put(lane)
+        if self._idle_semaphore.acquire(blocking=False):
+            return
+
+        with self._lock:
+            if self._workers >= self._max_workers:
+                return
+            self._workers += 1
+            threading.Thread(
+                name=f"{self._name}_{self._workers}",
+                target=self._work,
+                daemon=True,
+            ).start()
+
+    def _work(self) -> None:
+        """Drain lanes forever."""
+        while True:
+            lane = self._lanes.get()
+            lane.drain()
+            self._idle_semaphore.release()
 
 
 class Subscribe(TypedDict):
@@ -46,7 +186,10 @@ class Publish(TypedDict):
 
 def setup(vis, _) -> bool:
     """Set up the data_stream component."""
-    vis.data[COMPONENT] = DataStream(vis)
+    data_stream = DataStream(vis)
+    vis.data[COMPONENT] = data_stream
+    for lane in LANE_QUEUE_SIZES:
+        vis.add_entity(COMPONENT, DataStreamLaneSensor(vis, data_stream, lane))
     return True
 
 
@@ -58,22 +201,61 @@ class DataStream:
     A data topic can have any value.
     You can subscribe to wildcard topics using '*', eg topic/*/event_name
 
-    Data is published to topics using a thread.
+    Data is published to topics using one consumer thread per lane, see
+    LANE_QUEUE_SIZES. Events and signals use the events lane, everything else the
+    realtime lane unless another lane is given when publishing.
+    Callable subscribers are run on a bounded worker pool, each subscriber
+    receiving its data in the order it was published. Signal handlers block while
+    their component shuts down, so they are run on a separate worker pool where
+    they cannot starve the other subscribers.
     """
 
     _subscribers: dict[str, Any] = {}
     _wildcard_subscribers: dict[str, Any] = {}
-    _data_queue: Queue = Queue(maxsize=1000)
 
-    def __init__(self, vis) -> None:
-        self._vis = vis
-        self._max_threads = self._get_max_threads()
-        LOGGER.debug(f"Max threads: {self._max_threads}")
+    _callback_lanes: dict[uuid.UUID, CallbackLane] = {}
+    _subscriber_drops: dict[uuid.UUID, int] = {}
+    _wildcard_matches_cache: dict[str, tuple[str, ...]] = {}
+    _wildcard_generation = 0
+    _wildcard_lock = threading.Lock()
 
-        data_consumer = RestartableThread(
-            name="data_stream", target=self.consume_data, daemon=True, register=True
+    def __init__(
+        self,
+        vis,
+        dispatch: str | None = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        callback_backlog: int = DEFAULT_CALLBACK_BACKLOG,
+    ) -> None:
+        self._vis = vis
+        self._dispatch = dispatch or os.getenv(
+            ENV_DATA_STREAM_DISPATCH, DISPATCH_EXECUTOR
         )
-        data_consumer.start()
+        self._callback_backlog = callback_backlog
+        self._worker_pool: CallbackWorkerPool | None = None
+        self._signal_worker_pool: CallbackWorkerPool | None = None
+        if self._dispatch == DISPATCH_THREAD:
+            self._max_threads = self._get_max_threads()
+            LOGGER.debug(f"Max threads: {self._max_threads}")
+        else:
+            self._worker_pool = CallbackWorkerPool(max_workers)
+            self._signal_worker_pool = CallbackWorkerPool(
+                max_workers, name="data_stream_signal"
+            )
+            LOGGER.debug(f"Max callback workers: {max_workers}")
+
+        self._statistics = DataStreamStatistics(list(LANE_QUEUE_SIZES))
+        self._data_queues: dict[str, Queue] = {
+            lane: Queue(maxsize=maxsize) for lane, maxsize in LANE_QUEUE_SIZES.items()
+        }
+        for lane in self._data_queues:
+            data_consumer = RestartableThread(
+                name=f"data_stream_{lane}",
+                target=self.consume_data,
+                args=(lane,),
+                daemon=True,
+                register=True,
+            )
+            data_consumer.start()
 
     def _get_max_threads(self) -> int:
         """Get the maximum number of threads allowed."""
@@ -95,37 +277,76 @@ class DataStream:
         except ValueError:
             return 999999
 
-    @staticmethod
-    def publish_data(data_topic: str, data: Any = None) -> None:
-        """Publish data to topic."""
+    def publish_data(
+        self,
+        data_topic: str,
+        data: Any = None,
+        lane: str | None = None,
+        on_drop: Callable[[Any], None] | None = None,
+    ) -> None:
+        """Publish data to topic.
+
+        on_drop is called with data if it is dropped from a full lane before it is
+        delivered.
+        """
         # LOGGER.debug(f"Publishing to data topic {data_topic}, {data}")
-        helpers.pop_if_full(
-            DataStream._data_queue, {"data_topic": data_topic, "data": data}
-        )
+        if lane is None:
+            lane = (
+                LANE_EVENTS
+                if data_topic.startswith(EVENTS_LANE_TOPIC_PREFIXES)
+                else LANE_REALTIME
+            )
+        now = time.monotonic()
+        self._statistics.published(data_topic, now)
+        if helpers.pop_if_full(
+            self._data_queues[lane],
+            {
+                "data_topic": data_topic,
+                "data": data,
+                "published_at": now,
+                "on_drop": on_drop,
+            },
+            logger=LOGGER,
+            name=f"data_stream {lane}",
+            warn=lane in LANE_WARN_ON_DROP,
+            on_drop=_data_item_dropped,
+        ):
+            self._statistics.lane_dropped(lane)
 
     @staticmethod
     def subscribe_data(
-        data_topic: str, callback: Callable | Queue | tornado_queue, ioloop=None
+        data_topic: str,
+        callback: Callable | Queue | tornado_queue,
+        ioloop=None,
+        on_drop: Callable[[Any], None] | None = None,
     ) -> uuid.UUID:
         """Subscribe to data on a topic.
 
+        on_drop is called with data that is dropped because the subscriber is not
+        keeping up.
         Returns a Unique ID which can be used to unsubscribe later.
         """
         LOGGER.debug(f"Subscribing to data topic {data_topic}, {callback}")
         unique_id = uuid.uuid4()
 
         if "*" in data_topic:
-            DataStream._wildcard_subscribers.setdefault(data_topic, {})[
-                unique_id
-            ] = DataSubscriber(
-                callback=callback,
-                ioloop=ioloop,
-            )
+            with DataStream._wildcard_lock:
+                if data_topic not in DataStream._wildcard_subscribers:
+                    DataStream._wildcard_subscribers[data_topic] = {}
+                    DataStream._invalidate_wildcard_matches()
+                DataStream._wildcard_subscribers[data_topic][
+                    unique_id
+                ] = DataSubscriber(
+                    callback=callback,
+                    ioloop=ioloop,
+                    on_drop=on_drop,
+                )
             return unique_id
 
         DataStream._subscribers.setdefault(data_topic, {})[unique_id] = DataSubscriber(
             callback=callback,
             ioloop=ioloop,
+            on_drop=on_drop,
         )
         return unique_id
 
@@ -133,55 +354,243 @@ class DataStream:
     def unsubscribe_data(data_topic: str, unique_id: uuid.UUID) -> None:
         """Unsubscribe from a topic using the Unique ID returned from subscribe_data."""
         LOGGER.debug(f"Unsubscribing from data topic {data_topic}, {unique_id}")
+        DataStream._callback_lanes.pop(unique_id, None)
+        DataStream._subscriber_drops.pop(unique_id, None)
         if "*" in data_topic:
-            DataStream._wildcard_subscribers[data_topic].pop(unique_id)
+            with DataStream._wildcard_lock:
+                DataStream._wildcard_subscribers[data_topic].pop(unique_id)
+                if not DataStream._wildcard_subscribers[data_topic]:
+                    del DataStream._wildcard_subscribers[data_topic]
+                    DataStream._invalidate_wildcard_matches()
             return
 
         DataStream._subscribers[data_topic].pop(unique_id)
 
+    @staticmethod
+    def _invalidate_wildcard_matches() -> None:
+        """Clear the cached topic to wildcard pattern matches."""
+        DataStream._wildcard_generation += 1
+        DataStream._wildcard_matches_cache = {}
+
+    @staticmethod
+    def wildcard_matches(data_topic: str) -> tuple[str, ...]:
+        """Return the wildcard patterns that match data_topic.
+
+        Matches are memoized per topic so fnmatch only runs the first time a topic
+        is seen after a wildcard pattern is added or removed.
+        """
+        cache = DataStream._wildcard_matches_cache
+        if (matches := cache.get(data_topic)) is not None:
+            return matches
+
+        generation = DataStream._wildcard_generation
+        matches = tuple(
+            wildcard_topic
+            for wildcard_topic in DataStream._wildcard_subscribers.copy()
+            if fnmatch.fnmatch(data_topic, wildcard_topic)
+        )
+        # Don't store matches computed against patterns that changed meanwhile
+        if generation == DataStream._wildcard_generation:
+            if len(cache) >= MAX_WILDCARD_CACHE_SIZE:
+                cache.clear()
+            cache[data_topic] = matches
+        return matches
+
+    @staticmethod
+    def dropped_callback_data() -> dict[uuid.UUID, int]:
+        """Return the number of items dropped per callback subscriber."""
+        return {
+            unique_id: lane.dropped
+            for unique_id, lane in DataStream._callback_lanes.copy().items()
+            if lane.dropped
+        }
+
+    def lane_statistics(self, lane: str) -> dict[str, Any]:
+        """Return queue depth, drops and delivery latency of a lane."""
+        data_queue = self._data_queues[lane]
+        return {
+            "depth": data_queue.qsize(),
+            "maxsize": data_queue.maxsize,
+            "dropped": self._statistics.lane_drops[lane],
+            "latency": self._statistics.lane_latency[lane].as_dict(),
+        }
+
+    def statistics(self) -> dict[str, Any]:
+        """Return publish rates, queue depths, drops and delivery latencies."""
+        now = time.monotonic()
+        lanes = {lane: self.lane_statistics(lane) for lane in self._data_queues}
+        topics = {
+            data_topic: topic_statistics.as_dict(now)
+            for data_topic, topic_statistics in self._statistics.topics.copy().items()
+        }
+
+        subscribers = []
+        for subscriptions in (
+            DataStream._subscribers.copy(),
+            DataStream._wildcard_subscribers.copy(),
+        ):
+            for data_topic, callbacks in subscriptions.items():
+                for unique_id, callback in callbacks.copy().items():
+                    callback_lane = DataStream._callback_lanes.get(unique_id)
+                    subscriber_queue = callback["callback"]
+                    if callback_lane:
+                        depth = len(callback_lane.backlog)
+                        dropped = callback_lane.dropped
+                    elif isinstance(subscriber_queue, (Queue, tornado_queue)):
+                        depth = subscriber_queue.qsize()
+                        dropped = DataStream._subscriber_drops.get(unique_id, 0)
+                    else:
+                        depth = 0
+                        dropped = 0
+                    subscribers.append(
+                        {
+                            "unique_id": str(unique_id),
+                            "data_topic": data_topic,
+                            "callback": repr(subscriber_queue),
+                            "depth": depth,
+                            "dropped": dropped,
+                        }
+                    )
+
+        return {"lanes": lanes, "topics": topics, "subscribers": subscribers}
+
+    @staticmethod
+    def has_subscribers(data_topic: str) -> bool:
+        """Return True if anyone is subscribed to data_topic.
+
+        Lets publishers skip building expensive payloads nobody will receive.
+        """
+        if DataStream._subscribers.get(data_topic):
+            return True
+        return any(
+            DataStream._wildcard_subscribers.get(wildcard_topic)
+            for wildcard_topic in DataStream.wildcard_matches(data_topic)
+        )
+
+    def _dispatch_to_worker_pool(
+        self,
+        worker_pool: CallbackWorkerPool,
+        unique_id: uuid.UUID,
+        callback: Callable,
+        on_drop: Callable[[Any], None] | None,
+        data: Any,
+        lane: str | None,
+        published_at: float | None,
+    ) -> None:
+        """Queue data on the subscribers lane and schedule it if it is idle."""
+        callback_lane = DataStream._callback_lanes.get(unique_id)
+        if callback_lane is None:
+            callback_lane = DataStream._callback_lanes.setdefault(
+                unique_id,
+                CallbackLane(
+                    callback, self._callback_backlog, on_drop, self._delivered
+                ),
+            )
+        if callback_lane.push(data, lane, published_at):
+            worker_pool.submit(callback_lane)
+
+    def _delivered(self, lane: str | None, published_at: float | None) -> None:
+        """Record the latency of an item handed to a subscriber."""
+        if lane is not None and published_at is not None:
+            self._statistics.delivered(lane, published_at, time.monotonic())
+
+    @staticmethod
+    def _subscriber_dropped(unique_id: uuid.UUID) -> None:
+        """Count an item dropped from a full subscriber queue."""
+        DataStream._subscriber_drops[unique_id] = (
+            DataStream._subscriber_drops.get(unique_id, 0) + 1
+        )
+
+    def _put_tornado_queue(
+        self,
+        unique_id: uuid.UUID,
+        queue: tornado_queue,
+        data: Any,
+        on_drop: Callable[[Any], None] | None,
+        lane: str | None = None,
+        published_at: float | None = None,
+    ) -> None:
+        """Put data to a Tornado queue from its ioloop."""
+        self._delivered(lane, published_at)
+        if helpers.pop_if_full(queue, data, on_drop=on_drop):
+            self._subscriber_dropped(unique_id)
+
+    def _run_in_thread(self, callback: Callable, data: Any) -> None:
+        """Run callback in a new daemon thread."""
+        if data:
+            thread = threading.Thread(
+                target=callback,
+                args=(data,),
+                daemon=True,
+            )
+        else:
+            thread = threading.Thread(
+                target=callback,
+                daemon=True,
+            )
+
+        while True:
+            # Check if we can start a new thread
+            active_threads = threading.active_count()
+            if active_threads > self._max_threads:
+                time.sleep(0.01)
+                continue
+
+            try:
+                thread.start()
+            except RuntimeError as err:
+                if "can't start new thread" in str(err):
+                    LOGGER.debug(
+                        "Unable to start new thread, "
+                        "Max threads: %s, Active threads: %s",
+                        self._max_threads,
+                        active_threads,
+                    )
+                    self._max_threads = int(active_threads * 0.95)
+                    continue
+            break
+
     def run_callbacks(
         self,
         callbacks: dict[uuid.UUID, DataSubscriber],
         data: Any,
+        data_topic: str = "",
+        lane: str | None = None,
+        published_at: float | None = None,
     ) -> None:
-        """Run callbacks or put to queues."""
-        for callback in callbacks.copy().values():
-            if callable(callback["callback"]) and callback["ioloop"] is None:
-                if data:
-                    thread = threading.Thread(
-                        target=callback["callback"],
-                        args=(data,),
-                        daemon=True,
-                    )
-                else:
-                    thread = threading.Thread(
-                        target=callback["callback"],
-                        daemon=True,
-                    )
+        """Run callbacks or put to queues.
 
-                while True:
-                    # Check if we can start a new thread
-                    active_threads = threading.active_count()
-                    if active_threads > self._max_threads:
-                        time.sleep(0.01)
-                        continue
-
-                    try:
-                        thread.start()
-                    except RuntimeError as err:
-                        if "can't start new thread" in str(err):
-                            LOGGER.debug(
-                                "Unable to start new thread, "
-                                "Max threads: %s, Active threads: %s",
-                                self._max_threads,
-                                active_threads,
-                            )
-                            self._max_threads = int(active_threads * 0.95)
-                            continue
-                    break
+        lane and published_at are used to record the publish to delivery latency.
+        """
+        worker_pool = (
+            self._signal_worker_pool
+            if data_topic.startswith(SIGNAL_TOPIC_PREFIX)
+            else self._worker_pool
+        )
+        for unique_id, callback in callbacks.copy().items():
+            if (
+                callable(callback["callback"])
+                and callback["ioloop"] is None
+                and worker_pool
+            ):
+                self._dispatch_to_worker_pool(
+                    worker_pool,
+                    unique_id,
+                    callback["callback"],
+                    callback["on_drop"],
+                    data,
+                    lane,
+                    published_at,
+                )
+                continue
+
+            if callable(callback["callback"]) and callback["ioloop"] is None:
+                self._delivered(lane, published_at)
+                self._run_in_thread(callback["callback"], data)
                 continue
 
             if callable(callback["callback"]) and callback["ioloop"] is not None:
+                self._delivered(lane, published_at)
                 if data:
                     callback["ioloop"].add_callback(callback["callback"], data)
                 else:
@@ -189,14 +598,24 @@ class DataStream:
                 continue
 
             if isinstance(callback["callback"], Queue):
-                helpers.pop_if_full(callback["callback"], data)
+                self._delivered(lane, published_at)
+                if helpers.pop_if_full(
+                    callback["callback"], data, on_drop=callback["on_drop"]
+                ):
+                    self._subscriber_dropped(unique_id)
                 continue
 
             if callback["ioloop"] is not None and isinstance(
                 callback["callback"], tornado_queue
             ):
                 callback["ioloop"].add_callback(
-                    helpers.pop_if_full, callback["callback"], data
+                    self._put_tornado_queue,
+                    unique_id,
+                    callback["callback"],
+                    data,
+                    callback["on_drop"],
+                    lane,
+                    published_at,
                 )
                 continue
 
@@ -206,27 +625,42 @@ class DataStream:
                 f"Tornado Queue with ioloop supplied, got {type(callback['callback'])}"
             )
 
-    def static_subscriptions(self, data_item: dict[str, Any]) -> None:
+    def static_subscriptions(
+        self, data_item: dict[str, Any], lane: str | None = None
+    ) -> None:
         """Run callbacks for static subscriptions."""
         self.run_callbacks(
             DataStream._subscribers.get(data_item["data_topic"], {}),
             data_item["data"],
+            data_item["data_topic"],
+            lane,
+            data_item.get("published_at"),
         )
 
-    def wildcard_subscriptions(self, data_item: dict[str, Any]) -> None:
+    def wildcard_subscriptions(
+        self, data_item: dict[str, Any], lane: str | None = None
+    ) -> None:
         """Run callbacks for wildcard subscriptions."""
-        for data_topic, callbacks in DataStream._wildcard_subscribers.copy().items():
-            if fnmatch.fnmatch(data_item["data_topic"], data_topic):
+        for data_topic in DataStream.wildcard_matches(data_item["data_topic"]):
+            callbacks = DataStream._wildcard_subscribers.get(data_topic)
+            if callbacks:
                 # LOGGER.debug(
                 #     f"Got data on topic {data_item['data_topic']} "
                 #     f"matching with subscriber on topic {data_topic}"
                 # )
 
-                self.run_callbacks(callbacks, data_item["data"])
+                self.run_callbacks(
+                    callbacks,
+                    data_item["data"],
+                    data_item["data_topic"],
+                    lane,
+                    data_item.get("published_at"),
+                )
 
-    def consume_data(self) -> None:
-        """Publish data to topics."""
+    def consume_data(self, lane: str) -> None:
+        """Publish data from lane to topics."""
+        data_queue = self._data_queues[lane]
         while True:
-            data_item = self._data_queue.get()
-            self.static_subscriptions(data_item)
-            self.wildcard_subscriptions(data_item)
+            data_item = data_queue.get()
+            self.static_subscriptions(data_item, lane)
+            self.wildcard_subscriptions(data_item, lane)
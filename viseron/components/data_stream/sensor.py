@@ -0,0 +1,59 @@
+"""Data stream sensors."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from viseron.helpers.entity.sensor import SensorEntity
+
+if TYPE_CHECKING:
+    from viseron import Viseron
+
+    from . import DataStream
+
+UPDATE_INTERVAL = 30
+
+
+class DataStreamLaneSensor(SensorEntity):
+    """Entity that keeps track of the queue depth of a data stream lane.
+
+    Disabled by default, the same numbers are available through the REST API.
+    """
+
+    def __init__(self, vis: Viseron, data_stream: DataStream, lane: str) -> None:
+        self._vis = vis
+        self._data_stream = data_stream
+        self._lane = lane
+        self.object_id = f"data_stream_{lane}_queue_depth"
+        self.name = f"Data Stream {lane.capitalize()} Queue Depth"
+        self.icon = "mdi:tray-full"
+        self.entity_category = "diagnostic"
+        self.enabled_by_default = False
+        self.volatile = True
+        self._lane_statistics = data_stream.lane_statistics(lane)
+
+    def setup(self) -> None:
+        """Set up state updates."""
+        self._vis.schedule_periodic_update(self, UPDATE_INTERVAL)
+
+    @property
+    def extra_attributes(self):
+        """Return entity attributes."""
+        latency = self._lane_statistics["latency"]
+        return {
+            "maxsize": self._lane_statistics["maxsize"],
+            "dropped": self._lane_statistics["dropped"],
+            "latency_average": latency["average"],
+            "latency_p50": latency["p50"],
+            "latency_p99": latency["p99"],
+            "latency_max": latency["max"],
+        }
+
+    @property
+    def state(self):
+        """Return entity state."""
+        return self._lane_statistics["depth"]
+
+    def update(self) -> None:
+        """Update lane statistics."""
+        self._lane_statistics = self._data_stream.lane_statistics(self._lane)
+        self.set_state()
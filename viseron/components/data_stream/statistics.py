@@ -0,0 +1,139 @@
+"""Statistics for the data_stream component."""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+# Upper bounds in seconds of the publish to delivery latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+RATE_WINDOW = 10
+# Topics kept, the topic that has not been published to for the longest time is
+# forgotten when a new topic is published to
+MAX_TOPICS = 1000
+
+
+class LatencyHistogram:
+    """Histogram of publish to delivery latencies."""
+
+    def __init__(self) -> None:
+        # Last bucket holds latencies above the largest bound
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, latency: float) -> None:
+        """Add a latency to the histogram."""
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.count += 1
+        self.sum += latency
+        self.max = max(self.max, latency)
+
+    def percentile(self, percentile: float) -> float | None:
+        """Return the upper bound of the bucket containing the percentile."""
+        if not self.count:
+            return None
+        target = self.count * percentile / 100
+        cumulative = 0
+        for index, bucket_count in enumerate(self.buckets):
+            cumulative += bucket_count
+            if cumulative >= target:
+                if index < len(LATENCY_BUCKETS):
+                    return LATENCY_BUCKETS[index]
+                return self.max
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return histogram as dict."""
+        return {
+            "buckets": {
+                **{
+                    str(bound): count
+                    for bound, count in zip(LATENCY_BUCKETS, self.buckets)
+                },
+                "+Inf": self.buckets[-1],
+            },
+            "count": self.count,
+            "average": self.sum / self.count if self.count else None,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+        }
+
+
+class TopicStatistics:
+    """Publish counter for a topic.
+
+    The rate is the average number of items per second published during the last
+    complete window of at least RATE_WINDOW seconds.
+    """
+
+    def __init__(self) -> None:
+        self.published = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._rate = 0.0
+
+    def increment(self, now: float) -> None:
+        """Count a published item."""
+        self.published += 1
+        if now - self._window_start >= RATE_WINDOW:
+            self._roll(now)
+        self._window_count += 1
+
+    def _roll(self, now: float) -> None:
+        """Start a new rate window."""
+        self._rate = self._window_count / (now - self._window_start)
+        self._window_start = now
+        self._window_count = 0
+
+    def rate(self, now: float) -> float:
+        """Return published items per second."""
+        if now - self._window_start >= RATE_WINDOW:
+            self._roll(now)
+        return self._rate
+
+    def as_dict(self, now: float) -> dict[str, Any]:
+        """Return topic statistics as dict."""
+        return {
+            "published": self.published,
+            "rate": round(self.rate(now), 2),
+        }
+
+
+class DataStreamStatistics:
+    """Counters kept by DataStream.
+
+    Counters are updated without locking from the publishing and delivering
+    threads. They are meant for monitoring, not accounting, so an occasional lost
+    increment is acceptable. Only adding and evicting topics is locked.
+    """
+
+    def __init__(self, lanes: list[str]) -> None:
+        self.topics: OrderedDict[str, TopicStatistics] = OrderedDict()
+        self._topics_lock = threading.Lock()
+        self.lane_drops = dict.fromkeys(lanes, 0)
+        self.lane_latency = {lane: LatencyHistogram() for lane in lanes}
+
+    def published(self, data_topic: str, now: float) -> None:
+        """Count a published item."""
+        with self._topics_lock:
+            topic_statistics = self.topics.get(data_topic)
+            if topic_statistics is None:
+                if len(self.topics) >= MAX_TOPICS:
+                    self.topics.popitem(last=False)
+                topic_statistics = self.topics[data_topic] = TopicStatistics()
+            else:
+                self.topics.move_to_end(data_topic)
+        topic_statistics.increment(now)
+
+    def delivered(self, lane: str, published_at: float, now: float) -> None:
+        """Record the latency of an item handed to a subscriber."""
+        self.lane_latency[lane].observe(now - published_at)
+
+    def lane_dropped(self, lane: str) -> None:
+        """Count an item dropped from a full lane."""
+        self.lane_drops[lane] += 1
@@ -60,14 +60,15 @@ class ObjectDetector(AbstractObjectDetector):
 
         vis.register_domain(DOMAIN, camera_identifier, self)
 
+    @property
+    def preprocess_resolution(self) -> tuple[int, int] | None:
+        """Return resolution of the frame passed to preprocess."""
+        if self._config[CONFIG_IMAGE_WIDTH] and self._config[CONFIG_IMAGE_HEIGHT]:
+            return self._config[CONFIG_IMAGE_WIDTH], self._config[CONFIG_IMAGE_HEIGHT]
+        return None
+
     def preprocess(self, frame):
         """Preprocess frame before detection."""
-        if self._config[CONFIG_IMAGE_WIDTH] and self._config[CONFIG_IMAGE_HEIGHT]:
-            frame = cv2.resize(
-                frame,
-                (self._config[CONFIG_IMAGE_WIDTH], self._config[CONFIG_IMAGE_HEIGHT]),
-                interpolation=cv2.INTER_LINEAR,
-            )
         return cv2.imencode(".jpg", frame)[1].tobytes()
 
     def postprocess(self, detections):
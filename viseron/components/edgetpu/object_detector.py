@@ -3,7 +3,6 @@ import logging
 import threading
 from queue import Queue
 
-import cv2
 import numpy as np
 
 from viseron import Viseron
@@ -51,13 +50,13 @@ class ObjectDetector(AbstractObjectDetector):
 
         vis.register_domain(DOMAIN, camera_identifier, self)
 
+    @property
+    def preprocess_resolution(self) -> tuple[int, int]:
+        """Return resolution of the frame passed to preprocess."""
+        return self.model_width, self.model_height
+
     def preprocess(self, frame):
         """Return preprocessed frame before performing object detection."""
-        frame = cv2.resize(
-            frame,
-            (self.model_width, self.model_height),
-            interpolation=cv2.INTER_LINEAR,
-        )
         return np.expand_dims(frame, axis=0)
 
     def return_objects(self, frame) -> list[DetectedObject]:
@@ -390,7 +390,9 @@ class Camera(AbstractCamera):
                 empty_frames = 0
                 self._poll_timer = utcnow().timestamp()
                 self._data_stream.publish_data(
-                    self.frame_bytes_topic, self.current_frame
+                    self.frame_bytes_topic,
+                    self.current_frame,
+                    on_drop=self.shared_frames.remove,
                 )
                 continue
 
@@ -1,12 +1,13 @@
 """Class to interact with an FFmpeg stream."""
 from __future__ import annotations
 
+import io
 import json
 import logging
 import os
 import subprocess as sp
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, cast
 
 from tenacity import (
     Retrying,
@@ -472,23 +473,39 @@ class Stream:
         if self._pipe:
             return self._pipe.poll()
 
-    def read(self):
-        """Return a single frame from FFmpeg pipe."""
+    def read(self) -> SharedFrame | None:
+        """Return a single frame from FFmpeg pipe.
+
+        The buffer of a frame that could not be read completely, like at EOF, is
+        returned to the pool.
+        """
+        if not self._pipe or not self._pipe.stdout:
+            return None
+
+        stdout = cast(io.BufferedReader, self._pipe.stdout)
+        shared_frame = SharedFrame(
+            self._color_plane_width,
+            self._color_plane_height,
+            self._pixel_format,
+            (self.width, self.height),
+            self._camera_identifier,
+        )
         try:
-            if self._pipe and self._pipe.stdout:
-                frame_bytes = self._pipe.stdout.read(self._frame_bytes_size)
-                if len(frame_bytes) == self._frame_bytes_size:
-                    shared_frame = SharedFrame(
-                        self._color_plane_width,
-                        self._color_plane_height,
-                        self._pixel_format,
-                        (self.width, self.height),
-                        self._camera_identifier,
-                    )
-                    self._camera.shared_frames.create(shared_frame, frame_bytes)
-                    return shared_frame
+            frame_buffer = self._camera.shared_frames.allocate(
+                shared_frame, self._frame_bytes_size
+            )
+            bytes_read = 0
+            while bytes_read < self._frame_bytes_size:
+                chunk_size = stdout.readinto(frame_buffer[bytes_read:])
+                if not chunk_size:
+                    break
+                bytes_read += chunk_size
+
+            if bytes_read == self._frame_bytes_size:
+                return shared_frame
         except Exception as err:  # pylint: disable=broad-except
             self._logger.error(f"Error reading frame from pipe: {err}")
+        self._camera.shared_frames.remove(shared_frame)
         return None
 
 
@@ -41,7 +41,12 @@ class MotionDetector(AbstractMotionDetectorScanner):
         vis.register_domain(DOMAIN, camera_identifier, self)
 
     def preprocess(self, frame):
-        """Resize the frame to the desired width and height."""
+        """Resize the frame to the desired width and height.
+
+        Frames are usually already scaled to the resolution when they are decoded.
+        """
+        if frame.shape[1::-1] == tuple(self._resolution):
+            return frame
         return cv2.resize(
             frame,
             self._resolution,
@@ -7,7 +7,6 @@ built into domain setup.
 from __future__ import annotations
 
 import logging
-import threading
 import time
 from dataclasses import dataclass
 from queue import Empty, Queue
@@ -15,7 +14,7 @@ from typing import TYPE_CHECKING, Literal
 
 import numpy as np
 
-from viseron.components.data_stream import COMPONENT as DATA_STREAM_COMPONENT
+from viseron.components.data_stream import COMPONENT as DATA_STREAM_COMPONENT, LANE_BULK
 from viseron.components.nvr.const import COMPONENT
 from viseron.const import DOMAIN_IDENTIFIERS, VISERON_SIGNAL_SHUTDOWN
 from viseron.domains.camera.const import DOMAIN as CAMERA_DOMAIN
@@ -228,7 +227,6 @@ class NVR:
         self._idle_frames = 0
         self._kill_received = False
         self._data_stream: DataStream = vis.data[DATA_STREAM_COMPONENT]
-        self._removal_timers: list[threading.Timer] = []
         self._operation_state = None
 
         self._frame_scanners: dict[str, FrameIntervalCalculator] = {}
@@ -310,9 +308,17 @@ class NVR:
                 ),
             )
 
-        self._frame_queue: Queue[SharedFrame] = Queue(maxsize=100)
+        if self._frame_scanners:
+            self.calculate_output_fps(list(self._frame_scanners.values()))
+        self._camera.shared_frames.set_fps(self._camera.output_fps)
+
+        self._frame_queue: Queue[SharedFrame] = Queue(
+            maxsize=self._camera.shared_frames.frame_queue_size
+        )
         self._data_stream.subscribe_data(
-            self._camera.frame_bytes_topic, self._frame_queue
+            self._camera.frame_bytes_topic,
+            self._frame_queue,
+            on_drop=self.remove_frame,
         )
         self._nvr_thread = RestartableThread(
             name=str(self),
@@ -323,9 +329,6 @@ class NVR:
         )
         self._nvr_thread.start()
 
-        if self._frame_scanners:
-            self.calculate_output_fps(list(self._frame_scanners.values()))
-
         vis.data.setdefault(COMPONENT, {})[camera_identifier] = self
         vis.add_entity(COMPONENT, OperationStateSensor(vis, self))
 
@@ -645,14 +648,33 @@ class NVR:
             self._idle_frames = 0
 
     def remove_frame(self, shared_frame) -> None:
-        """Remove frame after a delay.
+        """Drop the NVR reference to the frame, returning its buffer to the pool."""
+        self._camera.shared_frames.remove(shared_frame)
 
-        This makes sure all frames are cleaned up eventually.
+    def publish_processed_frame(self, shared_frame) -> None:
+        """Publish the processed frame if anyone is watching.
+
+        Converting to RGB and copying a full resolution frame is expensive, so it
+        is only done when an MJPEG stream is subscribed to the topic.
         """
-        timer = threading.Timer(
-            2, self._camera.shared_frames.remove, args=(shared_frame,)
+        if not self._data_stream.has_subscribers(self._topic_processed_frame):
+            return
+
+        self._data_stream.publish_data(
+            self._topic_processed_frame,
+            lane=LANE_BULK,
+            data=DataProcessedFrame(
+                frame=self._camera.shared_frames.get_decoded_frame_rgb(
+                    shared_frame
+                ).copy(),
+                objects_in_fov=self._object_detector.objects_in_fov
+                if self._object_detector
+                else None,
+                motion_contours=self._motion_detector.motion_contours
+                if self._motion_detector
+                else None,
+            ),
         )
-        timer.start()
 
     def run(self) -> None:
         """Read frames from camera."""
@@ -677,20 +699,7 @@ class NVR:
 
             self.process_frame(shared_frame)
             self.process_recorder(shared_frame)
-            self._data_stream.publish_data(
-                self._topic_processed_frame,
-                DataProcessedFrame(
-                    frame=self._camera.shared_frames.get_decoded_frame_rgb(
-                        shared_frame
-                    ).copy(),
-                    objects_in_fov=self._object_detector.objects_in_fov
-                    if self._object_detector
-                    else None,
-                    motion_contours=self._motion_detector.motion_contours
-                    if self._motion_detector
-                    else None,
-                ),
-            )
+            self.publish_processed_frame(shared_frame)
             self.remove_frame(shared_frame)
         self._logger.debug("NVR thread stopped")
 
@@ -715,9 +724,6 @@ class NVR:
                 break
             self._camera.shared_frames.remove(shared_frame)
 
-        for timer in self._removal_timers:
-            timer.cancel()
-
     @property
     def camera(self) -> AbstractCamera:
         """Return camera."""
@@ -26,6 +26,8 @@ class OperationStateSensor(CameraSensor):
         self.nvr = nvr
 
         self.entity_category = "diagnostic"
+        # Flips with every detection, not worth a row in the states table
+        self.volatile = True
         self.object_id = f"{nvr.camera.identifier}_operation_state"
         self.name = f"{nvr.camera.name} Operation State"
 
@@ -5,6 +5,7 @@ import copy
 import logging
 import os
 import pathlib
+import threading
 from collections.abc import Callable
 from typing import TYPE_CHECKING, Any, Literal, TypedDict
 
@@ -14,6 +15,7 @@ from alembic.config import Config
 from alembic.migration import MigrationContext
 from sqlalchemy import Engine, create_engine, update
 from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from watchdog.events import FileCreatedEvent, FileDeletedEvent
 
 from viseron.components.storage.config import (
     STORAGE_SCHEMA,
@@ -34,12 +36,17 @@ from viseron.components.storage.const import (
     DEFAULT_COMPONENT,
     DESC_COMPONENT,
 )
-from viseron.components.storage.models import Base, Motion, Recordings
+from viseron.components.storage.fragment_index import FragmentIndex
+from viseron.components.storage.models import Base, Events, Motion, Objects, Recordings
+from viseron.components.storage.mover import FileMover
+from viseron.components.storage.reconciliation import reconcile_files
+from viseron.components.storage.sensor import FileMoverSensor
 from viseron.components.storage.tier_handler import (
     RecordingsTierHandler,
     SegmentsTierHandler,
     SnapshotTierHandler,
     ThumbnailTierHandler,
+    TierHandler,
 )
 from viseron.components.storage.triggers import setup_triggers
 from viseron.components.storage.util import (
@@ -48,6 +55,7 @@ from viseron.components.storage.util import (
     get_snapshots_path,
     get_thumbnails_path,
 )
+from viseron.components.storage.writer import BatchWriter, MotionWriter
 from viseron.const import EVENT_DOMAIN_REGISTERED, VISERON_SIGNAL_STOPPING
 from viseron.domains.camera.const import CONFIG_STORAGE, DOMAIN as CAMERA_DOMAIN
 from viseron.helpers import utcnow
@@ -124,6 +132,7 @@ def setup(vis: Viseron, config: dict[str, Any]) -> bool:
     """Set up storage component."""
     vis.data[COMPONENT] = Storage(vis, config[COMPONENT])
     vis.data[COMPONENT].initialize()
+    vis.add_entity(COMPONENT, FileMoverSensor(vis, vis.data[COMPONENT].file_mover))
     return True
 
 
@@ -165,11 +174,18 @@ class Storage:
         self._camera_tier_handlers: dict[
             str, dict[str, list[dict[str, SnapshotTierHandler | SegmentsTierHandler]]]
         ] = {}
+        self._tier_handlers_by_path: dict[str, TierHandler] = {}
         self.camera_requested_files_count: dict[str, RequestedFilesCount] = {}
+        self._fragment_indexes: dict[str, FragmentIndex] = {}
 
         self.ignored_files: list[str] = []
         self.engine: Engine | None = None
         self._get_session: Callable[[], Session] | None = None
+        self.events_writer = BatchWriter(self.get_session, Events)
+        # Shared by all cameras so detections are committed together
+        self.objects_writer = BatchWriter(self.get_session, Objects)
+        self.motion_writer = MotionWriter(self.get_session)
+        self.file_mover = FileMover()
 
     @property
     def camera_tier_handlers(self):
@@ -335,9 +351,69 @@ class Storage:
         if filename not in self.ignored_files:
             self.ignored_files.append(filename)
 
+    def _get_tier_handler_for_path(self, path: str) -> TierHandler | None:
+        """Return the tier handler monitoring the directory of path."""
+        directory = os.path.dirname(os.path.normpath(path))
+        while directory not in self._tier_handlers_by_path:
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return None
+            directory = parent
+        return self._tier_handlers_by_path[directory]
+
+    def register_file_created(self, path: str) -> None:
+        """Register a file that Viseron has finished writing to a tier.
+
+        The file is handed to the tier handler monitoring the path right away
+        instead of waiting for the filesystem observer to pick it up.
+        """
+        if tier_handler := self._get_tier_handler_for_path(path):
+            tier_handler.on_any_event(FileCreatedEvent(path))
+
+    def register_file_deleted(self, path: str) -> None:
+        """Register a file that Viseron has deleted from a tier."""
+        if tier_handler := self._get_tier_handler_for_path(path):
+            tier_handler.on_any_event(FileDeletedEvent(path))
+
+    def register_file_moved(self, src: str, dst: str) -> None:
+        """Register a file that Viseron has moved, possibly between tiers."""
+        self.register_file_deleted(src)
+        self.register_file_created(dst)
+
+    def get_fragment_index(self, camera_identifier: str) -> FragmentIndex:
+        """Return the HLS fragment index of a camera."""
+        if camera_identifier not in self._fragment_indexes:
+            self._fragment_indexes.setdefault(
+                camera_identifier, FragmentIndex(camera_identifier)
+            )
+        return self._fragment_indexes[camera_identifier]
+
     def _camera_registered(self, event_data: Event[AbstractCamera]) -> None:
         camera = event_data.data
         self.create_tier_handlers(camera)
+        threading.Thread(
+            target=self._reconcile_files,
+            args=(camera.identifier,),
+            name=f"storage_reconcile.{camera.identifier}",
+            daemon=True,
+        ).start()
+
+    def _reconcile_files(self, camera_identifier: str) -> None:
+        """Reconcile the files table with the tier directories of a camera."""
+        try:
+            reconcile_files(
+                self.get_session,
+                camera_identifier,
+                [
+                    tier_handler
+                    for tiers in self._camera_tier_handlers[camera_identifier].values()
+                    for tier in tiers
+                    for tier_handler in tier.values()
+                ],
+                self.get_fragment_index(camera_identifier),
+            )
+        except Exception:  # pylint: disable=broad-except
+            LOGGER.exception(f"Failed to reconcile files of camera {camera_identifier}")
 
     def create_tier_handlers(self, camera: AbstractCamera) -> None:
         """Start observer for camera."""
@@ -359,9 +435,7 @@ class Storage:
                     next_tier = tiers[index + 1]
                 # pylint: disable-next=line-too-long
                 for subcategory in TIER_CATEGORIES[category]:  # type: ignore[literal-required] # noqa: E501
-                    self._camera_tier_handlers[camera.identifier][category][index][
-                        subcategory["subcategory"]
-                    ] = subcategory["tier_handler"](
+                    tier_handler = subcategory["tier_handler"](
                         self._vis,
                         camera,
                         index,
@@ -370,9 +444,19 @@ class Storage:
                         tier,
                         next_tier,
                     )
+                    self._camera_tier_handlers[camera.identifier][category][index][
+                        subcategory["subcategory"]
+                    ] = tier_handler
+                    self._tier_handlers_by_path[
+                        os.path.normpath(tier_handler.path)
+                    ] = tier_handler
 
     def _shutdown(self) -> None:
         """Shutdown."""
+        self.events_writer.stop()
+        self.objects_writer.stop()
+        self.motion_writer.stop()
+        self.file_mover.stop()
         if self.engine:
             self.engine.dispose()
 
@@ -0,0 +1,81 @@
+"""Add indexes for files, files_meta and recordings queries.
+
+Revision ID: c1d3e5f7a9b2
+Revises: 8462ca6851b2
+Create Date: 2024-06-10 20:41:12.481930
+
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str | None = "c1d3e5f7a9b2"
+down_revision: str | None = "8462ca6851b2"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    """Run the upgrade migrations.
+
+    The indexes are created concurrently so that the tables are not locked for
+    writes while existing rows are indexed.
+    """
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_files_camera_category_subcategory_tier",
+            "files",
+            ["camera_identifier", "category", "subcategory", "tier_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_files_recorder_camera_tier",
+            "files",
+            ["camera_identifier", "tier_id"],
+            unique=False,
+            postgresql_where=sa.text("category = 'recorder'"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_files_meta_orig_ctime",
+            "files_meta",
+            ["orig_ctime"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_recordings_camera_start_time",
+            "recordings",
+            ["camera_identifier", "start_time"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Run the downgrade migrations."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_recordings_camera_start_time",
+            table_name="recordings",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_files_meta_orig_ctime",
+            table_name="files_meta",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_files_recorder_camera_tier",
+            table_name="files",
+            postgresql_where=sa.text("category = 'recorder'"),
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_files_camera_category_subcategory_tier",
+            table_name="files",
+            postgresql_concurrently=True,
+        )
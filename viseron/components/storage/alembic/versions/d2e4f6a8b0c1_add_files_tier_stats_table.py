@@ -0,0 +1,71 @@
+"""Add FilesTierStats table.
+
+Revision ID: d2e4f6a8b0c1
+Revises: c1d3e5f7a9b2
+Create Date: 2024-06-12 19:02:47.118204
+
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+from viseron.components.storage.ddl import (
+    FILES_META_TIER_STATS_FUNCTION,
+    FILES_META_TIER_STATS_TRIGGERS,
+    FILES_TIER_STATS_FUNCTION,
+    FILES_TIER_STATS_TRIGGERS,
+)
+from viseron.components.storage.models import UTCDateTime
+
+# revision identifiers, used by Alembic.
+revision: str | None = "d2e4f6a8b0c1"
+down_revision: str | None = "c1d3e5f7a9b2"
+branch_labels: str | None = None
+depends_on: str | None = None
+
+
+def upgrade() -> None:
+    """Run the upgrade migrations."""
+    op.create_table(
+        "files_tier_stats",
+        sa.Column("camera_identifier", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("subcategory", sa.String(), nullable=False, server_default=""),
+        sa.Column("tier_id", sa.Integer(), nullable=False),
+        sa.Column("total_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("file_count", sa.Integer(), nullable=False),
+        sa.Column("oldest_orig_ctime", UTCDateTime(), nullable=True),
+        sa.PrimaryKeyConstraint(
+            "camera_identifier", "category", "subcategory", "tier_id"
+        ),
+    )
+    op.execute(
+        """
+        INSERT INTO files_tier_stats (
+            camera_identifier, category, subcategory, tier_id
+           ,total_bytes, file_count, oldest_orig_ctime
+        )
+        SELECT f.camera_identifier, f.category, coalesce(f.subcategory, ''), f.tier_id
+              ,sum(f.size), count(*), min(fm.orig_ctime)
+          FROM files f
+     LEFT JOIN files_meta fm
+            ON fm.path = f.path
+      GROUP BY f.camera_identifier, f.category, coalesce(f.subcategory, ''), f.tier_id
+        """
+    )
+    op.execute(FILES_TIER_STATS_FUNCTION)
+    op.execute(FILES_META_TIER_STATS_FUNCTION)
+    for statement in FILES_TIER_STATS_TRIGGERS + FILES_META_TIER_STATS_TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Run the downgrade migrations."""
+    for table in ("files", "files_meta"):
+        op.execute(f"DROP TRIGGER files_tier_stats_insert ON {table}")
+        op.execute(f"DROP TRIGGER files_tier_stats_update ON {table}")
+    op.execute("DROP TRIGGER files_tier_stats_delete ON files")
+    op.execute("DROP FUNCTION files_tier_stats_files")
+    op.execute("DROP FUNCTION files_tier_stats_files_meta")
+    op.drop_table("files_tier_stats")
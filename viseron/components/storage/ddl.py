@@ -0,0 +1,117 @@
+"""Database functions and triggers created together with the tables.
+
+The tier stats triggers keep the files_tier_stats table up to date with the total
+size, number of files and the oldest orig_ctime of each camera, category,
+subcategory and tier. They are statement level triggers using transition tables so
+that inserting or deleting many files at once only updates each row of
+files_tier_stats once.
+
+Files without a subcategory are counted with an empty subcategory, since it is part
+of the primary key of files_tier_stats.
+
+oldest_orig_ctime is only lowered by the triggers. When files are deleted it becomes
+a lower bound which is refreshed by the tier handler after it has moved files.
+"""
+from __future__ import annotations
+
+FILES_TIER_STATS_FUNCTION = """
+CREATE OR REPLACE FUNCTION files_tier_stats_files() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE files_tier_stats s
+           SET total_bytes = s.total_bytes - o.total_bytes
+              ,file_count = s.file_count - o.file_count
+          FROM (
+              SELECT camera_identifier, category
+                    ,coalesce(subcategory, '') AS subcategory, tier_id
+                    ,sum(size) AS total_bytes
+                    ,count(*) AS file_count
+                FROM old_rows
+            GROUP BY camera_identifier, category, coalesce(subcategory, ''), tier_id
+          ) o
+         WHERE s.camera_identifier = o.camera_identifier
+           AND s.category = o.category
+           AND s.subcategory = o.subcategory
+           AND s.tier_id = o.tier_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO files_tier_stats AS s (
+            camera_identifier, category, subcategory, tier_id
+           ,total_bytes, file_count, oldest_orig_ctime
+        )
+        SELECT n.camera_identifier, n.category, coalesce(n.subcategory, ''), n.tier_id
+              ,sum(n.size), count(*), min(fm.orig_ctime)
+          FROM new_rows n
+     LEFT JOIN files_meta fm
+            ON fm.path = n.path
+      GROUP BY n.camera_identifier, n.category, coalesce(n.subcategory, ''), n.tier_id
+        ON CONFLICT (camera_identifier, category, subcategory, tier_id) DO UPDATE
+           SET total_bytes = s.total_bytes + EXCLUDED.total_bytes
+              ,file_count = s.file_count + EXCLUDED.file_count
+              ,oldest_orig_ctime = LEAST(
+                   s.oldest_orig_ctime, EXCLUDED.oldest_orig_ctime
+               );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+FILES_META_TIER_STATS_FUNCTION = """
+CREATE OR REPLACE FUNCTION files_tier_stats_files_meta() RETURNS trigger AS $$
+BEGIN
+    UPDATE files_tier_stats s
+       SET oldest_orig_ctime = LEAST(s.oldest_orig_ctime, m.oldest_orig_ctime)
+      FROM (
+          SELECT f.camera_identifier, f.category
+                ,coalesce(f.subcategory, '') AS subcategory, f.tier_id
+                ,min(n.orig_ctime) AS oldest_orig_ctime
+            FROM new_rows n
+            JOIN files f
+              ON f.path = n.path
+        GROUP BY f.camera_identifier, f.category, coalesce(f.subcategory, ''), f.tier_id
+      ) m
+     WHERE s.camera_identifier = m.camera_identifier
+       AND s.category = m.category
+       AND s.subcategory = m.subcategory
+       AND s.tier_id = m.tier_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+FILES_TIER_STATS_TRIGGERS = [
+    """
+CREATE TRIGGER files_tier_stats_insert
+ AFTER INSERT ON files
+ REFERENCING NEW TABLE AS new_rows
+   FOR EACH STATEMENT EXECUTE FUNCTION files_tier_stats_files();
+""",
+    """
+CREATE TRIGGER files_tier_stats_update
+ AFTER UPDATE ON files
+ REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+   FOR EACH STATEMENT EXECUTE FUNCTION files_tier_stats_files();
+""",
+    """
+CREATE TRIGGER files_tier_stats_delete
+ AFTER DELETE ON files
+ REFERENCING OLD TABLE AS old_rows
+   FOR EACH STATEMENT EXECUTE FUNCTION files_tier_stats_files();
+""",
+]
+
+FILES_META_TIER_STATS_TRIGGERS = [
+    """
+CREATE TRIGGER files_tier_stats_insert
+ AFTER INSERT ON files_meta
+ REFERENCING NEW TABLE AS new_rows
+   FOR EACH STATEMENT EXECUTE FUNCTION files_tier_stats_files_meta();
+""",
+    """
+CREATE TRIGGER files_tier_stats_update
+ AFTER UPDATE ON files_meta
+ REFERENCING NEW TABLE AS new_rows
+   FOR EACH STATEMENT EXECUTE FUNCTION files_tier_stats_files_meta();
+""",
+]
@@ -0,0 +1,355 @@
+"""In-memory index of the HLS fragments of a camera."""
+from __future__ import annotations
+
+import bisect
+import datetime
+import logging
+import os
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from viseron.components.storage.queries import (
+    MAX_FRAGMENT_DURATION,
+    coverage_query,
+    get_time_period_fragments,
+)
+from viseron.helpers import utcnow
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+LOGGER = logging.getLogger(__name__)
+
+# Fragments older than this are looked up in the database instead
+INDEX_RETENTION = datetime.timedelta(days=1)
+# Fragments that have fallen out of the retention are dropped in chunks this long
+PRUNE_INTERVAL = datetime.timedelta(hours=1)
+SECONDS_PER_DAY = 86400
+
+
+@dataclass
+class IndexedFragment:
+    """A fragment in the index.
+
+    A fragment is briefly stored in two tiers while it is moved. paths holds all
+    of them and path the one that was added last, matching the row that
+    time_period_fragments_query picks.
+    """
+
+    filename: str
+    path: str
+    duration: float
+    orig_ctime: datetime.datetime
+    paths: list[str] = field(default_factory=list)
+
+    @property
+    def sequence(self) -> int:
+        """Return the fragments position in time.
+
+        Derived from orig_ctime so that it is the same whether the fragment is
+        served from the index or queried from the database.
+        """
+        return int(self.orig_ctime.timestamp() * 1000)
+
+
+@dataclass
+class Timespan:
+    """A time period covered by consecutive fragments."""
+
+    start: float
+    end: float
+    # Duration of the first fragment, decides if the timespan continues the
+    # previous one
+    first_duration: float
+
+    def continues(self, previous: Timespan) -> bool:
+        """Return if the gap to the previous timespan is short enough to join it."""
+        return self.start <= previous.end + self.first_duration
+
+
+class CoverageTimeline:
+    """Recorded timespans of a camera, kept per UTC day.
+
+    Days are loaded from the database the first time they are requested and are
+    then extended as fragments are added. Days that fragments are deleted from
+    are reloaded the next time they are requested.
+    """
+
+    def __init__(self, camera_identifier: str) -> None:
+        self._camera_identifier = camera_identifier
+        self._lock = threading.Lock()
+        self._days: dict[int, list[Timespan]] = {}
+        # Days from this one onwards are loaded, None until the first request
+        self._loaded_from: int | None = None
+        self._stale: set[int] = set()
+
+    def add(self, start: float, duration: float) -> None:
+        """Add a fragment to the timespans of its day."""
+        day = int(start // SECONDS_PER_DAY)
+        with self._lock:
+            if self._loaded_from is None or day < self._loaded_from:
+                return
+            timespans = self._days.setdefault(day, [])
+            index = bisect.bisect_right(
+                timespans, start, key=lambda timespan: timespan.start
+            )
+            if index and start <= timespans[index - 1].end + duration:
+                index -= 1
+                timespans[index].end = max(timespans[index].end, start + duration)
+            else:
+                timespans.insert(index, Timespan(start, start + duration, duration))
+            # The fragment can close the gap to the following timespans
+            while index + 1 < len(timespans) and timespans[index + 1].continues(
+                timespans[index]
+            ):
+                timespans[index].end = max(
+                    timespans[index].end, timespans.pop(index + 1).end
+                )
+
+    def invalidate(self, paths: list[str]) -> None:
+        """Mark the days of deleted fragments to be reloaded."""
+        with self._lock:
+            for path in paths:
+                try:
+                    day = int(os.path.basename(path).split(".")[0]) // SECONDS_PER_DAY
+                except ValueError:
+                    continue
+                if day in self._days:
+                    self._stale.add(day)
+
+    def _load(
+        self, get_session: Callable[[], Session], first_day: int, last_day: int
+    ) -> None:
+        """Replace the timespans of the days between first_day and last_day."""
+        stmt = coverage_query(
+            self._camera_identifier,
+            first_day * SECONDS_PER_DAY,
+            (last_day + 1) * SECONDS_PER_DAY - 1,
+        )
+        with get_session() as session:
+            rows = session.execute(stmt).all()
+        for day in range(first_day, last_day + 1):
+            self._days.pop(day, None)
+        for row in rows:
+            self._days.setdefault(row.day, []).append(
+                Timespan(float(row.start), float(row.end), float(row.first_duration))
+            )
+
+    def timespans(
+        self,
+        get_session: Callable[[], Session],
+        time_from: int,
+        time_to: int | None = None,
+    ) -> list[dict[str, int]]:
+        """Return the recorded timespans within the time period."""
+        today = int(utcnow().timestamp() // SECONDS_PER_DAY)
+        first_day = int(
+            (time_from - MAX_FRAGMENT_DURATION.total_seconds()) // SECONDS_PER_DAY
+        )
+        last_day = min(time_to // SECONDS_PER_DAY, today) if time_to else today
+        with self._lock:
+            if self._loaded_from is None:
+                self._load(get_session, first_day, today)
+                self._loaded_from = first_day
+            elif first_day < self._loaded_from:
+                self._load(get_session, first_day, self._loaded_from - 1)
+                self._loaded_from = first_day
+            for day in sorted(self._stale):
+                self._load(get_session, day, day)
+            self._stale.clear()
+
+            timespans: list[Timespan] = []
+            for day in range(first_day, last_day + 1):
+                for timespan in self._days.get(day, []):
+                    if timespans and timespan.continues(timespans[-1]):
+                        timespans[-1].end = max(timespans[-1].end, timespan.end)
+                    else:
+                        timespans.append(
+                            Timespan(
+                                timespan.start, timespan.end, timespan.first_duration
+                            )
+                        )
+
+        result = []
+        for timespan in timespans:
+            start = max(timespan.start, time_from)
+            end = min(timespan.end, time_to) if time_to else timespan.end
+            if start > end:
+                continue
+            result.append(
+                {"start": int(start), "end": int(end), "duration": int(end - start)}
+            )
+        return result
+
+
+class FragmentIndex:
+    """Time ordered fragments of a camera, used to serve HLS playlists.
+
+    The fragmenter adds fragments as they are written and the tier handlers move
+    and remove them, so live playlists can be generated without querying the
+    database. The index is loaded from the database on first use and covers the
+    last INDEX_RETENTION, older time periods are queried from the database.
+    """
+
+    def __init__(self, camera_identifier: str) -> None:
+        self._camera_identifier = camera_identifier
+        self._lock = threading.Lock()
+        # Parallel lists sorted by orig_ctime, _times holds the timestamps for bisect
+        self._times: list[float] = []
+        self._fragments: list[IndexedFragment] = []
+        self._by_filename: dict[str, IndexedFragment] = {}
+        # Timestamp from which the index is complete, None until loaded
+        self._covered_from: float | None = None
+        self.init_file: str | None = None
+        self.coverage = CoverageTimeline(camera_identifier)
+
+    def __len__(self) -> int:
+        """Return the number of fragments in the index."""
+        return len(self._fragments)
+
+    def _add(self, path: str, duration: float, orig_ctime: datetime.datetime) -> None:
+        filename = os.path.basename(path)
+        if fragment := self._by_filename.get(filename):
+            if path in fragment.paths:
+                fragment.paths.remove(path)
+            fragment.paths.append(path)
+            fragment.path = path
+            return
+
+        fragment = IndexedFragment(filename, path, duration, orig_ctime, [path])
+        timestamp = orig_ctime.timestamp()
+        index = bisect.bisect_right(self._times, timestamp)
+        self._times.insert(index, timestamp)
+        self._fragments.insert(index, fragment)
+        self._by_filename[filename] = fragment
+
+    def add(self, path: str, duration: float, orig_ctime: datetime.datetime) -> None:
+        """Add a fragment, or a new copy of a fragment that is being moved."""
+        if duration <= 0:
+            return
+        with self._lock:
+            self._add(path, duration, orig_ctime)
+        self.coverage.add(orig_ctime.timestamp(), duration)
+
+    def move(self, src: str, dst: str) -> None:
+        """Replace the path of a fragment that has been moved to another tier."""
+        with self._lock:
+            fragment = self._by_filename.get(os.path.basename(src))
+            if fragment is None or src not in fragment.paths:
+                return
+            fragment.paths[fragment.paths.index(src)] = dst
+            fragment.path = fragment.paths[-1]
+
+    def remove(self, paths: list[str]) -> None:
+        """Remove fragments whose files have been deleted.
+
+        Fragments that are still stored in another tier are kept.
+        """
+        deleted = []
+        with self._lock:
+            for path in paths:
+                fragment = self._by_filename.get(os.path.basename(path))
+                if fragment is None:
+                    # Older than the index, might have been the last copy
+                    deleted.append(path)
+                    continue
+                if path not in fragment.paths:
+                    continue
+                fragment.paths.remove(path)
+                if fragment.paths:
+                    fragment.path = fragment.paths[-1]
+                    continue
+                deleted.append(path)
+                del self._by_filename[fragment.filename]
+                timestamp = fragment.orig_ctime.timestamp()
+                index = bisect.bisect_left(self._times, timestamp)
+                while self._fragments[index] is not fragment:
+                    index += 1
+                del self._times[index]
+                del self._fragments[index]
+        if deleted:
+            self.coverage.invalidate(deleted)
+
+    def _load(self, get_session: Callable[[], Session]) -> None:
+        """Load the fragments of the last INDEX_RETENTION from the database."""
+        covered_from = (utcnow() - INDEX_RETENTION).timestamp()
+        files = get_time_period_fragments(
+            self._camera_identifier, int(covered_from), None, get_session
+        )
+        for file in files:
+            self._add(file.path, float(file.meta["m3u8"]["EXTINF"]), file.orig_ctime)
+        self._covered_from = covered_from
+        LOGGER.debug(
+            f"Loaded {len(files)} fragments of camera {self._camera_identifier}"
+        )
+
+    def _prune(self) -> None:
+        """Drop fragments that have fallen out of the retention."""
+        assert self._covered_from is not None
+        cutoff = (utcnow() - INDEX_RETENTION).timestamp()
+        if cutoff - self._covered_from < PRUNE_INTERVAL.total_seconds():
+            return
+        index = bisect.bisect_left(self._times, cutoff)
+        for fragment in self._fragments[:index]:
+            del self._by_filename[fragment.filename]
+        del self._times[:index]
+        del self._fragments[:index]
+        self._covered_from = cutoff
+
+    def _fragments_in_period(
+        self, start_timestamp: int, end_timestamp: int | None
+    ) -> list[IndexedFragment]:
+        """Return the fragments that overlap the time period."""
+        start = bisect.bisect_left(self._times, start_timestamp)
+        end = (
+            bisect.bisect_right(self._times, end_timestamp)
+            if end_timestamp
+            else len(self._times)
+        )
+        # Include fragments that start before the time period but end within it
+        first = start
+        min_timestamp = start_timestamp - MAX_FRAGMENT_DURATION.total_seconds()
+        while first > 0 and self._times[first - 1] >= min_timestamp:
+            first -= 1
+        return [
+            fragment
+            for fragment in self._fragments[first:start]
+            if fragment.orig_ctime.timestamp() + fragment.duration >= start_timestamp
+        ] + self._fragments[start:end]
+
+    def fragments(
+        self,
+        get_session: Callable[[], Session],
+        start_timestamp: int,
+        end_timestamp: int | None = None,
+    ) -> list[IndexedFragment]:
+        """Return the fragments of the time period ordered by orig_ctime.
+
+        Time periods that start before the index is complete are queried from the
+        database.
+        """
+        with self._lock:
+            if self._covered_from is None:
+                self._load(get_session)
+            self._prune()
+            assert self._covered_from is not None
+            if (
+                start_timestamp - MAX_FRAGMENT_DURATION.total_seconds()
+                >= self._covered_from
+            ):
+                return self._fragments_in_period(start_timestamp, end_timestamp)
+
+        return [
+            IndexedFragment(
+                file.filename,
+                file.path,
+                float(file.meta["m3u8"]["EXTINF"]),
+                file.orig_ctime,
+                [file.path],
+            )
+            for file in get_time_period_fragments(
+                self._camera_identifier, start_timestamp, end_timestamp, get_session
+            )
+        ]
@@ -5,12 +5,31 @@ import datetime
 from collections.abc import Callable
 from typing import Literal
 
-from sqlalchemy import DateTime, Float, Integer, LargeBinary, String, types
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    event,
+    text,
+    types,
+)
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
 from sqlalchemy.sql import expression
 
+from viseron.components.storage.ddl import (
+    FILES_META_TIER_STATS_FUNCTION,
+    FILES_META_TIER_STATS_TRIGGERS,
+    FILES_TIER_STATS_FUNCTION,
+    FILES_TIER_STATS_TRIGGERS,
+)
+
 ColumnMeta = dict[str, str]
 
 
@@ -72,6 +91,25 @@ class Files(Base):
     created_at = mapped_column(UTCDateTime(timezone=False), server_default=UTCNow())
     updated_at = mapped_column(UTCDateTime(timezone=False), onupdate=UTCNow())
 
+    __table_args__ = (
+        # Used by the tier handler queries that select files to move or delete
+        Index(
+            "ix_files_camera_category_subcategory_tier",
+            "camera_identifier",
+            "category",
+            "subcategory",
+            "tier_id",
+        ),
+        # Used by the recordings tier handler and HLS queries which always select
+        # recorder files
+        Index(
+            "ix_files_recorder_camera_tier",
+            "camera_identifier",
+            "tier_id",
+            postgresql_where=text("category = 'recorder'"),
+        ),
+    )
+
 
 class FilesMeta(Base):
     """Database model for files metadata.
@@ -88,6 +126,38 @@ class FilesMeta(Base):
     created_at = mapped_column(UTCDateTime(timezone=False), server_default=UTCNow())
     updated_at = mapped_column(UTCDateTime(timezone=False), onupdate=UTCNow())
 
+    __table_args__ = (
+        # Used to find files within a time period
+        Index("ix_files_meta_orig_ctime", "orig_ctime"),
+    )
+
+
+class FilesTierStats(Base):
+    """Database model for the total size and age of files in a tier.
+
+    Maintained by database triggers on files and files_meta.
+    """
+
+    __tablename__ = "files_tier_stats"
+
+    camera_identifier: Mapped[str] = mapped_column(String, primary_key=True)
+    category: Mapped[str] = mapped_column(String, primary_key=True)
+    subcategory: Mapped[str] = mapped_column(
+        String, primary_key=True, server_default=""
+    )
+    tier_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    total_bytes: Mapped[int] = mapped_column(BigInteger)
+    file_count: Mapped[int] = mapped_column(Integer)
+    oldest_orig_ctime: Mapped[datetime.datetime | None] = mapped_column(
+        UTCDateTime(timezone=False), nullable=True
+    )
+
+
+for _statement in [FILES_TIER_STATS_FUNCTION, *FILES_TIER_STATS_TRIGGERS]:
+    event.listen(Files.__table__, "after_create", DDL(_statement))
+for _statement in [FILES_META_TIER_STATS_FUNCTION, *FILES_META_TIER_STATS_TRIGGERS]:
+    event.listen(FilesMeta.__table__, "after_create", DDL(_statement))
+
 
 class Recordings(Base):
     """Database model for recordings."""
@@ -108,6 +178,11 @@ class Recordings(Base):
     thumbnail_path: Mapped[str] = mapped_column(String, nullable=True)
     clip_path: Mapped[str] = mapped_column(String, nullable=True)
 
+    __table_args__ = (
+        # Used to match files to the recording they belong to
+        Index("ix_recordings_camera_start_time", "camera_identifier", "start_time"),
+    )
+
     def get_fragments(
         self, lookback: float, get_session: Callable[[], Session], now=None
     ):
@@ -0,0 +1,196 @@
+"""Move files between tiers."""
+from __future__ import annotations
+
+import errno
+import logging
+import os
+import shutil
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from queue import Queue
+from typing import Any
+
+from viseron.watchdog.thread_watchdog import RestartableThread
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MOVE_WORKERS = 4
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+METHOD_LINK = "link"
+METHOD_COPY = "copy"
+
+# Errors raised by os.copy_file_range when the kernel or filesystems do not support
+# copying between the source and destination
+COPY_FILE_RANGE_UNSUPPORTED = (
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.EPERM,
+)
+
+
+@dataclass
+class TransferResult:
+    """Result of a file transfer."""
+
+    method: str
+    size: int
+    duration: float
+
+
+@dataclass
+class TransferStatistics:
+    """Accumulated transfers to a tier."""
+
+    files: int = 0
+    bytes: int = 0
+    duration: float = 0.0
+    linked: int = 0
+    copied: int = 0
+
+    def add(self, result: TransferResult) -> None:
+        """Add a transfer."""
+        self.files += 1
+        self.bytes += result.size
+        self.duration += result.duration
+        if result.method == METHOD_LINK:
+            self.linked += 1
+        else:
+            self.copied += 1
+
+    @property
+    def throughput(self) -> float:
+        """Return bytes per second spent transferring."""
+        return self.bytes / self.duration if self.duration else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return statistics as dict."""
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "duration": round(self.duration, 3),
+            "linked": self.linked,
+            "copied": self.copied,
+            "throughput": round(self.throughput),
+        }
+
+
+def _copy_file_range(src: str, dst: str) -> None:
+    """Copy file contents without passing them through user space."""
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        while os.copy_file_range(fsrc.fileno(), fdst.fileno(), COPY_CHUNK_SIZE):
+            pass
+
+
+def copy_file(src: str, dst: str) -> None:
+    """Copy file and permission bits from src to dst.
+
+    Uses copy_file_range where the kernel supports it between the two
+    filesystems, otherwise shutil.copy which uses sendfile on Linux.
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            _copy_file_range(src, dst)
+        except OSError as error:
+            if error.errno not in COPY_FILE_RANGE_UNSUPPORTED:
+                raise
+        else:
+            shutil.copymode(src, dst)
+            return
+    shutil.copy(src, dst)
+
+
+def transfer_file(src: str, dst: str) -> TransferResult:
+    """Move a file from src to dst.
+
+    The file is always available at src or dst, which avoids a 404 if the file is
+    requested while it is being moved. On the same filesystem the file is hard
+    linked to dst before src is removed, otherwise it is copied. A rename is not
+    used since the tier handlers would see it as a move and not as a deletion in
+    the old tier and a creation in the new tier.
+    """
+    started = time.monotonic()
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    src_stat = os.stat(src)
+
+    method = METHOD_COPY
+    if src_stat.st_dev == os.stat(os.path.dirname(dst)).st_dev:
+        try:
+            os.link(src, dst)
+            method = METHOD_LINK
+        except FileExistsError:
+            # Left behind by a previous move that failed, overwrite it
+            os.remove(dst)
+            os.link(src, dst)
+            method = METHOD_LINK
+        except OSError as error:
+            LOGGER.debug(f"Failed to link {src} to {dst}, copying: {error}")
+
+    if method == METHOD_COPY:
+        copy_file(src, dst)
+    os.remove(src)
+    return TransferResult(method, src_stat.st_size, time.monotonic() - started)
+
+
+class FileMover:
+    """Pool of worker threads that move and delete files.
+
+    Moves within a filesystem are instant, but copying to another disk can take a
+    long time, so each tier check submits its files here and waits for them.
+    Statistics are kept per destination tier path.
+    """
+
+    def __init__(self, workers: int = DEFAULT_MOVE_WORKERS) -> None:
+        self._queue: Queue[tuple[Future, Callable[..., Any], tuple] | None] = Queue()
+        self._statistics: dict[str, TransferStatistics] = {}
+        self._threads = [
+            RestartableThread(
+                name=f"storage_file_mover.{index}",
+                target=self._run,
+                daemon=True,
+                register=True,
+            )
+            for index in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, function: Callable[..., Any], *args: Any) -> Future:
+        """Run function in a worker thread."""
+        future: Future = Future()
+        self._queue.put((future, function, args))
+        return future
+
+    def _run(self) -> None:
+        """Run submitted functions until stopped."""
+        while (job := self._queue.get()) is not None:
+            future, function, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(*args))
+            except BaseException as error:
+                future.set_exception(error)
+
+    def record(self, tier_path: str, result: TransferResult) -> None:
+        """Add a transfer to the statistics of a tier."""
+        self._statistics.setdefault(tier_path, TransferStatistics()).add(result)
+
+    def statistics(self) -> dict[str, dict[str, Any]]:
+        """Return transfer statistics per destination tier path."""
+        return {
+            tier_path: statistics.as_dict()
+            for tier_path, statistics in self._statistics.copy().items()
+        }
+
+    def stop(self) -> None:
+        """Stop the workers once the submitted functions have run."""
+        for thread in self._threads:
+            thread.stop()
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
@@ -8,18 +8,21 @@ from collections.abc import Callable
 from sqlalchemy import (
     Float,
     Integer,
+    Select,
     String,
     TextualSelect,
     and_,
+    case,
     cast,
     column,
     desc,
+    extract,
     func,
     or_,
     select,
     text,
 )
-from sqlalchemy.dialects.postgresql import INTERVAL
+from sqlalchemy.dialects.postgresql import INTERVAL, aggregate_order_by, array_agg
 from sqlalchemy.orm import Session
 from sqlalchemy.sql.functions import coalesce, concat
 
@@ -28,6 +31,8 @@ from viseron.helpers import utcnow
 
 LOGGER = logging.getLogger(__name__)
 
+MAX_FRAGMENT_DURATION = datetime.timedelta(minutes=10)
+
 
 def files_to_move_query(
     category: str,
@@ -58,36 +63,26 @@ def files_to_move_query(
             """--sql
         WITH size_sum AS (
             SELECT f.id
-                  ,f.tier_id
                   ,f.tier_path
-                  ,f.camera_identifier
-                  ,f.category
-                  ,f.subcategory
                   ,f.path
                   ,fm.orig_ctime
-                  ,sum(f.size) FILTER (
-                      WHERE f.category = :category
-                        AND f.subcategory = :subcategory
-                        AND f.tier_id = :tier_id
-                        AND f.camera_identifier = :camera_identifier
-                  ) OVER win1 AS total_bytes
+                  ,sum(f.size) OVER (
+                      ORDER BY fm.orig_ctime DESC
+                      RANGE BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                  ) AS total_bytes
               FROM files f
               JOIN files_meta fm
                 ON f.path = fm.path
-            WINDOW win1 AS (
-                PARTITION BY f.category, f.tier_id
-                ORDER BY fm.orig_ctime DESC
-                RANGE BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
-            )
-            ORDER BY fm.orig_ctime DESC
+             -- Filter before the window function so that the
+             -- ix_files_camera_category_subcategory_tier index can be used
+             WHERE f.category = :category
+               AND f.subcategory = :subcategory
+               AND f.tier_id = :tier_id
+               AND f.camera_identifier = :camera_identifier
         )
         SELECT id, path, tier_path
           FROM size_sum
-         WHERE tier_id = :tier_id
-           AND camera_identifier = :camera_identifier
-           AND category = :category
-           AND subcategory = :subcategory
-           AND (
+         WHERE (
                :max_bytes > 0 AND
                total_bytes >= :max_bytes AND
                orig_ctime <= to_timestamp(:min_age_timestamp) AT TIME ZONE 'UTC'
@@ -117,6 +112,38 @@ def files_to_move_query(
     )
 
 
+def oldest_files_query(
+    category: str,
+    subcategory: str,
+    tier_id: int,
+    camera_identifier: str,
+    limit: int,
+    offset: int = 0,
+) -> Select:
+    """Return query for the oldest files of a tier, ordered by orig_ctime.
+
+    Unlike files_to_move_query it does not sum the size of every file in the tier,
+    so only limit files have to be read.
+    """
+    return (
+        select(
+            Files.id,
+            Files.path,
+            Files.tier_path,
+            Files.size,
+            FilesMeta.orig_ctime,
+        )
+        .join(FilesMeta, Files.path == FilesMeta.path)
+        .where(Files.category == category)
+        .where(Files.subcategory == subcategory)
+        .where(Files.tier_id == tier_id)
+        .where(Files.camera_identifier == camera_identifier)
+        .order_by(FilesMeta.orig_ctime, Files.id)
+        .limit(limit)
+        .offset(offset)
+    )
+
+
 def recordings_to_move_query(
     segment_length: int,
     tier_id: int,
@@ -147,7 +174,25 @@ def recordings_to_move_query(
     return (
         text(
             """--sql
-        WITH recording_files as (
+        -- Match files to recordings starting from the recordings, which lets each
+        -- recording look up its files using the ix_files_meta_orig_ctime index
+        WITH recording_matches AS (
+            SELECT meta.path
+                  ,r.id as recording_id
+                  ,r.created_at as recording_created_at
+              FROM recordings r
+              JOIN files_meta meta
+                ON meta.orig_ctime BETWEEN
+                    r.start_time - INTERVAL ':lookback sec'
+                                 - INTERVAL ':segment_length sec' AND
+                    COALESCE(
+                        r.end_time + INTERVAL ':segment_length sec',
+                        now() AT TIME ZONE 'UTC'
+                    )
+             WHERE r.camera_identifier = :camera_identifier
+        ),
+
+        recording_files as (
             SELECT f.id as file_id
                   ,f.tier_id
                   ,f.tier_path
@@ -156,18 +201,14 @@ def recordings_to_move_query(
                   ,f.subcategory
                   ,f.path
                   ,f.size
-                  ,r.id as recording_id
-                  ,r.created_at as recording_created_at
+                  ,rm.recording_id
+                  ,rm.recording_created_at
                   ,meta.orig_ctime
               FROM files f
               JOIN files_meta meta
                 ON f.path = meta.path
-         LEFT JOIN recordings r
-                ON f.camera_identifier = r.camera_identifier
-               AND meta.orig_ctime BETWEEN
-                    r.start_time - INTERVAL ':lookback sec'
-                                 - INTERVAL ':segment_length sec' AND
-                    COALESCE(r.end_time + INTERVAL ':segment_length sec', now())
+         LEFT JOIN recording_matches rm
+                ON f.path = rm.path
              WHERE f.category = 'recorder'
                -- Count the size of both segments, thumbnails and recordings
                AND f.subcategory IN ('segments', 'thumbnails', 'recordings')
@@ -314,14 +355,13 @@ def get_recording_fragments(
     return fragments
 
 
-def get_time_period_fragments(
+def time_period_fragments_query(
     camera_identifier: str,
     start_timestamp: int,
     end_timestamp: int | None,
-    get_session: Callable[[], Session],
     now=None,
-):
-    """Return a list of files for the requested time period."""
+) -> Select:
+    """Return query for files in the requested time period."""
     start = datetime.datetime.utcfromtimestamp(start_timestamp)
     if end_timestamp:
         end = datetime.datetime.utcfromtimestamp(end_timestamp)
@@ -357,6 +397,8 @@ def get_time_period_fragments(
                 # Fetch the first file that starts before the recording but
                 # ends during the recording
                 and_(
+                    # Bounds the index scan, a fragment is never this long
+                    FilesMeta.orig_ctime >= start - MAX_FRAGMENT_DURATION,
                     start >= FilesMeta.orig_ctime,
                     start
                     <= FilesMeta.orig_ctime
@@ -370,9 +412,89 @@ def get_time_period_fragments(
         .order_by(FilesMeta.orig_ctime.asc())
         .cte("files")
     )
-    stmt = (
+    return (
         select(files).where(files.c.row_number == 1).order_by(files.c.orig_ctime.asc())
     )
+
+
+def get_time_period_fragments(
+    camera_identifier: str,
+    start_timestamp: int,
+    end_timestamp: int | None,
+    get_session: Callable[[], Session],
+    now=None,
+):
+    """Return a list of files for the requested time period."""
+    stmt = time_period_fragments_query(
+        camera_identifier, start_timestamp, end_timestamp, now
+    )
     with get_session() as session:
         fragments = session.execute(stmt).all()
     return fragments
+
+
+def coverage_query(
+    camera_identifier: str,
+    start_timestamp: int,
+    end_timestamp: int,
+) -> Select:
+    """Return query for the recorded timespans of each UTC day in the time period.
+
+    Consecutive fragments belong to the same timespan unless the gap between them
+    is longer than the duration of the later fragment. Returns day, start, end and
+    the duration of the first fragment of each timespan.
+    """
+    start = extract("epoch", FilesMeta.orig_ctime)
+    duration = FilesMeta.meta["m3u8"]["EXTINF"].astext.cast(Float)
+    fragments = (
+        select(
+            func.floor(start / 86400).cast(Integer).label("day"),
+            start.label("start"),
+            duration.label("duration"),
+        )
+        .join(Files, Files.path == FilesMeta.path)
+        .where(Files.camera_identifier == camera_identifier)
+        .where(Files.category == "recorder")
+        .where(Files.path.endswith(".m4s"))
+        .where(duration > 0)
+        .where(
+            FilesMeta.orig_ctime.between(
+                datetime.datetime.utcfromtimestamp(start_timestamp),
+                datetime.datetime.utcfromtimestamp(end_timestamp),
+            )
+        )
+        .subquery()
+    )
+    previous_end = func.lag(fragments.c.start + fragments.c.duration).over(
+        partition_by=fragments.c.day, order_by=fragments.c.start
+    )
+    marked = select(
+        fragments,
+        case(
+            (
+                or_(
+                    previous_end.is_(None),
+                    fragments.c.start > previous_end + fragments.c.duration,
+                ),
+                1,
+            ),
+            else_=0,
+        ).label("new_timespan"),
+    ).subquery()
+    numbered = select(
+        marked,
+        func.sum(marked.c.new_timespan)
+        .over(partition_by=marked.c.day, order_by=marked.c.start)
+        .label("timespan"),
+    ).subquery()
+    durations = array_agg(aggregate_order_by(numbered.c.duration, numbered.c.start))
+    return (
+        select(
+            numbered.c.day,
+            func.min(numbered.c.start).label("start"),
+            func.max(numbered.c.start + numbered.c.duration).label("end"),
+            durations[1].label("first_duration"),
+        )
+        .group_by(numbered.c.day, numbered.c.timespan)
+        .order_by("start")
+    )
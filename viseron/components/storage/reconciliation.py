@@ -0,0 +1,287 @@
+"""Reconcile the files table with the files in the tier directories."""
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from queue import Queue
+from typing import TYPE_CHECKING
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    column,
+    delete,
+    exists,
+    func,
+    literal,
+    literal_column,
+    select,
+    text,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from viseron.components.storage.const import CONFIG_PATH
+from viseron.components.storage.models import Files, FilesMeta, UTCNow
+
+if TYPE_CHECKING:
+    from viseron.components.storage.fragment_index import FragmentIndex
+    from viseron.components.storage.tier_handler import TierHandler
+
+LOGGER = logging.getLogger(__name__)
+
+SCAN_WORKERS = 8
+DELETE_CHUNK_SIZE = 1000
+
+# Temporary table holding the files found on disk, dropped when the
+# reconciliation transaction commits
+scanned_files = Table(
+    "reconcile_scanned_files",
+    MetaData(),
+    Column("path", String, primary_key=True),
+    # Index of the tier handler monitoring the file
+    Column("tier_handler", Integer),
+    Column("size", Integer),
+    Column("mtime", Float),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
+def scan_directories(
+    roots: list[str], workers: int = SCAN_WORKERS
+) -> list[list[tuple[str, int, float]]]:
+    """Return path, size and mtime of all files below each root directory.
+
+    Directories are scanned with os.scandir from a pool of threads, since most of
+    the time is spent waiting for the filesystem.
+    """
+    results: list[list[tuple[str, int, float]]] = [[] for _ in roots]
+    queue: Queue[tuple[int, str] | None] = Queue()
+
+    def _scan() -> None:
+        while (item := queue.get()) is not None:
+            index, directory = item
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                queue.put((index, entry.path))
+                            elif entry.is_file():
+                                stat = entry.stat()
+                                results[index].append(
+                                    (entry.path, stat.st_size, stat.st_mtime)
+                                )
+                        except FileNotFoundError:
+                            pass
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+            finally:
+                queue.task_done()
+
+    for index, root in enumerate(roots):
+        queue.put((index, root))
+    threads = [
+        threading.Thread(target=_scan, name=f"storage_reconcile.{i}", daemon=True)
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    queue.join()
+    for _ in threads:
+        queue.put(None)
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def _copy_rows(session: Session, rows: Iterable[tuple]) -> None:
+    """Load rows into the scanned files table with COPY."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {scanned_files.name} "
+            f"({', '.join(column.name for column in scanned_files.columns)}) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def reconcile_files(
+    get_session: Callable[[], Session],
+    camera_identifier: str,
+    tier_handlers: list[TierHandler],
+    fragment_index: FragmentIndex,
+) -> None:
+    """Make the files table match the files in the tier directories of a camera.
+
+    The files found on disk are loaded into a temporary table which is diffed
+    against the files of the tier handlers. Missing rows are inserted, rows of
+    files that no longer exist are deleted and sizes are corrected.
+    Rows created after the scan started are left alone since their files might
+    have been written after their directory was scanned.
+    The fragment index is updated with the segments that were added or removed.
+    """
+    started = time.monotonic()
+    with get_session() as session:
+        scan_started = session.execute(select(UTCNow())).scalar_one()
+
+    scanned = scan_directories([tier_handler.path for tier_handler in tier_handlers])
+    rows = [
+        (path, index, size, mtime)
+        for index, (tier_handler, files) in enumerate(zip(tier_handlers, scanned))
+        for path, size, mtime in files
+        if not tier_handler.is_ignored(path)
+    ]
+    tiers = values(
+        column("tier_handler", Integer),
+        column("tier_id", Integer),
+        column("tier_path", String),
+        column("category", String),
+        column("subcategory", String),
+        name="tiers",
+    ).data(
+        [
+            (
+                index,
+                tier_handler.tier_id,
+                tier_handler.tier[CONFIG_PATH],
+                tier_handler.category,
+                tier_handler.subcategory,
+            )
+            for index, tier_handler in enumerate(tier_handlers)
+        ]
+    )
+    scanned_at = time.monotonic()
+
+    with get_session() as session:
+        scanned_files.create(session.connection())
+        _copy_rows(session, rows)
+        session.execute(text(f"ANALYZE {scanned_files.name}"))
+
+        stale_paths = (
+            session.execute(
+                select(Files.path)
+                .where(Files.camera_identifier == camera_identifier)
+                .where(
+                    tuple_(
+                        Files.category,
+                        Files.subcategory,
+                        Files.tier_id,
+                        Files.tier_path,
+                    ).in_(
+                        [
+                            (
+                                tier_handler.category,
+                                tier_handler.subcategory,
+                                tier_handler.tier_id,
+                                tier_handler.tier[CONFIG_PATH],
+                            )
+                            for tier_handler in tier_handlers
+                        ]
+                    )
+                )
+                .where(Files.created_at < scan_started)
+                .where(~exists().where(scanned_files.c.path == Files.path))
+            )
+            .scalars()
+            .all()
+        )
+        for index in range(0, len(stale_paths), DELETE_CHUNK_SIZE):
+            session.execute(
+                delete(Files).where(
+                    Files.path.in_(stale_paths[index : index + DELETE_CHUNK_SIZE])
+                )
+            )
+
+        missing = ~exists().where(Files.path == scanned_files.c.path)
+        session.execute(
+            pg_insert(FilesMeta)
+            .from_select(
+                ["path", "orig_ctime", "meta"],
+                select(
+                    scanned_files.c.path,
+                    func.timezone("UTC", func.to_timestamp(scanned_files.c.mtime)),
+                    literal_column("'{}'::jsonb"),
+                ).where(missing),
+            )
+            .on_conflict_do_nothing(index_elements=["path"])
+        )
+        # Missing segments that kept their metadata are added to the fragment index
+        duration = FilesMeta.meta["m3u8"]["EXTINF"].astext.cast(Float)
+        fragments = session.execute(
+            select(FilesMeta.path, duration, FilesMeta.orig_ctime)
+            .join(scanned_files, scanned_files.c.path == FilesMeta.path)
+            .where(missing)
+            .where(FilesMeta.path.endswith(".m4s"))
+            .where(duration > 0)
+        ).all()
+
+        inserted = session.execute(
+            pg_insert(Files)
+            .from_select(
+                [
+                    "camera_identifier",
+                    "tier_id",
+                    "tier_path",
+                    "category",
+                    "subcategory",
+                    "path",
+                    "directory",
+                    "filename",
+                    "size",
+                ],
+                select(
+                    literal(camera_identifier),
+                    tiers.c.tier_id,
+                    tiers.c.tier_path,
+                    tiers.c.category,
+                    tiers.c.subcategory,
+                    scanned_files.c.path,
+                    func.regexp_replace(scanned_files.c.path, "/[^/]*$", ""),
+                    func.substring(scanned_files.c.path, "[^/]*$"),
+                    scanned_files.c.size,
+                )
+                .join(tiers, tiers.c.tier_handler == scanned_files.c.tier_handler)
+                .where(missing),
+            )
+            .on_conflict_do_nothing(index_elements=["path"])
+        ).rowcount
+
+        updated = session.execute(
+            update(Files)
+            .where(Files.path == scanned_files.c.path)
+            .where(Files.size != scanned_files.c.size)
+            .values(size=scanned_files.c.size)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        session.commit()
+
+    if removed_segments := [path for path in stale_paths if path.endswith(".m4s")]:
+        fragment_index.remove(removed_segments)
+    for path, fragment_duration, orig_ctime in fragments:
+        fragment_index.add(path, fragment_duration, orig_ctime)
+
+    LOGGER.info(
+        f"Reconciled {len(rows)} files of camera {camera_identifier} in "
+        f"{time.monotonic() - started:.2f}s (scan {scanned_at - started:.2f}s): "
+        f"{inserted} added, {len(stale_paths)} removed, {updated} resized"
+    )
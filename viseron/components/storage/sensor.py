@@ -0,0 +1,51 @@
+"""Storage sensors."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from viseron.helpers.entity.sensor import SensorEntity
+
+if TYPE_CHECKING:
+    from viseron import Viseron
+
+    from .mover import FileMover
+
+UPDATE_INTERVAL = 60
+
+
+class FileMoverSensor(SensorEntity):
+    """Entity that keeps track of the files moved between tiers.
+
+    Disabled by default, the state is the number of files moved and the transfer
+    statistics of each destination tier are stored as attributes.
+    """
+
+    def __init__(self, vis: Viseron, file_mover: FileMover) -> None:
+        self._vis = vis
+        self._file_mover = file_mover
+        self.object_id = "storage_files_moved"
+        self.name = "Storage Files Moved"
+        self.icon = "mdi:file-move"
+        self.entity_category = "diagnostic"
+        self.enabled_by_default = False
+        self.volatile = True
+        self._statistics = file_mover.statistics()
+
+    def setup(self) -> None:
+        """Set up state updates."""
+        self._vis.schedule_periodic_update(self, UPDATE_INTERVAL)
+
+    @property
+    def extra_attributes(self):
+        """Return entity attributes."""
+        return {"tiers": self._statistics}
+
+    @property
+    def state(self):
+        """Return entity state."""
+        return sum(statistics["files"] for statistics in self._statistics.values())
+
+    def update(self) -> None:
+        """Update transfer statistics."""
+        self._statistics = self._file_mover.statistics()
+        self.set_state()
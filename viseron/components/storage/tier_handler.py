@@ -3,14 +3,15 @@ from __future__ import annotations
 
 import logging
 import os
-import shutil
+import time
 from collections.abc import Callable
 from datetime import datetime, timedelta
-from queue import Queue
-from threading import Lock, Timer
+from queue import Empty, Queue
+from threading import Lock
 from typing import TYPE_CHECKING, Any, Literal
 
-from sqlalchemy import Result, delete, insert, select, update
+from sqlalchemy import Result, Row, bindparam, delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from watchdog.events import (
@@ -40,9 +41,20 @@ from viseron.components.storage.const import (
     CONFIG_POLL,
     CONFIG_SECONDS,
 )
-from viseron.components.storage.models import Files, FilesMeta, Recordings
+from viseron.components.storage.models import (
+    Files,
+    FilesMeta,
+    FilesTierStats,
+    Recordings,
+)
+from viseron.components.storage.mover import (
+    FileMover,
+    TransferResult,
+    TransferStatistics,
+    transfer_file,
+)
 from viseron.components.storage.queries import (
-    files_to_move_query,
+    oldest_files_query,
     recordings_to_move_query,
 )
 from viseron.components.storage.util import (
@@ -65,6 +77,78 @@ if TYPE_CHECKING:
     from viseron.domains.camera import AbstractCamera
 
 
+# Seconds a file must go without modifications before its size is updated
+MODIFIED_DEBOUNCE = 1
+# Seconds between scans of polled tiers. Files written by Viseron are registered
+# with Storage directly, so polling only picks up changes made by others
+POLLING_INTERVAL = 30
+# Paths per DELETE statement when deleting files in bulk
+DELETE_CHUNK_SIZE = 1000
+# Paths removed from disk per file mover job when deleting files in bulk
+REMOVE_CHUNK_SIZE = 100
+
+# (next_tier, path, tier_path, force_delete) of a file to move or delete
+FileToHandle = tuple[dict[str, Any] | None, str, str, bool]
+
+
+class FileEventBatch:
+    """Filesystem events collapsed to the resulting change per path."""
+
+    def __init__(self) -> None:
+        self._created: dict[str, None] = {}
+        self._deleted: dict[str, None] = {}
+        self._modified: dict[str, float] = {}
+
+    def __bool__(self) -> bool:
+        """Return if there are any pending changes."""
+        return bool(self._created or self._deleted or self._modified)
+
+    def add(self, event: FileSystemEvent) -> None:
+        """Add an event to the batch."""
+        path = event.src_path
+        if isinstance(event, FileDeletedEvent):
+            self._created.pop(path, None)
+            self._modified.pop(path, None)
+            self._deleted[path] = None
+        elif isinstance(event, FileCreatedEvent):
+            # A deleted and recreated file is kept in _deleted to replace the row
+            self._modified.pop(path, None)
+            self._created[path] = None
+        elif isinstance(event, FileModifiedEvent):
+            # The size of created files is read when they are inserted
+            if path not in self._created:
+                self._modified[path] = time.monotonic()
+
+    def timeout(self) -> float | None:
+        """Return seconds until the next modified file is due, if any."""
+        if not self._modified:
+            return None
+        return max(
+            0, min(self._modified.values()) + MODIFIED_DEBOUNCE - time.monotonic()
+        )
+
+    def take(self, force: bool = False) -> tuple[list[str], list[str], list[str]]:
+        """Return and remove created, deleted and due modified paths.
+
+        Modified paths are due when they have not been modified for
+        MODIFIED_DEBOUNCE seconds, or immediately if force is set.
+        """
+        created = list(self._created)
+        deleted = list(self._deleted)
+        self._created.clear()
+        self._deleted.clear()
+
+        due = time.monotonic() - MODIFIED_DEBOUNCE
+        modified = [
+            path
+            for path, modified_at in self._modified.items()
+            if force or modified_at <= due
+        ]
+        for path in modified:
+            del self._modified[path]
+        return created, deleted, modified
+
+
 class TierHandler(FileSystemEventHandler):
     """Moves files up configured tiers."""
 
@@ -96,7 +180,6 @@ class TierHandler(FileSystemEventHandler):
         self.initialize()
         vis.register_signal_handler(VISERON_SIGNAL_LAST_WRITE, self._shutdown)
 
-        self._pending_updates: dict[str, Timer] = {}
         self._event_queue: Queue[FileSystemEvent | None] = Queue()
         self._event_thread = RestartableThread(
             target=self._process_events,
@@ -118,7 +201,9 @@ class TierHandler(FileSystemEventHandler):
         self._logger.debug("Tier %s monitoring path: %s", tier_id, self._path)
         os.makedirs(self._path, exist_ok=True)
         self._observer = (
-            PollingObserverVFS(stat=os.stat, listdir=os.scandir, polling_interval=1)
+            PollingObserverVFS(
+                stat=os.stat, listdir=os.scandir, polling_interval=POLLING_INTERVAL
+            )
             if tier[CONFIG_POLL]
             else Observer()
         )
@@ -134,6 +219,21 @@ class TierHandler(FileSystemEventHandler):
         """Tier configuration."""
         return self._tier
 
+    @property
+    def category(self) -> str:
+        """Return category."""
+        return self._category
+
+    @property
+    def subcategory(self) -> str:
+        """Return subcategory."""
+        return self._subcategory
+
+    @property
+    def path(self) -> str:
+        """Return the monitored path."""
+        return self._path
+
     @property
     def first_tier(self) -> bool:
         """Return if first tier."""
@@ -198,100 +298,200 @@ class TierHandler(FileSystemEventHandler):
             )
 
             if file_ids is not None:
-                for file in file_ids:
-                    handle_file(
-                        get_session,
-                        self._storage,
-                        self._camera.identifier,
-                        self._tier,
-                        self._next_tier,
-                        file.path,
-                        file.tier_path,
-                        self._logger,
-                    )
+                self._handle_files(
+                    get_session,
+                    [
+                        (self._next_tier, file.path, file.tier_path, False)
+                        for file in file_ids
+                    ],
+                )
             session.commit()
 
+    def _handle_files(
+        self,
+        get_session: Callable[[], Session],
+        files: list[FileToHandle],
+    ) -> None:
+        """Move or delete files given as (next_tier, path, tier_path, force_delete).
+
+        Files that are deleted are removed in bulk by delete_files. Files that are
+        moved are passed to handle_file in the file mover workers.
+        Blocks until all files are handled and logs the transfer throughput.
+        """
+        if not files:
+            return
+
+        requested_files = set(
+            self._storage.camera_requested_files_count[
+                self._camera.identifier
+            ].filenames
+        )
+        delete_paths = []
+        move_files = []
+        for next_tier, path, tier_path, force_delete in files:
+            if (force_delete or next_tier is None) and path not in requested_files:
+                delete_paths.append(path)
+            else:
+                move_files.append((next_tier, path, tier_path, force_delete))
+        if delete_paths:
+            delete_files(
+                get_session, delete_paths, self._logger, self._storage.file_mover
+            )
+            self._on_deleted(delete_paths)
+        if not move_files:
+            return
+
+        started = time.monotonic()
+        futures = [
+            self._storage.file_mover.submit(
+                handle_file,
+                get_session,
+                self._storage,
+                self._camera.identifier,
+                self._tier,
+                next_tier,
+                path,
+                tier_path,
+                self._logger,
+                force_delete,
+            )
+            for next_tier, path, tier_path, force_delete in move_files
+        ]
+        statistics = TransferStatistics()
+        for future in futures:
+            try:
+                result = future.result()
+            except Exception:  # pylint: disable=broad-except
+                self._logger.exception("Failed to handle file")
+                continue
+            if result:
+                statistics.add(result)
+
+        if statistics.files:
+            elapsed = time.monotonic() - started
+            self._logger.debug(
+                f"Moved {statistics.files} files ({statistics.linked} linked, "
+                f"{statistics.copied} copied), "
+                f"{statistics.bytes / 1024 / 1024:.1f} MB in {elapsed:.2f}s, "
+                f"{statistics.bytes / 1024 / 1024 / elapsed:.1f} MB/s"
+            )
+
     def _process_events(self) -> None:
-        while True:
-            event = self._event_queue.get()
-            if event is None:
+        """Write filesystem events to the database in batches.
+
+        All queued events are collapsed per path and written in one transaction.
+        Size updates of modified files are delayed until the file has not been
+        modified for MODIFIED_DEBOUNCE seconds.
+        """
+        batch = FileEventBatch()
+        stop = False
+        while not stop:
+            try:
+                event = self._event_queue.get(timeout=batch.timeout())
+                # Drain all queued events into the batch
+                while event is not None:
+                    batch.add(event)
+                    event = self._event_queue.get_nowait()
                 self._logger.debug("Stopping event handler")
-                break
-            if isinstance(event, FileDeletedEvent):
-                self._on_deleted(event)
-            elif isinstance(event, FileCreatedEvent):
-                self._on_created(event)
-            elif isinstance(event, FileModifiedEvent):
-                self._on_modified(event)
+                stop = True
+            except Empty:
+                pass
+
+            created, deleted, modified = batch.take(force=stop)
+            if created or deleted or modified:
+                self._write_events(created, deleted, modified)
+
+    def is_ignored(self, path: str) -> bool:
+        """Return if the file should not be stored in the database."""
+        return os.path.basename(path) in self._storage.ignored_files
 
     def on_any_event(self, event: FileSystemEvent) -> None:
         """Handle file system events."""
-        if os.path.basename(event.src_path) in self._storage.ignored_files:
+        if self.is_ignored(event.src_path):
             return
         self._event_queue.put(event)
 
-    def _on_created(self, event: FileCreatedEvent) -> None:
-        """Insert into database when file is created."""
-        self._logger.debug("File created: %s", event.src_path)
-        try:
-            with self._storage.get_session() as session:
-                stmt = insert(Files).values(
-                    tier_id=self._tier_id,
-                    tier_path=self._tier[CONFIG_PATH],
-                    camera_identifier=self._camera.identifier,
-                    category=self._category,
-                    subcategory=self._subcategory,
-                    path=event.src_path,
-                    directory=os.path.dirname(event.src_path),
-                    filename=os.path.basename(event.src_path),
-                    size=os.path.getsize(event.src_path),
-                )
-                session.execute(stmt)
-                session.commit()
-        except IntegrityError:
-            self._logger.error(
-                "Failed to insert file %s into database, already exists", event.src_path
+    def _write_events(
+        self, created: list[str], deleted: list[str], modified: list[str]
+    ) -> None:
+        """Apply created, deleted and modified files to the database."""
+        self._logger.debug(
+            "Files created: %s, deleted: %s, modified: %s",
+            len(created),
+            len(deleted),
+            len(modified),
+        )
+        rows = []
+        for path in created:
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                self._logger.debug("File not found: %s", path)
+                continue
+            rows.append(
+                {
+                    "tier_id": self._tier_id,
+                    "tier_path": self._tier[CONFIG_PATH],
+                    "camera_identifier": self._camera.identifier,
+                    "category": self._category,
+                    "subcategory": self._subcategory,
+                    "path": path,
+                    "directory": os.path.dirname(path),
+                    "filename": os.path.basename(path),
+                    "size": size,
+                }
             )
-
-        self.check_tier()
-
-    def _on_modified(self, event: FileModifiedEvent) -> None:
-        """Update database when file is moved."""
-
-        def _update_size() -> None:
-            """Update the size of a file in the database.
-
-            Runs in a Timer to avoid spamming updates on duplicate events.
-            """
-            self._logger.debug("File modified (delayed event): %s", event.src_path)
-            self._pending_updates.pop(event.src_path, None)
+        sizes = []
+        for path in modified:
             try:
-                size = os.path.getsize(event.src_path)
+                sizes.append({"b_path": path, "b_size": os.path.getsize(path)})
             except FileNotFoundError:
-                self._logger.debug("File not found: %s", event.src_path)
-                return
+                self._logger.debug("File not found: %s", path)
 
-            with self._storage.get_session() as session:
-                stmt = (
-                    update(Files).where(Files.path == event.src_path).values(size=size)
+        with self._storage.get_session() as session:
+            if deleted:
+                session.execute(delete(Files).where(Files.path.in_(deleted)))
+            if rows:
+                inserted = set(
+                    session.execute(
+                        pg_insert(Files)
+                        .on_conflict_do_nothing(index_elements=["path"])
+                        .returning(Files.path),
+                        rows,
+                    ).scalars()
                 )
-                session.execute(stmt)
-                session.commit()
+                # Files registered with Storage are reported again by the observer
+                for row in rows:
+                    if row["path"] not in inserted:
+                        self._logger.debug(
+                            "File %s already exists in database", row["path"]
+                        )
+                rows = [row for row in rows if row["path"] in inserted]
+            if sizes:
+                # Executed on the connection to skip ORM bulk update by primary key
+                session.connection().execute(
+                    update(Files)
+                    .where(Files.path == bindparam("b_path"))
+                    .values(size=bindparam("b_size")),
+                    sizes,
+                )
+            session.commit()
+
+        # Paths that were deleted and recreated are both in deleted and created
+        recreated = set(created)
+        if deleted := [path for path in deleted if path not in recreated]:
+            self._on_deleted(deleted)
+        for row in rows:
+            self._on_created(row["path"])
 
+        if rows or sizes:
             self.check_tier()
 
-        if event.src_path in self._pending_updates:
-            self._pending_updates[event.src_path].cancel()
-        self._pending_updates[event.src_path] = Timer(1, _update_size)
-        self._pending_updates[event.src_path].start()
+    def _on_created(self, path: str) -> None:
+        """Handle a file that has been inserted into the database."""
 
-    def _on_deleted(self, event: FileDeletedEvent) -> None:
-        """Remove file from database when it is deleted."""
-        self._logger.debug("File deleted: %s", event.src_path)
-        with self._storage.get_session() as session:
-            stmt = delete(Files).where(Files.path == event.src_path)
-            session.execute(stmt)
-            session.commit()
+    def _on_deleted(self, paths: list[str]) -> None:
+        """Handle files that have been deleted from the database."""
 
     def _shutdown(self) -> None:
         """Shutdown the observer and event handler."""
@@ -308,8 +508,6 @@ class TierHandler(FileSystemEventHandler):
                 self._next_tier,
                 self._logger,
             )
-        for pending_update in self._pending_updates.copy().values():
-            pending_update.join()
         self._event_queue.put(None)
         self._event_thread.join()
         self._observer.stop()
@@ -381,6 +579,10 @@ class SegmentsTierHandler(TierHandler):
         self.add_file_handler(self._path, rf"{self._path}/(.*.m4s$)")
         self.add_file_handler(self._path, rf"{self._path}/(.*.mp4$)")
 
+    def _on_deleted(self, paths: list[str]) -> None:
+        """Remove deleted segments from the fragment index."""
+        self._storage.get_fragment_index(self._camera.identifier).remove(paths)
+
     @property
     def events_enabled(self) -> bool:
         """Return if events are enabled."""
@@ -429,7 +631,8 @@ class SegmentsTierHandler(TierHandler):
 
             # A file can be in multiple recordings, so we need to keep track of which
             # files we have already processed using processed_paths
-            processed_paths = []
+            processed_paths: set[str] = set()
+            files: list[FileToHandle] = []
             events_next_tier = None
             continuous_next_tier = None
             if self._events_enabled and not self._continuous_enabled:
@@ -440,32 +643,27 @@ class SegmentsTierHandler(TierHandler):
                     if file.path in processed_paths:
                         continue
                     force_delete = bool(file.recording_id is None)
-                    handle_file(
-                        get_session,
-                        self._storage,
-                        self._camera.identifier,
-                        self._tier,
-                        events_next_tier.tier if events_next_tier else None,
-                        file.path,
-                        file.tier_path,
-                        self._logger,
-                        force_delete,
+                    files.append(
+                        (
+                            events_next_tier.tier if events_next_tier else None,
+                            file.path,
+                            file.tier_path,
+                            force_delete,
+                        )
                     )
-                    processed_paths.append(file.path)
+                    processed_paths.add(file.path)
             elif self._continuous_enabled and not self._events_enabled:
                 continuous_next_tier = find_next_tier_segments(
                     self._storage, self._tier_id, self._camera, "continuous"
                 )
                 for file in continuous_file_ids:
-                    handle_file(
-                        get_session,
-                        self._storage,
-                        self._camera.identifier,
-                        self._tier,
-                        continuous_next_tier.tier if continuous_next_tier else None,
-                        file.path,
-                        file.tier_path,
-                        self._logger,
+                    files.append(
+                        (
+                            continuous_next_tier.tier if continuous_next_tier else None,
+                            file.path,
+                            file.tier_path,
+                            False,
+                        )
                     )
             else:
                 overlap = files_to_move_overlap(events_file_ids, continuous_file_ids)
@@ -501,26 +699,24 @@ class SegmentsTierHandler(TierHandler):
                             else continuous_next_tier
                         )
 
-                    handle_file(
-                        get_session,
-                        self._storage,
-                        self._camera.identifier,
-                        self._tier,
-                        next_tier.tier if next_tier else None,
-                        file.path,
-                        file.tier_path,
-                        self._logger,
-                        force_delete=force_delete,
+                    files.append(
+                        (
+                            next_tier.tier if next_tier else None,
+                            file.path,
+                            file.tier_path,
+                            force_delete,
+                        )
                     )
-                    processed_paths.append(file.path)
+                    processed_paths.add(file.path)
+            self._handle_files(get_session, files)
 
-            recording_ids: list[int] = []
-            for recording in events_file_ids:
-                if (
+            recording_ids: list[int] = list(
+                dict.fromkeys(
                     recording.recording_id
-                    and recording.recording_id not in recording_ids
-                ):
-                    recording_ids.append(recording.recording_id)
+                    for recording in events_file_ids
+                    if recording.recording_id
+                )
+            )
 
             # Signal to the thumbnail tier that the recording has been moved
             if recording_ids:
@@ -589,30 +785,27 @@ class ThumbnailTierHandler(TierHandler):
     def check_tier(self) -> None:
         """Do nothing, as we don't want to move thumbnails."""
 
-    def on_any_event(self, event: FileSystemEvent) -> None:
+    def is_ignored(self, path: str) -> bool:
         """Ignore changes to latest_thumbnail.jpg."""
-        if os.path.basename(event.src_path) == "latest_thumbnail.jpg":
-            return
-        return super().on_any_event(event)
+        if os.path.basename(path) == "latest_thumbnail.jpg":
+            return True
+        return super().is_ignored(path)
 
-    def _on_created(self, event: FileCreatedEvent) -> None:
+    def _on_created(self, path: str) -> None:
         try:
             with self._storage.get_session() as session:
                 stmt = (
                     update(Recordings)
-                    .where(
-                        Recordings.id == os.path.basename(event.src_path).split(".")[0]
-                    )
-                    .values(thumbnail_path=event.src_path)
+                    .where(Recordings.id == os.path.basename(path).split(".")[0])
+                    .values(thumbnail_path=path)
                 )
                 session.execute(stmt)
                 session.commit()
         except Exception as error:  # pylint: disable=broad-except
             self._logger.error(
                 "Failed to update thumbnail path for recording with path: "
-                f"{event.src_path}: {error}"
+                f"{path}: {error}"
             )
-        super()._on_created(event)
 
     def move_thumbnail(
         self, recording_id: int, next_tier: dict[str, Any] | None
@@ -651,7 +844,7 @@ class RecordingsTierHandler(TierHandler):
     def check_tier(self) -> None:
         """Do nothing, as we move recordings manually."""
 
-    def _update_clip_path(self, event: FileCreatedEvent) -> None:
+    def _update_clip_path(self, path: str) -> None:
         try:
             with self._storage.get_session() as session:
                 stmt = (
@@ -659,24 +852,22 @@ class RecordingsTierHandler(TierHandler):
                     .where(Recordings.camera_identifier == self._camera.identifier)
                     .where(
                         Recordings.clip_path.like(
-                            f"%{event.src_path.split('/')[-2]}/"
-                            f"{os.path.basename(event.src_path)}"
+                            f"%{path.split('/')[-2]}/{os.path.basename(path)}"
                         )
                     )
-                    .values(clip_path=event.src_path)
+                    .values(clip_path=path)
                 )
                 session.execute(stmt)
                 session.commit()
         except Exception as error:  # pylint: disable=broad-except
             self._logger.error(
                 "Failed to update clip path for recording with path: "
-                f"{event.src_path}: {error}"
+                f"{path}: {error}"
             )
 
-    def _on_created(self, event: FileCreatedEvent) -> None:
+    def _on_created(self, path: str) -> None:
         if not self.first_tier:
-            self._update_clip_path(event)
-        super()._on_created(event)
+            self._update_clip_path(path)
 
     def move_event_clip(
         self, recording_id: int, next_tier: dict[str, Any] | None
@@ -736,11 +927,15 @@ def handle_file(
     tier_path: str,
     logger: logging.Logger,
     force_delete: bool = False,
-) -> None:
-    """Move file if there is a succeeding tier, else delete the file."""
+) -> TransferResult | None:
+    """Move file if there is a succeeding tier, else delete the file.
+
+    Moves are recorded in the transfer statistics of the next tier and returned.
+    """
+    result = None
     if path in storage.camera_requested_files_count[camera_identifier].filenames:
         logger.debug("File %s is recently requested, skipping", path)
-        return
+        return result
 
     if force_delete or next_tier is None:
         delete_file(get_session, path, logger)
@@ -753,13 +948,15 @@ def handle_file(
                 "changed the tier paths or a previous move failed.",
                 path,
             )
-        else:
-            move_file(
-                get_session,
-                path,
-                new_path,
-                logger,
-            )
+        elif result := move_file(
+            get_session,
+            path,
+            new_path,
+            logger,
+        ):
+            storage.file_mover.record(next_tier[CONFIG_PATH], result)
+            storage.get_fragment_index(camera_identifier).move(path, new_path)
+            storage.register_file_moved(path, new_path)
 
     # Delete the file from the database if tier_path is not the same as
     # curr_tier[CONFIG_PATH]. This is an indication that the tier configuration
@@ -777,6 +974,7 @@ def handle_file(
             stmt = delete(Files).where(Files.path == path)
             session.execute(stmt)
             session.commit()
+    return result
 
 
 def move_file(
@@ -784,12 +982,12 @@ def move_file(
     src: str,
     dst: str,
     logger: logging.Logger,
-) -> None:
+) -> TransferResult | None:
     """Move file from src to dst.
 
     To avoid race conditions where a file is referenced at the same time as it is being
-    moved, causing a 404 in the browser, we copy the file to the new location and then
-    delete the old one.
+    moved, causing a 404 in the browser, we link or copy the file to the new location
+    and then delete the old one.
     """
     logger.debug("Moving file from %s to %s", src, dst)
     try:
@@ -805,15 +1003,14 @@ def move_file(
         logger.error(f"Failed to insert metadata for {dst}", exc_info=True)
 
     try:
-        os.makedirs(os.path.dirname(dst), exist_ok=True)
-        shutil.copy(src, dst)
-        os.remove(src)
+        return transfer_file(src, dst)
     except FileNotFoundError as error:
         logger.error(f"Failed to move file {src} to {dst}: {error}")
         with get_session() as session:
             stmt = delete(Files).where(Files.path == src)
             session.execute(stmt)
             session.commit()
+    return None
 
 
 def delete_file(
@@ -834,44 +1031,194 @@ def delete_file(
         logger.error(f"Failed to delete file {path}: {error}")
 
 
-def get_files_to_move(
+def _remove_files(paths: list[str]) -> list[tuple[str, OSError]]:
+    """Remove files from disk and return the paths that failed."""
+    failed = []
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError as error:
+            failed.append((path, error))
+    return failed
+
+
+def delete_files(
+    get_session: Callable[..., Session],
+    paths: list[str],
+    logger: logging.Logger,
+    file_mover: FileMover,
+) -> None:
+    """Delete files in bulk.
+
+    The rows are deleted with one statement per DELETE_CHUNK_SIZE paths, which
+    also deletes the files_meta rows and updates the tier stats once per chunk.
+    The files are then removed from disk in parallel by the file mover workers.
+    """
+    logger.debug("Deleting %s files", len(paths))
+    chunks = [
+        paths[index : index + DELETE_CHUNK_SIZE]
+        for index in range(0, len(paths), DELETE_CHUNK_SIZE)
+    ]
+    for chunk in chunks:
+        with get_session() as session:
+            session.execute(delete(Files).where(Files.path.in_(chunk)))
+            session.commit()
+
+    futures = [
+        file_mover.submit(_remove_files, paths[index : index + REMOVE_CHUNK_SIZE])
+        for index in range(0, len(paths), REMOVE_CHUNK_SIZE)
+    ]
+    for future in futures:
+        for path, error in future.result():
+            logger.error(f"Failed to delete file {path}: {error}")
+
+
+def refresh_oldest_orig_ctime(
+    session: Session,
+    category: str,
+    subcategory: str,
+    tier_id: int,
+    camera_identifier: str,
+) -> datetime | None:
+    """Set oldest_orig_ctime of the tier stats to the oldest file in the tier.
+
+    The triggers only lower oldest_orig_ctime, so it falls behind as files are
+    deleted.
+    """
+    oldest = (
+        select(func.min(FilesMeta.orig_ctime))
+        .join(Files, Files.path == FilesMeta.path)
+        .where(Files.category == category)
+        .where(Files.subcategory == subcategory)
+        .where(Files.tier_id == tier_id)
+        .where(Files.camera_identifier == camera_identifier)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(FilesTierStats)
+        .where(FilesTierStats.category == category)
+        .where(FilesTierStats.subcategory == subcategory)
+        .where(FilesTierStats.tier_id == tier_id)
+        .where(FilesTierStats.camera_identifier == camera_identifier)
+        .values(oldest_orig_ctime=oldest)
+        .returning(FilesTierStats.oldest_orig_ctime)
+    )
+    return session.execute(stmt).scalar()
+
+
+def tier_threshold_reached(
     session: Session,
     category: str,
     subcategory: str,
     tier_id: int,
     camera_identifier: str,
     max_bytes: int,
-    min_age: timedelta,
     min_bytes: int,
     max_age: timedelta,
-) -> Result[Any]:
-    """Get id of files to move."""
-    now = utcnow()
+    now: datetime,
+) -> bool:
+    """Return if any file in the tier can exceed max_bytes or max_age.
 
-    # If min_age is not set, we want to ignore files that are less than 5 seconds old
-    # This is to avoid moving files that are still being written to
-    if min_age:
-        min_age_timestamp = (now - min_age).timestamp()
-    else:
-        min_age_timestamp = (now - timedelta(seconds=5)).timestamp()
+    Uses the counters in files_tier_stats so that the files of the tier are only
+    queried when there is something to move.
+    """
+    stats = session.execute(
+        select(FilesTierStats)
+        .where(FilesTierStats.category == category)
+        .where(FilesTierStats.subcategory == subcategory)
+        .where(FilesTierStats.tier_id == tier_id)
+        .where(FilesTierStats.camera_identifier == camera_identifier)
+    ).scalar()
+    if stats is None:
+        return False
+
+    if max_bytes and stats.total_bytes >= max_bytes:
+        return True
+
+    if not max_age or stats.total_bytes < min_bytes:
+        return False
+
+    oldest = stats.oldest_orig_ctime
+    if oldest is None or oldest > now - max_age:
+        return False
+    # The oldest file might have been removed already
+    oldest = refresh_oldest_orig_ctime(
+        session, category, subcategory, tier_id, camera_identifier
+    )
+    return oldest is not None and oldest <= now - max_age
 
-    if max_age:
-        max_age_timestamp = (now - max_age).timestamp()
-    else:
-        max_age_timestamp = 0
 
-    stmt = files_to_move_query(
+def get_files_to_move(
+    session: Session,
+    category: str,
+    subcategory: str,
+    tier_id: int,
+    camera_identifier: str,
+    max_bytes: int,
+    min_age: timedelta,
+    min_bytes: int,
+    max_age: timedelta,
+) -> list[Row[Any]]:
+    """Get id of files to move.
+
+    Files are moved oldest first, so the files to move are the oldest files until
+    the tier is below max_bytes, or until min_bytes is left of the files older than
+    max_age. The bytes above those limits are read from files_tier_stats and the
+    oldest files are selected in pages sized from the average file size.
+    """
+    now = utcnow()
+    if not tier_threshold_reached(
+        session,
         category,
         subcategory,
         tier_id,
         camera_identifier,
         max_bytes,
-        min_age_timestamp,
         min_bytes,
-        max_age_timestamp,
+        max_age,
+        now,
+    ):
+        return []
+    stats = session.get(
+        FilesTierStats, (camera_identifier, category, subcategory, tier_id)
     )
-    result = session.execute(stmt)
-    return result
+    assert stats is not None
+
+    # If min_age is not set, we want to ignore files that are less than 5 seconds old
+    # This is to avoid moving files that are still being written to
+    min_age_ctime = now - (min_age or timedelta(seconds=5))
+    max_age_ctime = now - max_age if max_age else None
+    # Bytes of older files that can be removed before a file has to be kept
+    max_bytes_excess = stats.total_bytes - max_bytes if max_bytes else -1
+    min_bytes_excess = stats.total_bytes - min_bytes if max_age else -1
+
+    excess = max(max_bytes_excess, min_bytes_excess)
+    average_size = max(stats.total_bytes // max(stats.file_count, 1), 1)
+    limit = excess // average_size + 2
+    offset = 0
+    removed_bytes = 0
+    files: list[Row[Any]] = []
+    while True:
+        rows = session.execute(
+            oldest_files_query(
+                category, subcategory, tier_id, camera_identifier, limit, offset
+            )
+        ).all()
+        for row in rows:
+            if not (
+                removed_bytes <= max_bytes_excess and row.orig_ctime <= min_age_ctime
+            ) and not (
+                max_age_ctime
+                and removed_bytes <= min_bytes_excess
+                and row.orig_ctime <= max_age_ctime
+            ):
+                return files
+            files.append(row)
+            removed_bytes += row.size
+        if len(rows) < limit:
+            return files
+        offset += limit
+        limit *= 2
 
 
 def get_recordings_to_move(
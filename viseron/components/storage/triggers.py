@@ -2,8 +2,10 @@
 
 import logging
 
-from sqlalchemy import Connection, delete, event
+from sqlalchemy import BindParameter, Connection, Delete, delete, event
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression
 
 from viseron.components.storage.models import Files, FilesMeta
 from viseron.helpers import utcnow
@@ -14,24 +16,55 @@ LOGGER = logging.getLogger(__name__)
 def insert_into_files_meta(
     conn: Connection,
     clauseelement,
-    _multiparams,
-    _params,
+    multiparams,
+    params,
     _execution_options,
 ) -> None:
-    """Insert a row into FilesMeta when a new row is inserted into Files."""
-    if clauseelement.is_insert and clauseelement.table.name == Files.__tablename__:
-        compiled = clauseelement.compile()
+    """Insert rows into FilesMeta when new rows are inserted into Files.
+
+    Supports values given in the statement as well as execution parameters.
+    INSERT ... SELECT statements are skipped, the metadata has to be inserted by
+    the caller.
+    """
+    if (
+        clauseelement.is_insert
+        and clauseelement.table.name == Files.__tablename__
+        and clauseelement.select is None
+    ):
+        if rows := multiparams or ([params] if params else []):
+            paths = [row["path"] for row in rows]
+        else:
+            paths = [clauseelement.compile().params["path"]]
+        now = utcnow()
         conn.execute(
             insert(FilesMeta)
-            .values(
-                path=compiled.params["path"],
-                orig_ctime=utcnow(),
-                meta={},
-            )
+            .values([{"path": path, "orig_ctime": now, "meta": {}} for path in paths])
             .on_conflict_do_nothing(index_elements=["path"])
         )
 
 
+def deleted_paths(clauseelement: Delete) -> list[str] | None:
+    """Return the paths deleted by a DELETE FROM files statement.
+
+    Supports statements deleting a single path, Files.path == path, and a list of
+    paths, Files.path.in_(paths), whose bound value is the list. Returns None for
+    other statements.
+    """
+    whereclause = clauseelement.whereclause
+    if (
+        not isinstance(whereclause, BinaryExpression)
+        or getattr(whereclause.left, "key", None) != "path"
+        or not isinstance(whereclause.right, BindParameter)
+    ):
+        return None
+    value = whereclause.right.value
+    if whereclause.operator is operators.eq and isinstance(value, str):
+        return [value]
+    if whereclause.operator is operators.in_op and isinstance(value, (list, tuple)):
+        return list(value)
+    return None
+
+
 def delete_from_files_meta(
     conn: Connection,
     clauseelement,
@@ -39,12 +72,24 @@ def delete_from_files_meta(
     _params,
     _execution_options,
 ) -> None:
-    """Delete a row from FilesMeta when a row is deleted from Files."""
-    if clauseelement.is_delete and clauseelement.table.name == Files.__tablename__:
-        compiled = clauseelement.compile()
-        conn.execute(
-            delete(FilesMeta).where(FilesMeta.path == compiled.params["path_1"])
+    """Delete rows from FilesMeta when rows are deleted from Files.
+
+    Supports deleting Files by a single path or a list of paths.
+    """
+    if (
+        not isinstance(clauseelement, Delete)
+        or getattr(clauseelement.table, "name", None) != Files.__tablename__
+    ):
+        return
+    paths = deleted_paths(clauseelement)
+    if paths is None:
+        LOGGER.warning(
+            f"Unable to find the deleted paths of statement {clauseelement}, "
+            "their metadata is kept"
         )
+        return
+    if paths:
+        conn.execute(delete(FilesMeta).where(FilesMeta.path.in_(paths)))
 
 
 def setup_triggers(engine) -> None:
@@ -0,0 +1,207 @@
+"""Buffered database writers."""
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from viseron.components.storage.models import Base, Motion, MotionContours
+from viseron.watchdog.thread_watchdog import RestartableThread
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH = 500
+DEFAULT_MAX_DELAY = 0.5
+DEFAULT_MAX_BUFFER = 10000
+
+
+class BatchWriter:
+    """Insert rows into a table in batches from a background thread.
+
+    Rows are written with a single multi-row INSERT when max_batch rows are
+    buffered or max_delay seconds have passed, so callers never wait on the
+    database. When max_buffer rows are waiting, new rows are dropped and counted.
+    Rows inserted after the writer is stopped are written right away.
+    """
+
+    def __init__(
+        self,
+        get_session: Callable[[], Session],
+        table: type[Base],
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        max_buffer: int = DEFAULT_MAX_BUFFER,
+    ) -> None:
+        self._get_session = get_session
+        self._table = table
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._max_buffer = max_buffer
+
+        self._buffer: deque[dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._kill_received = False
+        self.written = 0
+        self.dropped = 0
+
+        self._thread = RestartableThread(
+            name=f"storage_writer.{table.__tablename__}",
+            target=self._run,
+            daemon=True,
+            register=True,
+        )
+        self._thread.start()
+
+    def insert(self, row: dict[str, Any]) -> None:
+        """Queue a row to be inserted."""
+        with self._lock:
+            stopped = self._kill_received
+            if not stopped and len(self._buffer) >= self._max_buffer:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    LOGGER.warning(
+                        f"Write buffer for table {self._table.__tablename__} is "
+                        f"full, {self.dropped} rows dropped so far"
+                    )
+                return
+            self._buffer.append(row)
+            if len(self._buffer) >= self._max_batch:
+                self._wakeup.set()
+        if stopped:
+            self.flush()
+
+    def _take_batch(self) -> list[dict[str, Any]]:
+        """Remove and return up to max_batch rows from the buffer."""
+        with self._lock:
+            return [
+                self._buffer.popleft()
+                for _ in range(min(len(self._buffer), self._max_batch))
+            ]
+
+    def _execute(self, session: Session, batch: list[dict[str, Any]]) -> None:
+        """Execute the statements for a batch of rows."""
+        session.execute(insert(self._table), batch)
+
+    def _committed(self, batch: list[dict[str, Any]]) -> None:
+        """Handle a batch of rows that has been committed."""
+
+    def _write(self, batch: list[dict[str, Any]]) -> None:
+        """Write a batch of rows.
+
+        If the batch fails, its rows are written one by one so that a single bad
+        row does not discard the others.
+        """
+        try:
+            with self._get_session() as session:
+                self._execute(session, batch)
+                session.commit()
+        except Exception:  # pylint: disable=broad-except
+            if len(batch) > 1:
+                LOGGER.warning(
+                    f"Failed to write {len(batch)} rows to table "
+                    f"{self._table.__tablename__}, writing them one by one",
+                    exc_info=True,
+                )
+                for row in batch:
+                    self._write([row])
+                return
+            self.dropped += 1
+            LOGGER.exception(
+                f"Failed to write row to table {self._table.__tablename__}"
+            )
+            return
+        self._committed(batch)
+        self.written += len(batch)
+
+    def flush(self) -> None:
+        """Write all buffered rows."""
+        with self._flush_lock:
+            while batch := self._take_batch():
+                self._write(batch)
+
+    def _run(self) -> None:
+        """Flush the buffer periodically."""
+        while not self._kill_received:
+            self._wakeup.wait(self._max_delay)
+            self._wakeup.clear()
+            self.flush()
+
+    def stop(self) -> None:
+        """Stop the writer thread and write the remaining rows."""
+        with self._lock:
+            self._kill_received = True
+        self._wakeup.set()
+        self._thread.stop()
+        self._thread.join()
+        self.flush()
+        LOGGER.debug(
+            f"Writer for table {self._table.__tablename__} stopped, "
+            f"{self.written} rows written, {self.dropped} rows dropped"
+        )
+
+
+class MotionWriter(BatchWriter):
+    """Write motion events and their contours in batches.
+
+    Rows are dicts with a "token" identifying the motion event. A row with
+    "start_time" starts an event and may carry encoded "contours", a row with
+    "end_time" ends the event started with the same token. The database id of the
+    event is only known to the writer, which lets the motion detector queue the end
+    of an event before its start has been written.
+    """
+
+    def __init__(self, get_session: Callable[[], Session], **kwargs) -> None:
+        self._motion_ids: dict[Any, int] = {}
+        super().__init__(get_session, Motion, **kwargs)
+
+    def _execute(self, session: Session, batch: list[dict[str, Any]]) -> None:
+        """Insert started events and contours, then set end time of ended events."""
+        started = [row for row in batch if "start_time" in row]
+        if started:
+            motion_ids = session.scalars(
+                insert(Motion).returning(Motion.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "camera_identifier": row["camera_identifier"],
+                        "start_time": row["start_time"],
+                        "end_time": None,
+                    }
+                    for row in started
+                ],
+            ).all()
+            for row, motion_id in zip(started, motion_ids):
+                self._motion_ids[row["token"]] = motion_id
+
+        contours: list[dict[str, Any]] = []
+        ended: list[dict[str, Any]] = []
+        for row in batch:
+            if "start_time" in row:
+                motion_id = self._motion_ids[row["token"]]
+                contours += [
+                    {"motion_id": motion_id, "contour": contour}
+                    for contour in row.get("contours", [])
+                ]
+            elif (ended_id := self._motion_ids.get(row["token"])) is not None:
+                ended.append({"id": ended_id, "end_time": row["end_time"]})
+
+        if contours:
+            session.execute(insert(MotionContours), contours)
+        if ended:
+            session.execute(update(Motion), ended)
+
+    def _committed(self, batch: list[dict[str, Any]]) -> None:
+        """Forget the ids of ended events.
+
+        The ids are kept until the batch is committed so that the end of an event
+        can be written again if the batch fails.
+        """
+        for row in batch:
+            if "end_time" in row:
+                self._motion_ids.pop(row["token"], None)
@@ -8,6 +8,7 @@ from viseron.components.webserver.api.v1.events import EventsAPIHandler
 from viseron.components.webserver.api.v1.hls import HlsAPIHandler
 from viseron.components.webserver.api.v1.onboarding import OnboardingAPIHandler
 from viseron.components.webserver.api.v1.recordings import RecordingsAPIHandler
+from viseron.components.webserver.api.v1.system import SystemAPIHandler
 
 __all__ = (
     "AuthAPIHandler",
@@ -18,4 +19,5 @@ __all__ = (
     "HlsAPIHandler",
     "OnboardingAPIHandler",
     "RecordingsAPIHandler",
+    "SystemAPIHandler",
 )
@@ -13,6 +13,7 @@ from sqlalchemy import select
 
 from viseron.components.storage.models import (
     Motion,
+    MotionContours,
     Objects,
     PostProcessorResults,
     Recordings,
@@ -20,6 +21,7 @@ from viseron.components.storage.models import (
 from viseron.components.webserver.api.handlers import BaseAPIHandler
 from viseron.domains.camera import FailedCamera
 from viseron.domains.face_recognition import DOMAIN as FACE_RECOGNITION_DOMAIN
+from viseron.domains.motion_detector.contours import decode_contour
 
 if TYPE_CHECKING:
     from sqlalchemy.orm import Session
@@ -49,6 +51,14 @@ class EventsAPIHandler(BaseAPIHandler):
                 )
             ),
         },
+        {
+            "path_pattern": (
+                r"/events/(?P<camera_identifier>[A-Za-z0-9_]+)"
+                r"/motion/(?P<motion_id>[0-9]+)/contours"
+            ),
+            "supported_methods": ["GET"],
+            "method": "get_motion_contours",
+        },
     ]
 
     def _motion_events(
@@ -87,6 +97,35 @@ class EventsAPIHandler(BaseAPIHandler):
                 )
         return motion_events
 
+    def _motion_contours(
+        self,
+        get_session: Callable[[], Session],
+        camera: AbstractCamera | FailedCamera,
+        motion_id: int,
+    ) -> list | None:
+        """Select and decode the contours of a motion event from database.
+
+        Returns None if the motion event does not exist.
+        """
+        with get_session() as session:
+            stmt = (
+                select(Motion.id, MotionContours.contour)
+                .outerjoin(MotionContours, MotionContours.motion_id == Motion.id)
+                .where(Motion.id == motion_id)
+                .where(Motion.camera_identifier == camera.identifier)
+                .order_by(MotionContours.id)
+            )
+            rows = session.execute(stmt).all()
+        if not rows:
+            return None
+        contours = []
+        for row in rows:
+            if row.contour is None:
+                continue
+            points, relative = decode_contour(row.contour)
+            contours.append({"points": points.tolist(), "relative": relative})
+        return contours
+
     def _object_event(
         self,
         get_session: Callable[[], Session],
@@ -261,3 +300,33 @@ class EventsAPIHandler(BaseAPIHandler):
         )
 
         self.response_success(response={"events": sorted_events})
+
+    async def get_motion_contours(
+        self,
+        camera_identifier: str,
+        motion_id: str,
+    ) -> None:
+        """Get decoded contours of a motion event."""
+        camera = self._get_camera(camera_identifier, failed=True)
+
+        if not camera:
+            self.response_error(
+                HTTPStatus.NOT_FOUND,
+                reason=f"Camera {camera_identifier} not found",
+            )
+            return
+
+        contours = await self.run_in_executor(
+            self._motion_contours,
+            self._get_session,
+            camera,
+            int(motion_id),
+        )
+        if contours is None:
+            self.response_error(
+                HTTPStatus.NOT_FOUND,
+                reason=f"Motion event {motion_id} not found",
+            )
+            return
+
+        self.response_success(response={"contours": contours})
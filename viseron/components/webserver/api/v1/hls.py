@@ -1,64 +1,162 @@
 """API handler for vod."""
 from __future__ import annotations
 
+import asyncio
+import bisect
 import datetime
 import logging
 import os
+import threading
 import time
-from collections.abc import Callable
+from collections import Counter, OrderedDict
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
 from http import HTTPStatus
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING
 
 import voluptuous as vol
-from sqlalchemy import Row, select
+from sqlalchemy import select
+from tornado.ioloop import IOLoop
 
 from viseron.components.storage.models import Files, Recordings
-from viseron.components.storage.queries import get_time_period_fragments
 from viseron.components.webserver.api.handlers import BaseAPIHandler
 from viseron.const import CAMERA_SEGMENT_DURATION
+from viseron.domains.camera.const import EVENT_FRAGMENT_CREATED
 from viseron.domains.camera.fragmenter import Fragment, generate_playlist
 from viseron.helpers import utcnow
-from viseron.helpers.fixed_size_dict import FixedSizeDict
 from viseron.helpers.validators import request_argument_no_value
 
 if TYPE_CHECKING:
     from sqlalchemy.orm import Session
 
+    from viseron.components.storage.fragment_index import FragmentIndex, IndexedFragment
     from viseron.domains.camera import AbstractCamera, FailedCamera
 
 LOGGER = logging.getLogger(__name__)
 
+# Seconds a blocking playlist reload waits for the requested fragment
+BLOCKING_RELOAD_TIMEOUT = CAMERA_SEGMENT_DURATION * 3
+# Seconds without a playlist request after which an HLS client is forgotten
+HLS_CLIENT_TIMEOUT = CAMERA_SEGMENT_DURATION * 12
 
-def count_files_removed(
-    previous_list: list[Fragment], current_list: list[Fragment]
-) -> int:
-    """Count the number of Fragments removed from the previous playlist."""
-    if not previous_list:
-        return 0
-    if not current_list:
-        return len(previous_list)
 
-    index = 0
-    for index, file in enumerate(previous_list):
-        if file.filename == current_list[0].filename:
-            return index
-    return index + 1
+@dataclass
+class HlsPlaylist:
+    """Generated time period playlist."""
+
+    content: str
+    # Media sequence number of the next fragment to be added to the playlist
+    next_media_sequence: int
+    end: bool
 
 
 @dataclass
 class HlsClient:
-    """Dataclass for HLS client to keep track of removed files in live playlists."""
+    """HLS client of a live playlist."""
 
     client_id: str
-    fragments: list[Fragment]
+    camera_identifier: str
     media_sequence: int
+    # Number of fragments in the last playlist and the sequence of its last one
+    fragment_count: int
+    last_sequence: int | None
+    last_seen: float
+
+
+class HlsClients:
+    """HLS clients of live playlists, keyed by Hls-Client-Id.
+
+    Clients are kept ordered by their last request, so the ones that have not
+    requested a playlist for HLS_CLIENT_TIMEOUT seconds are evicted from the
+    front.
+    """
+
+    def __init__(self, timeout: float = HLS_CLIENT_TIMEOUT) -> None:
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._clients: OrderedDict[str, HlsClient] = OrderedDict()
+        self._viewers: Counter[str] = Counter()
+
+    def __len__(self) -> int:
+        """Return the number of clients."""
+        return len(self._clients)
+
+    def _remove(self, client_id: str) -> None:
+        client = self._clients.pop(client_id)
+        self._viewers[client.camera_identifier] -= 1
+        if not self._viewers[client.camera_identifier]:
+            del self._viewers[client.camera_identifier]
+
+    def _evict(self, now: float) -> None:
+        """Remove clients that have timed out."""
+        while self._clients:
+            client_id, client = next(iter(self._clients.items()))
+            if now - client.last_seen < self._timeout:
+                break
+            self._remove(client_id)
+
+    def update(
+        self,
+        client_id: str,
+        camera_identifier: str,
+        fragments: list[IndexedFragment],
+    ) -> int:
+        """Return the media sequence of a client's playlist.
+
+        Fragments are only dropped from the start of a live playlist and added to
+        its end. The fragments up to the last one of the previous playlist are
+        found by bisecting on their sequence, the rest of the previous playlist has
+        been dropped and advances the media sequence.
+        """
+        now = time.monotonic()
+        last_sequence = fragments[-1].sequence if fragments else None
+        with self._lock:
+            self._evict(now)
+            client = self._clients.get(client_id)
+            if client and client.camera_identifier != camera_identifier:
+                self._remove(client_id)
+                client = None
+
+            if client is None:
+                client = HlsClient(
+                    client_id,
+                    camera_identifier,
+                    0,
+                    len(fragments),
+                    last_sequence,
+                    now,
+                )
+                self._clients[client_id] = client
+                self._viewers[camera_identifier] += 1
+                return client.media_sequence
+
+            kept = (
+                bisect.bisect_right(
+                    fragments,
+                    client.last_sequence,
+                    key=lambda fragment: fragment.sequence,
+                )
+                if client.last_sequence is not None
+                else 0
+            )
+            client.media_sequence += max(client.fragment_count - kept, 0)
+            client.fragment_count = len(fragments)
+            client.last_sequence = last_sequence
+            client.last_seen = now
+            self._clients.move_to_end(client_id)
+            return client.media_sequence
+
+    def active_viewers(self, camera_identifier: str) -> int:
+        """Return the number of clients watching the live playlist of a camera."""
+        with self._lock:
+            self._evict(time.monotonic())
+            return self._viewers[camera_identifier]
 
 
 class HlsAPIHandler(BaseAPIHandler):
     """API handler for HLS."""
 
-    hls_client_ids: FixedSizeDict[str, HlsClient] = FixedSizeDict(maxlen=10)
+    hls_clients = HlsClients()
 
     routes = [
         {
@@ -82,9 +180,20 @@ class HlsAPIHandler(BaseAPIHandler):
                         vol.Coerce(int)
                     ),
                     vol.Optional("daily", default=False): request_argument_no_value,
+                    # LL-HLS delivery directives
+                    vol.Optional("_HLS_msn", default=None): vol.Maybe(vol.Coerce(int)),
+                    vol.Optional("_HLS_part", default=None): vol.Maybe(vol.Coerce(int)),
+                    vol.Optional("_HLS_skip", default=None): vol.Maybe(
+                        vol.In(["YES", "v2"])
+                    ),
                 }
             ),
         },
+        {
+            "path_pattern": (r"/hls/(?P<camera_identifier>[A-Za-z0-9_]+)/viewers"),
+            "supported_methods": ["GET"],
+            "method": "get_hls_viewers",
+        },
         {
             "path_pattern": (
                 r"/hls/(?P<camera_identifier>[A-Za-z0-9_]+)/available_timespans"
@@ -121,7 +230,11 @@ class HlsAPIHandler(BaseAPIHandler):
             return
 
         playlist = await self.run_in_executor(
-            _generate_playlist, self._get_session, camera, recording_id
+            _generate_playlist,
+            self._get_session,
+            camera,
+            self._storage.get_fragment_index(camera.identifier),
+            recording_id,
         )
         if not playlist:
             self.response_error(
@@ -149,15 +262,42 @@ class HlsAPIHandler(BaseAPIHandler):
             return
 
         hls_client_id = self.request.headers.get("Hls-Client-Id", None)
-        playlist = await self.run_in_executor(
-            _generate_playlist_time_period,
-            self._get_session,
-            camera,
-            hls_client_id,
-            self.request_arguments["start_timestamp"],
-            self.request_arguments["end_timestamp"],
-            self.request_arguments["daily"],
-        )
+        fragment_index = self._storage.get_fragment_index(camera.identifier)
+
+        async def generate() -> HlsPlaylist | None:
+            return await self.run_in_executor(
+                _generate_playlist_time_period,
+                self._get_session,
+                camera,
+                fragment_index,
+                hls_client_id,
+                self.request_arguments["start_timestamp"],
+                self.request_arguments["end_timestamp"],
+                self.request_arguments["daily"],
+                self.request_arguments["_HLS_skip"] is not None,
+            )
+
+        playlist = await generate()
+
+        media_sequence_number = self.request_arguments["_HLS_msn"]
+        if (
+            playlist
+            and not playlist.end
+            and media_sequence_number is not None
+            and media_sequence_number >= playlist.next_media_sequence
+        ):
+            # The LL-HLS spec only allows blocking for the next two segments
+            if media_sequence_number > playlist.next_media_sequence + 1:
+                self.response_error(
+                    HTTPStatus.BAD_REQUEST,
+                    f"Media sequence number {media_sequence_number} is too far in "
+                    "the future",
+                )
+                return
+            playlist = await self._blocking_reload(
+                camera.identifier, media_sequence_number, generate
+            )
+
         if not playlist:
             self.response_error(
                 HTTPStatus.NOT_FOUND, "HLS playlist could not be generated"
@@ -167,7 +307,63 @@ class HlsAPIHandler(BaseAPIHandler):
         self.set_header("Content-Type", "application/x-mpegURL")
         self.set_header("Cache-control", "no-cache, must-revalidate, max-age=0")
         self.set_header("Access-Control-Allow-Origin", "*")
-        self.response_success(response=playlist)
+        self.response_success(response=playlist.content)
+
+    async def _blocking_reload(
+        self,
+        camera_identifier: str,
+        media_sequence_number: int,
+        generate: Callable[[], Awaitable[HlsPlaylist | None]],
+    ) -> HlsPlaylist | None:
+        """Regenerate the playlist as fragments are created.
+
+        Returns when the playlist contains media_sequence_number or after
+        BLOCKING_RELOAD_TIMEOUT seconds, whichever comes first.
+        """
+        fragment_created = asyncio.Event()
+        unsubscribe = self._vis.listen_event(
+            EVENT_FRAGMENT_CREATED.format(camera_identifier=camera_identifier),
+            lambda _event: fragment_created.set(),
+            ioloop=IOLoop.current(),
+        )
+        deadline = IOLoop.current().time() + BLOCKING_RELOAD_TIMEOUT
+        try:
+            while True:
+                # Generated after subscribing so that no fragment is missed
+                fragment_created.clear()
+                playlist = await generate()
+                if (
+                    not playlist
+                    or playlist.end
+                    or media_sequence_number < playlist.next_media_sequence
+                ):
+                    return playlist
+                try:
+                    await asyncio.wait_for(
+                        fragment_created.wait(), deadline - IOLoop.current().time()
+                    )
+                except asyncio.TimeoutError:
+                    return playlist
+        finally:
+            unsubscribe()
+
+    async def get_hls_viewers(
+        self,
+        camera_identifier: str,
+    ):
+        """Get the number of clients watching the live playlist of a camera."""
+        camera = self._get_camera(camera_identifier, failed=True)
+
+        if not camera:
+            self.response_error(
+                HTTPStatus.NOT_FOUND,
+                reason=f"Camera {camera_identifier} not found",
+            )
+            return
+
+        self.response_success(
+            response={"viewers": self.hls_clients.active_viewers(camera.identifier)}
+        )
 
     async def get_available_timespans(
         self,
@@ -197,7 +393,7 @@ class HlsAPIHandler(BaseAPIHandler):
         timespans = await self.run_in_executor(
             _get_available_timespans,
             self._get_session,
-            camera,
+            self._storage.get_fragment_index(camera.identifier),
             time_from,
             time_to,
         )
@@ -206,54 +402,27 @@ class HlsAPIHandler(BaseAPIHandler):
 
 def _get_available_timespans(
     get_session: Callable[[], Session],
-    camera: AbstractCamera | FailedCamera,
+    fragment_index: FragmentIndex,
     time_from: int,
     time_to: int | None = None,
 ):
     """Get the available timespans of HLS fragments for a time period."""
-    files = get_time_period_fragments(
-        camera.identifier, time_from, time_to, get_session
-    )
-    fragments = [
-        Fragment(
-            file.filename,
-            f"/files{file.path}",
-            float(
-                file.meta["m3u8"]["EXTINF"],
-            ),
-            file.orig_ctime,
-        )
-        for file in files
-        if file.meta.get("m3u8", {}).get("EXTINF", False)
-    ]
-
-    timespans = []
-    start = None
-    end = None
-    for fragment in fragments:
-        if start is None:
-            start = fragment.creation_time.timestamp()
-        if end is None:
-            end = fragment.creation_time.timestamp() + fragment.duration
-        if fragment.creation_time.timestamp() > end + fragment.duration:
-            timespans.append(
-                {"start": int(start), "end": int(end), "duration": int(end - start)}
-            )
-            start = None
-            end = None
-        else:
-            end = fragment.creation_time.timestamp() + fragment.duration
-    if start is not None and end is not None:
-        timespans.append(
-            {"start": int(start), "end": int(end), "duration": int(end - start)}
-        )
-    return timespans
+    return fragment_index.coverage.timespans(get_session, time_from, time_to)
 
 
 def _get_init_file(
-    get_session: Callable[[], Session], camera: AbstractCamera | FailedCamera
+    get_session: Callable[[], Session],
+    camera: AbstractCamera | FailedCamera,
+    fragment_index: FragmentIndex,
 ) -> str | None:
-    """Get the init file for a camera."""
+    """Get the init file for a camera.
+
+    The init file found is kept in the fragment index and only looked up again
+    if it is removed.
+    """
+    if fragment_index.init_file and os.path.exists(fragment_index.init_file):
+        return fragment_index.init_file
+
     with get_session() as session:
         stmt = (
             select(Files)
@@ -267,7 +436,8 @@ def _get_init_file(
 
     for file in files:
         if os.path.exists(os.path.join(file.directory, "init.mp4")):
-            return os.path.join(file.directory, "init.mp4")
+            fragment_index.init_file = os.path.join(file.directory, "init.mp4")
+            return fragment_index.init_file
     LOGGER.error(f"Could not find init.mp4 file for camera {camera.identifier}")
     return None
 
@@ -275,6 +445,7 @@ def _get_init_file(
 def _generate_playlist(
     get_session: Callable[[], Session],
     camera: AbstractCamera | FailedCamera,
+    fragment_index: FragmentIndex,
     recording_id: int,
 ) -> str | None:
     """Generate the HLS playlist for a recording."""
@@ -322,7 +493,7 @@ def _generate_playlist(
         LOGGER.debug("Recording has ended but the last file is not finished yet")
         end = False
 
-    init_file = _get_init_file(get_session, camera)
+    init_file = _get_init_file(get_session, camera, fragment_index)
     if not init_file:
         return None
 
@@ -335,7 +506,7 @@ def _generate_playlist(
     return playlist
 
 
-def has_gap_before_start(files: list[Row[Any]], start_timestamp: int) -> bool:
+def has_gap_before_start(files: list[IndexedFragment], start_timestamp: int) -> bool:
     """Check if there is a gap before the start of the playlist."""
     if files and files[0].orig_ctime - datetime.datetime.fromtimestamp(
         start_timestamp, datetime.timezone.utc
@@ -344,7 +515,9 @@ def has_gap_before_start(files: list[Row[Any]], start_timestamp: int) -> bool:
     return False
 
 
-def has_gap_in_segments(prev_file: Row[Any] | None, file: Row[Any]) -> bool:
+def has_gap_in_segments(
+    prev_file: IndexedFragment | None, file: IndexedFragment
+) -> bool:
     """Check if there is a gap in segments."""
     if prev_file and file.orig_ctime - prev_file.orig_ctime > datetime.timedelta(
         seconds=CAMERA_SEGMENT_DURATION * 3
@@ -353,39 +526,24 @@ def has_gap_in_segments(prev_file: Row[Any] | None, file: Row[Any]) -> bool:
     return False
 
 
-def update_hls_client(
-    hls_client_id: str,
-    fragments: list[Fragment],
-) -> int:
-    """Keep track of HLS client media sequence."""
-    media_sequence = 0
-    hls_client = HlsAPIHandler.hls_client_ids.get(hls_client_id, None)
-    if hls_client:
-        media_sequence = hls_client.media_sequence
-        media_sequence += count_files_removed(hls_client.fragments, fragments)
-        hls_client.fragments = fragments
-        hls_client.media_sequence = media_sequence
-    else:
-        HlsAPIHandler.hls_client_ids[hls_client_id] = HlsClient(
-            hls_client_id, fragments, media_sequence
-        )
-    return media_sequence
-
-
 def _generate_playlist_time_period(
     get_session: Callable[[], Session],
     camera: AbstractCamera | FailedCamera,
+    fragment_index: FragmentIndex,
     hls_client_id: str | None,
     start_timestamp: int,
     end_timestamp: int | None = None,
     end_playlist_at_timestamp: bool = False,
-) -> str | None:
-    """Generate the HLS playlist for a time period."""
-    files = get_time_period_fragments(
-        camera.identifier, start_timestamp, end_timestamp, get_session
-    )
+    skip: bool = False,
+) -> HlsPlaylist | None:
+    """Generate the HLS playlist for a time period.
+
+    Playlists that have not ended support blocking reloads and, if skip is set,
+    are returned as delta updates.
+    """
+    files = fragment_index.fragments(get_session, start_timestamp, end_timestamp)
     fragments = []
-    prev_file: Row[Any] | None = None
+    prev_file: IndexedFragment | None = None
     end_playlist = bool(end_timestamp) if not end_playlist_at_timestamp else False
 
     if has_gap_before_start(files, start_timestamp):
@@ -396,24 +554,25 @@ def _generate_playlist_time_period(
                 end_playlist = True
                 break
 
-            if file.meta.get("m3u8", {}).get("EXTINF", False):
-                fragments.append(
-                    Fragment(
-                        file.filename,
-                        f"/files{file.path}",
-                        float(file.meta["m3u8"]["EXTINF"]),
-                        file.orig_ctime,
-                    )
+            fragments.append(
+                Fragment(
+                    file.filename,
+                    f"/files{file.path}",
+                    file.duration,
+                    file.orig_ctime,
                 )
-                prev_file = file
+            )
+            prev_file = file
 
     media_sequence = (
-        update_hls_client(hls_client_id, fragments)
+        HlsAPIHandler.hls_clients.update(
+            hls_client_id, camera.identifier, files[: len(fragments)]
+        )
         if end_timestamp is None and hls_client_id
         else 0
     )
 
-    init_file = _get_init_file(get_session, camera)
+    init_file = _get_init_file(get_session, camera, fragment_index)
     if not init_file:
         return None
 
@@ -423,5 +582,7 @@ def _generate_playlist_time_period(
         media_sequence=media_sequence,
         end=end_playlist,
         file_directive=False,
+        server_control=not end_playlist,
+        skip=skip,
     )
-    return playlist
+    return HlsPlaylist(playlist, media_sequence + len(fragments), end_playlist)
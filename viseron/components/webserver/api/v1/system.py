@@ -0,0 +1,25 @@
+"""System API Handler."""
+from __future__ import annotations
+
+from viseron.components.data_stream import COMPONENT as DATA_STREAM_COMPONENT
+from viseron.components.webserver.api.handlers import BaseAPIHandler
+from viseron.components.webserver.auth import Group
+
+
+class SystemAPIHandler(BaseAPIHandler):
+    """Handler for API calls related to the system."""
+
+    routes = [
+        {
+            "path_pattern": r"/system/data_stream",
+            "requires_group": [Group.ADMIN],
+            "supported_methods": ["GET"],
+            "method": "get_data_stream_statistics",
+        },
+    ]
+
+    async def get_data_stream_statistics(self) -> None:
+        """Return data stream statistics."""
+        self.response_success(
+            response=self._vis.data[DATA_STREAM_COMPONENT].statistics()
+        )
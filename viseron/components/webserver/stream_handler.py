@@ -10,7 +10,11 @@ import tornado.ioloop
 import tornado.web
 from tornado.queues import Queue
 
-from viseron.components.data_stream import DataStream
+from viseron.components.data_stream import (
+    COMPONENT as DATA_STREAM_COMPONENT,
+    LANE_BULK,
+    DataStream,
+)
 from viseron.components.nvr import COMPONENT as NVR_COMPONENT
 from viseron.components.nvr.const import DATA_PROCESSED_FRAME_TOPIC
 from viseron.components.nvr.nvr import NVR, DataProcessedFrame
@@ -225,7 +229,9 @@ class StaticStreamHandler(StreamHandler):
             )
 
             if ret:
-                DataStream.publish_data(publish_frame_topic, jpg)
+                self._vis.data[DATA_STREAM_COMPONENT].publish_data(
+                    publish_frame_topic, jpg, lane=LANE_BULK
+                )
 
         DataStream.unsubscribe_data(frame_topic, unique_id)
         LOGGER.debug(f"Closing stream {mjpeg_stream}")
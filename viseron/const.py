@@ -106,6 +106,7 @@ ENV_RASPBERRYPI3 = "VISERON_RASPBERRYPI3"
 ENV_RASPBERRYPI4 = "VISERON_RASPBERRYPI4"
 ENV_JETSON_NANO = "VISERON_JETSON_NANO"
 ENV_PROFILE_MEMORY = "VISERON_PROFILE_MEMORY"
+ENV_DATA_STREAM_DISPATCH = "VISERON_DATA_STREAM_DISPATCH"
 
 
 FONT = cv2.FONT_HERSHEY_SIMPLEX
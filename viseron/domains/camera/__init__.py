@@ -6,8 +6,10 @@ import os
 import secrets
 from abc import ABC, abstractmethod
 from collections import deque
+from collections.abc import Callable
 from dataclasses import dataclass
 from functools import lru_cache
+from queue import Full, Queue
 from threading import Event, Timer
 from typing import TYPE_CHECKING, Any, Literal
 from uuid import uuid4
@@ -36,7 +38,7 @@ from viseron.components.storage.const import (
 )
 from viseron.components.storage.models import Files
 from viseron.components.webserver.const import COMPONENT as WEBSERVER_COMPONENT
-from viseron.const import TEMP_DIR
+from viseron.const import TEMP_DIR, VISERON_SIGNAL_STOPPING
 from viseron.domains.camera.entity.sensor import CamerAccessTokenSensor
 from viseron.domains.camera.fragmenter import Fragmenter
 from viseron.domains.camera.recorder import FailedCameraRecorder
@@ -50,6 +52,7 @@ from viseron.helpers import (
 )
 from viseron.helpers.logs import SensitiveInformationFilter
 from viseron.helpers.validators import CoerceNoneToDict, Deprecated, Maybe, Slug
+from viseron.watchdog.thread_watchdog import RestartableThread
 
 from .const import (
     AUTHENTICATION_BASIC,
@@ -376,7 +379,21 @@ class EventStatusData(EventData):
     status: str
 
 
+@dataclass
+class SnapshotRequest:
+    """Snapshot waiting to be saved by the snapshot writer."""
+
+    shared_frame: SharedFrame
+    domain: Literal["object_detector"] | Literal["face_recognition"] | Literal[
+        "license_plate_recognition"
+    ]
+    relative_coords: tuple[float, float, float, float] | None
+    subfolder: str | None
+    callback: Callable[[str | None], None] | None
+
+
 DATA_FRAME_BYTES_TOPIC = "{camera_identifier}/camera/frame_bytes"
+SNAPSHOT_QUEUE_SIZE = 100
 
 
 class AbstractCamera(ABC):
@@ -394,6 +411,7 @@ class AbstractCamera(ABC):
         self._data_stream: DataStream = vis.data[DATA_STREAM_COMPONENT]
         self.current_frame: SharedFrame | None = None
         self.shared_frames = SharedFrames()
+        vis.register_signal_handler(VISERON_SIGNAL_STOPPING, self.shared_frames.close)
         self.frame_bytes_topic = DATA_FRAME_BYTES_TOPIC.format(
             camera_identifier=self.identifier
         )
@@ -424,6 +442,16 @@ class AbstractCamera(ABC):
             self, "face_recognition"
         )
 
+        self._snapshot_queue: Queue[SnapshotRequest] = Queue(
+            maxsize=SNAPSHOT_QUEUE_SIZE
+        )
+        RestartableThread(
+            name=f"viseron.camera.{self.identifier}.snapshot_writer",
+            target=self._snapshot_writer,
+            daemon=True,
+            register=True,
+        ).start()
+
         self.fragmenter: Fragmenter = Fragmenter(vis, self)
         if self.config[CONFIG_PASSWORD]:
             SensitiveInformationFilter.add_sensitive_string(
@@ -675,12 +703,61 @@ class AbstractCamera(ABC):
         path = os.path.join(folder, filename)
         self._logger.debug(f"Saving snapshot to {path}")
         create_directory(folder)
-        cv2.imwrite(
+        if cv2.imwrite(
             path,
             snapshot_frame,
-        )
+        ):
+            self._storage.register_file_created(path)
         return path
 
+    def save_snapshot_in_background(
+        self,
+        shared_frame: SharedFrame,
+        domain: Literal["object_detector"]
+        | Literal["face_recognition"]
+        | Literal["license_plate_recognition"],
+        relative_coords: tuple[float, float, float, float] | None = None,
+        subfolder: str | None = None,
+        callback: Callable[[str | None], None] | None = None,
+    ) -> None:
+        """Save snapshot to disk from the snapshot writer thread.
+
+        callback is called with the path of the snapshot, or None if it could not
+        be saved. The frame is referenced until the snapshot is written.
+        """
+        self.shared_frames.acquire(shared_frame)
+        try:
+            self._snapshot_queue.put_nowait(
+                SnapshotRequest(
+                    shared_frame, domain, relative_coords, subfolder, callback
+                )
+            )
+        except Full:
+            self.shared_frames.remove(shared_frame)
+            self._logger.warning("Snapshot queue is full, skipping snapshot")
+            if callback:
+                callback(None)
+
+    def _snapshot_writer(self) -> None:
+        """Save queued snapshots."""
+        while True:
+            request = self._snapshot_queue.get()
+            path = None
+            try:
+                path = self.save_snapshot(
+                    request.shared_frame,
+                    request.domain,
+                    request.relative_coords,
+                    request.subfolder,
+                )
+            except Exception:  # pylint: disable=broad-except
+                self._logger.exception("Failed to save snapshot")
+            finally:
+                self.shared_frames.remove(request.shared_frame)
+
+            if request.callback:
+                request.callback(path)
+
 
 class FailedCamera:
     """Failed camera.
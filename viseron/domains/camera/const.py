@@ -23,6 +23,8 @@ EVENT_CAMERA_STOP = "{camera_identifier}/camera/stop"
 EVENT_CAMERA_STARTED = "{camera_identifier}/camera/started"
 EVENT_CAMERA_STOPPED = "{camera_identifier}/camera/stopped"
 
+EVENT_FRAGMENT_CREATED = "{camera_identifier}/fragment/created"
+
 
 # MJPEG_STREAM_SCHEMA constants
 CONFIG_MJPEG_WIDTH = "width"
@@ -29,7 +29,9 @@ from viseron.domains.camera.const import (
     CONFIG_RECORDER_HWACCEL_ARGS,
     CONFIG_RECORDER_OUPTUT_ARGS,
     CONFIG_RECORDER_VIDEO_FILTERS,
+    EVENT_FRAGMENT_CREATED,
 )
+from viseron.events import EventData
 from viseron.helpers.logs import LogPipe
 
 if TYPE_CHECKING:
@@ -37,6 +39,10 @@ if TYPE_CHECKING:
     from viseron.components.storage import Storage
     from viseron.domains.camera import AbstractCamera
 
+# Delta playlists may skip fragments older than this many target durations from the
+# end of the playlist. LL-HLS requires at least six
+SKIP_UNTIL_TARGET_DURATIONS = 6
+
 
 def _get_open_files(path: str, process: psutil.Process) -> list[str]:
     """Get open files for a process."""
@@ -135,6 +141,9 @@ class Fragmenter:
 
     def _move_to_segments_folder(self, file: str):
         """Move fragmented mp4 to segments folder."""
+        segment_path = os.path.join(
+            self._camera.segments_folder, file.split(".")[0] + ".m4s"
+        )
         try:
             shutil.move(
                 os.path.join(
@@ -142,8 +151,9 @@ class Fragmenter:
                     file.split(".")[0],
                     "clip_1.m4s",
                 ),
-                os.path.join(self._camera.segments_folder, file.split(".")[0] + ".m4s"),
+                segment_path,
             )
+            self._storage.register_file_created(segment_path)
             shutil.move(
                 os.path.join(
                     self._camera.temp_segments_folder,
@@ -152,25 +162,43 @@ class Fragmenter:
                 ),
                 os.path.join(self._camera.segments_folder, "init.mp4"),
             )
+            self._vis.dispatch_event(
+                EVENT_FRAGMENT_CREATED.format(
+                    camera_identifier=self._camera.identifier
+                ),
+                EventFragmentCreatedData(
+                    filename=os.path.basename(segment_path), path=segment_path
+                ),
+                store=False,
+            )
         except FileNotFoundError:
             self._logger.debug(f"{file} not found")
+            if not os.path.exists(segment_path):
+                self._storage.get_fragment_index(self._camera.identifier).remove(
+                    [segment_path]
+                )
 
     def _write_files_metadata(self, file: str, extinf: float):
-        """Write metadata about the fragmented mp4 to the database."""
+        """Write metadata about the fragmented mp4 to the database.
+
+        The fragment is also added to the fragment index used to serve playlists.
+        """
+        path = os.path.join(self._camera.segments_folder, file.split(".")[0] + ".m4s")
         with self._storage.get_session() as session:
             orig_ctime = datetime.datetime.fromtimestamp(
                 int(file.split(".")[0]), tz=None
             ) - datetime.timedelta(seconds=time.localtime().tm_gmtoff)
 
             stmt = insert(FilesMeta).values(
-                path=os.path.join(
-                    self._camera.segments_folder, file.split(".")[0] + ".m4s"
-                ),
+                path=path,
                 orig_ctime=orig_ctime,
                 meta={"m3u8": {"EXTINF": extinf}},
             )
             session.execute(stmt)
             session.commit()
+        self._storage.get_fragment_index(self._camera.identifier).add(
+            path, extinf, orig_ctime.replace(tzinfo=datetime.timezone.utc)
+        )
 
     def _read_m3u8(self, file: str) -> str:
         return open(
@@ -346,23 +374,47 @@ def generate_playlist(
     media_sequence=0,
     end=False,
     file_directive=False,
+    server_control=False,
+    skip=False,
 ) -> str:
-    """Generate a playlist from a list of fragments."""
+    """Generate a playlist from a list of fragments.
+
+    If server_control is set, the playlist advertises blocking reloads and delta
+    updates. If skip is also set, fragments older than the skip boundary are
+    replaced by an EXT-X-SKIP tag.
+    """
+    target_duration = ceil(max(f.duration for f in fragments)) if fragments else 0
+    skip_until = target_duration * SKIP_UNTIL_TARGET_DURATIONS
+    skipped_segments = 0
+    if server_control and skip:
+        remaining = sum(f.duration for f in fragments)
+        for fragment in fragments:
+            if remaining <= skip_until:
+                break
+            remaining -= fragment.duration
+            skipped_segments += 1
+
     playlist = []
     playlist.append("#EXTM3U")
-    playlist.append("#EXT-X-VERSION:6")
+    playlist.append(f"#EXT-X-VERSION:{9 if skipped_segments else 6}")
 
     playlist.append(f"#EXT-X-MEDIA-SEQUENCE:{media_sequence}")
     if media_sequence:
         playlist.append(f"#EXT-X-DISCONTINUITY-SEQUENCE:{media_sequence}")
 
     if fragments:
-        target_duration = ceil(max(f.duration for f in fragments))
         playlist.append(f"#EXT-X-TARGETDURATION:{target_duration}")
+    if server_control and not end:
+        playlist.append(
+            "#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES,"
+            f"CAN-SKIP-UNTIL={float(skip_until)}"
+        )
 
     playlist.append("#EXT-X-INDEPENDENT-SEGMENTS")
     playlist.append(f'#EXT-X-MAP:URI="{_get_file_path(init_file, file_directive)}"')
-    for fragment in fragments:
+    if skipped_segments:
+        playlist.append(f"#EXT-X-SKIP:SKIPPED-SEGMENTS={skipped_segments}")
+    for fragment in fragments[skipped_segments:]:
         program_date_time = fragment.creation_time.replace(
             tzinfo=datetime.timezone.utc
         ).isoformat(timespec="milliseconds")
@@ -375,6 +427,14 @@ def generate_playlist(
     return "\n".join(playlist)
 
 
+@dataclass
+class EventFragmentCreatedData(EventData):
+    """Hold information on a fragment that has been written to the segments folder."""
+
+    filename: str
+    path: str
+
+
 @dataclass
 class Fragment:
     """Represents a fragment of a mp4 file."""
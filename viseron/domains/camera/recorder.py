@@ -210,7 +210,9 @@ class AbstractRecorder(ABC, RecorderBase):
             objects,
             resolution,
         )
-        if not cv2.imwrite(thumbnail_path, frame):
+        if cv2.imwrite(thumbnail_path, frame):
+            self._storage.register_file_created(thumbnail_path)
+        else:
             self._logger.error(f"Failed saving thumbnail {thumbnail_path} to disk")
 
         if self._config[CONFIG_RECORDER][CONFIG_THUMBNAIL][CONFIG_SAVE_TO_DISK]:
@@ -368,6 +370,7 @@ class AbstractRecorder(ABC, RecorderBase):
             recording.path,
         )
         self._logger.debug(f"Moved event clip to {recording.path}")
+        self._storage.register_file_created(recording.path)
 
         with self._storage.get_session() as session:
             stmt = (
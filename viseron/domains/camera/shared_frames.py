@@ -2,10 +2,15 @@
 from __future__ import annotations
 
 import logging
+import math
 import threading
 import time
 import uuid
-from functools import lru_cache
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
 
 import cv2
 import numpy as np
@@ -21,6 +26,14 @@ COLOR_MODEL_GRAY = "gray"
 CONVERTER = "converter"
 CHANNELS = "channels"
 
+# Number of frame buffers a camera can allocate until its fps is known
+DEFAULT_MAX_SLOTS = 100
+# Seconds a released frame buffer is kept intact before it is reused
+FRAME_RETENTION = 2
+# Frame buffers for frames referenced outside of the frame queue, like frames
+# being scanned or waiting to be written as snapshots
+EXTRA_SLOTS = 10
+
 PIXEL_FORMATS = {
     PIXEL_FORMAT_YUV420P: {
         COLOR_MODEL_RGB: {
@@ -64,75 +77,401 @@ class SharedFrame:
         self.camera_identifier = camera_identifier
         self.capture_time = time.time()
         self.reference_count = 0
+        self.slot: int | None = None
+        self._shared_frames: SharedFrames | None = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Exclude the owning SharedFrames when pickling."""
+        state = self.__dict__.copy()
+        state["_shared_frames"] = None
+        return state
 
     def __enter__(self) -> None:
         """Increase reference count."""
+        if self._shared_frames:
+            self._shared_frames.acquire(self)
+            return
         self.reference_count += 1
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         """Decrease reference count."""
+        if self._shared_frames:
+            self._shared_frames.remove(self)
+            return
         self.reference_count -= 1
 
 
+@dataclass
+class FrameSlot:
+    """A slot in the shared memory ring."""
+
+    buffer: memoryview
+    shm: SharedMemory | None = None
+    owner: uuid.UUID | None = None
+    acquired_at: float = 0.0
+    released_at: float = 0.0
+
+
+@dataclass
+class FrameConversions:
+    """Color converted versions of a single frame."""
+
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    frames: dict[str, np.ndarray] = field(default_factory=dict)
+
+
 class SharedFrames:
-    """Byte frame shared in memory."""
+    """Byte frames shared in memory.
+
+    Decoded frames are stored in a reference counted pool of POSIX shared memory
+    slots, one pool per camera. A SharedFrame only carries the index of its slot.
+
+    A frame holds one reference when it is created, which is dropped by calling
+    remove. Additional references are taken with acquire or by using the SharedFrame
+    as a context manager. When the last reference drops the slot is returned to the
+    pool. Returned slots are handed out again in the order they were released, once
+    they have been released for FRAME_RETENTION seconds, so that late readers of a
+    frame still see valid data.
+
+    The pool grows until it covers the frames in flight and is capped at max_slots,
+    after which memory usage is constant. Once the fps of the camera is known the
+    cap is sized with set_fps.
+    """
+
+    def __init__(self, max_slots: int = DEFAULT_MAX_SLOTS) -> None:
+        self._conversions: dict[uuid.UUID, FrameConversions] = {}
+        self._max_slots = max_slots
+        self.frame_queue_size = max_slots
+        self._slots: list[FrameSlot] = []
+        self._released_slots: deque[int] = deque()
+        self._slot_size = 0
+        self._shm_failed = False
+        self._lock = threading.Lock()
 
-    def __init__(self) -> None:
-        self._frames: dict[uuid.UUID | str, np.ndarray] = {}
+    def set_fps(self, fps: float) -> None:
+        """Size the pool for a camera producing fps frames per second.
+
+        frame_queue_size is the number of frames produced in FRAME_RETENTION, which
+        is how many frames a consumer should queue. The pool holds that many
+        released frames for late readers, a full queue and EXTRA_SLOTS.
+        """
+        with self._lock:
+            self.frame_queue_size = max(math.ceil(fps * FRAME_RETENTION), 1)
+            self._max_slots = self.frame_queue_size * 2 + EXTRA_SLOTS
+
+    def acquired_slots(self) -> int:
+        """Return the number of slots holding a referenced frame."""
+        with self._lock:
+            return sum(
+                1
+                for slot in self._slots
+                if slot.owner is not None and slot.released_at < slot.acquired_at
+            )
+
+    def _allocate_slot(self, size: int) -> FrameSlot:
+        """Allocate a new slot, falling back to private memory if shm is full."""
+        if not self._shm_failed:
+            try:
+                shm = SharedMemory(create=True, size=size)
+                return FrameSlot(buffer=shm.buf, shm=shm)
+            except OSError as error:
+                LOGGER.warning(
+                    "Failed to allocate shared memory for frame, falling back to "
+                    "process private memory. Consider increasing the size of "
+                    f"/dev/shm. Error: {error}"
+                )
+                self._shm_failed = True
+        return FrameSlot(buffer=memoryview(bytearray(size)))
+
+    def _reclaim_slot(self, now: float) -> int:
+        """Return the index of a slot that can be reused."""
+        if (
+            self._released_slots
+            and now - self._slots[self._released_slots[0]].released_at
+            >= FRAME_RETENTION
+        ):
+            return self._released_slots.popleft()
+
+        if len(self._slots) < self._max_slots:
+            self._slots.append(self._allocate_slot(self._slot_size))
+            return len(self._slots) - 1
+
+        if self._released_slots:
+            return self._released_slots.popleft()
+
+        # Every slot is referenced, which means a reference has been leaked.
+        # Reuse the oldest one to keep memory bounded.
+        index = min(range(len(self._slots)), key=lambda i: self._slots[i].acquired_at)
+        LOGGER.warning(
+            f"All {self._max_slots} frame buffers are in use, "
+            f"reusing buffer of frame {self._slots[index].owner}"
+        )
+        return index
+
+    def allocate(self, shared_frame: SharedFrame, size: int) -> memoryview:
+        """Assign a pooled buffer to the frame and return it for writing."""
+        now = time.monotonic()
+        with self._lock:
+            if size != self._slot_size:
+                self._close_slots()
+                self._slot_size = size
+
+            index = self._reclaim_slot(now)
+            slot = self._slots[index]
+            if slot.owner is not None:
+                self._remove_converted(slot.owner)
+            slot.owner = shared_frame.name
+            slot.acquired_at = now
+
+        shared_frame.slot = index
+        shared_frame.reference_count = 1
+        shared_frame._shared_frames = self  # pylint: disable=protected-access
+        return slot.buffer[:size]
+
+    def _get_slot(self, shared_frame: SharedFrame) -> FrameSlot:
+        """Return the slot holding the frame."""
+        try:
+            slot = self._slots[shared_frame.slot]  # type: ignore[index]
+        except (IndexError, TypeError) as error:
+            raise KeyError(shared_frame.name) from error
+        if slot.owner != shared_frame.name:
+            raise KeyError(shared_frame.name)
+        return slot
 
     def create(self, shared_frame: SharedFrame, frame_bytes: bytes) -> None:
         """Create frame in shared memory."""
-        self._frames[shared_frame.name] = np.frombuffer(frame_bytes, np.uint8).reshape(
-            shared_frame.color_plane_height, shared_frame.color_plane_width
-        )
+        self.allocate(shared_frame, len(frame_bytes))[:] = frame_bytes
+
+    def acquire(self, shared_frame: SharedFrame) -> None:
+        """Take an additional reference to the frame."""
+        with self._lock:
+            shared_frame.reference_count += 1
 
     def get_decoded_frame(self, shared_frame: SharedFrame) -> np.ndarray:
         """Return byte frame in numpy format."""
-        return self._frames[shared_frame.name]
+        return np.ndarray(
+            (shared_frame.color_plane_height, shared_frame.color_plane_width),
+            dtype=np.uint8,
+            buffer=self._get_slot(shared_frame).buffer,
+        )
+
+    def _get_converted(
+        self,
+        shared_frame: SharedFrame,
+        key: str,
+        convert: Callable[[SharedFrame], np.ndarray],
+    ) -> np.ndarray:
+        """Return a converted version of the frame, converting it on first access.
+
+        Conversions are cached per frame until its slot is reused. If several
+        threads ask for the same conversion at once, only the first one converts
+        and the others wait for its result.
+        """
+        with self._lock:
+            conversions = self._conversions.get(shared_frame.name, None)
+            if conversions is None:
+                self._get_slot(shared_frame)
+                conversions = FrameConversions()
+                self._conversions[shared_frame.name] = conversions
+
+        with conversions.lock:
+            converted_frame = conversions.frames.get(key, None)
+            if converted_frame is not None:
+                return converted_frame
+
+            converted_frame = convert(shared_frame)
+            conversions.frames[key] = converted_frame
+            return converted_frame
 
-    @lru_cache(maxsize=2)
     def _color_convert(self, shared_frame: SharedFrame, color_model: str) -> np.ndarray:
         """Return decoded frame in specified color format."""
-        shared_frame_name = f"{shared_frame.name}_{color_model}"
-        pixel_format = PIXEL_FORMATS[shared_frame.pixel_format]
-        if self._frames.get(shared_frame_name, None) is not None:
-            return self._frames[shared_frame_name]
-
-        decoded_frame = self.get_decoded_frame(shared_frame).copy()
-        decoded_frame = cv2.cvtColor(
-            decoded_frame, pixel_format[color_model][CONVERTER]
+        return self._get_converted(
+            shared_frame,
+            color_model,
+            lambda shared_frame: cv2.cvtColor(
+                self.get_decoded_frame(shared_frame),
+                PIXEL_FORMATS[shared_frame.pixel_format][color_model][CONVERTER],
+            ),
+        )
+
+    def _resize_to_rgb(
+        self, shared_frame: SharedFrame, width: int, height: int, interpolation: int
+    ) -> np.ndarray:
+        """Resize the YUV planes of the frame and convert the result to rgb."""
+        frame = self.get_decoded_frame(shared_frame)
+        frame_width, frame_height = shared_frame.resolution
+        # Chroma is subsampled by two so the resized planes must have even sizes
+        even_width = width + width % 2
+        even_height = height + height % 2
+
+        resized = np.empty((even_height * 3 // 2, even_width), np.uint8)
+        resized[:even_height] = cv2.resize(
+            frame[:frame_height],
+            (even_width, even_height),
+            interpolation=interpolation,
+        )
+        if shared_frame.pixel_format == PIXEL_FORMAT_NV12:
+            resized[even_height:] = cv2.resize(
+                frame[frame_height:].reshape(frame_height // 2, frame_width // 2, 2),
+                (even_width // 2, even_height // 2),
+                interpolation=interpolation,
+            ).reshape(even_height // 2, even_width)
+        else:
+            flat_frame = frame.reshape(-1)
+            flat_resized = resized.reshape(-1)
+            chroma_size = (frame_width // 2) * (frame_height // 2)
+            resized_chroma_size = (even_width // 2) * (even_height // 2)
+            for plane in range(2):
+                chroma_start = frame_width * frame_height + chroma_size * plane
+                resized_start = even_width * even_height + resized_chroma_size * plane
+                resized_chroma = cv2.resize(
+                    flat_frame[chroma_start : chroma_start + chroma_size].reshape(
+                        frame_height // 2, frame_width // 2
+                    ),
+                    (even_width // 2, even_height // 2),
+                    interpolation=interpolation,
+                )
+                flat_resized[
+                    resized_start : resized_start + resized_chroma_size
+                ] = resized_chroma.reshape(-1)
+
+        rgb_frame = cv2.cvtColor(
+            resized,
+            PIXEL_FORMATS[shared_frame.pixel_format][COLOR_MODEL_RGB][CONVERTER],
+        )
+        return rgb_frame[:height, :width]
+
+    def _letterbox_to_rgb(
+        self, shared_frame: SharedFrame, width: int, height: int
+    ) -> np.ndarray:
+        """Resize the frame keeping aspect ratio and pad with black pixels.
+
+        Produces the same output as helpers.letterbox_resize.
+        """
+        frame_width, frame_height = shared_frame.resolution
+        scale = min(height / frame_height, width / frame_width)
+        output_width = int(frame_width * scale)
+        output_height = int(frame_height * scale)
+
+        output_frame = np.zeros((height, width, 3), dtype=np.uint8)
+        output_frame[
+            (height - output_height) // 2 : (height - output_height) // 2
+            + output_height,
+            (width - output_width) // 2 : (width - output_width) // 2 + output_width,
+        ] = self._resize_to_rgb(
+            shared_frame, output_width, output_height, cv2.INTER_AREA
         )
+        return output_frame
 
-        self._frames[shared_frame_name] = decoded_frame
-        return decoded_frame
+    def get_decoded_frame_rgb_resized(
+        self,
+        shared_frame: SharedFrame,
+        resolution: tuple[int, int],
+        letterbox: bool = False,
+    ) -> np.ndarray:
+        """Return decoded frame in rgb numpy format, resized to (width, height).
+
+        The YUV planes are resized before converting to rgb, so pixels that would
+        be thrown away are never converted. If letterbox is True the aspect ratio
+        is kept and the frame is padded with black pixels.
+        The result is cached per frame and resolution, and must not be modified.
+        """
+        width, height = resolution
+        if letterbox:
+            return self._get_converted(
+                shared_frame,
+                f"{COLOR_MODEL_RGB}_letterbox_{width}x{height}",
+                lambda shared_frame: self._letterbox_to_rgb(
+                    shared_frame, width, height
+                ),
+            )
+        return self._get_converted(
+            shared_frame,
+            f"{COLOR_MODEL_RGB}_{width}x{height}",
+            lambda shared_frame: self._resize_to_rgb(
+                shared_frame, width, height, cv2.INTER_LINEAR
+            ),
+        )
 
     def get_decoded_frame_rgb(self, shared_frame: SharedFrame) -> np.ndarray:
         """Return decoded frame in rgb numpy format."""
         return self._color_convert(shared_frame, COLOR_MODEL_RGB)
 
     def get_decoded_frame_gray(self, shared_frame: SharedFrame) -> np.ndarray:
-        """Return decoded frame in gray numpy format."""
-        return self._color_convert(shared_frame, COLOR_MODEL_GRAY)
+        """Return decoded frame in gray numpy format.
 
-    def _remove(self, name) -> None:
-        try:
-            del self._frames[name]
-        except KeyError:
-            pass
+        For all supported pixel formats the luma plane is stored first, so the gray
+        frame is a read-only view of the first rows of the frame and nothing is
+        copied or converted.
+        """
+        gray_frame = self.get_decoded_frame(shared_frame)[: shared_frame.resolution[1]]
+        gray_frame.flags.writeable = False
+        return gray_frame
+
+    def get_decoded_frame_gray_resized(
+        self, shared_frame: SharedFrame, resolution: tuple[int, int]
+    ) -> np.ndarray:
+        """Return decoded frame in gray numpy format, resized to (width, height).
+
+        The luma plane is downscaled directly, which is all a motion detector needs.
+        The returned frame is a new array which is safe to modify.
+        """
+        return cv2.resize(
+            self.get_decoded_frame_gray(shared_frame),
+            resolution,
+            interpolation=cv2.INTER_LINEAR,
+        )
+
+    def _remove_converted(self, name: uuid.UUID) -> None:
+        """Remove color converted versions of a frame."""
+        self._conversions.pop(name, None)
 
     def remove(self, shared_frame: SharedFrame) -> None:
-        """Remove frame from shared memory."""
-        if shared_frame.reference_count > 0:
-            threading.Timer(1, self.remove, args=(shared_frame,)).start()
-            return
+        """Drop a reference to the frame, returning its slot when it was the last."""
+        with self._lock:
+            if shared_frame.reference_count > 1:
+                shared_frame.reference_count -= 1
+                return
+            shared_frame.reference_count = 0
 
-        self._remove(shared_frame.name)
-        for color_model in PIXEL_FORMATS[PIXEL_FORMAT_YUV420P]:
-            self._remove(f"{shared_frame.name}_{color_model}")
+            try:
+                slot = self._get_slot(shared_frame)
+            except KeyError:
+                return
+            if slot.released_at >= slot.acquired_at:
+                return
+            slot.released_at = time.monotonic()
+            self._released_slots.append(shared_frame.slot)  # type: ignore[arg-type]
 
     def remove_all(self) -> None:
         """Remove all frames still in shared memory."""
-        for frame_name in self._frames.copy():
-            self._remove(frame_name)
-            for color_model in PIXEL_FORMATS[PIXEL_FORMAT_YUV420P]:
-                self._remove(f"{frame_name}_{color_model}")
+        with self._lock:
+            for slot in self._slots:
+                slot.owner = None
+            self._released_slots = deque(range(len(self._slots)))
+            for name in list(self._conversions):
+                self._remove_converted(name)
+
+    def _close_slots(self) -> None:
+        """Close and unlink all shared memory slots."""
+        for slot in self._slots:
+            if slot.shm is None:
+                continue
+            try:
+                slot.shm.close()
+            except BufferError:
+                # Arrays still reference the slot, the mapping is released when they
+                # are garbage collected
+                pass
+            try:
+                slot.shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._slots = []
+        self._released_slots = deque()
+
+    def close(self) -> None:
+        """Release all shared memory used by the pool."""
+        self.remove_all()
+        with self._lock:
+            self._close_slots()
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import logging
+import uuid
 from abc import ABC, abstractmethod
 from collections.abc import Callable
 from dataclasses import dataclass
@@ -11,12 +12,10 @@ from typing import TYPE_CHECKING, Any
 import cv2
 import numpy as np
 import voluptuous as vol
-from sqlalchemy import insert, update
 
 from viseron.components.data_stream import COMPONENT as DATA_STREAM_COMPONENT
 from viseron.components.nvr.const import EVENT_SCAN_FRAMES, MOTION_DETECTOR
 from viseron.components.storage.const import COMPONENT as STORAGE_COMPONENT
-from viseron.components.storage.models import Motion, MotionContours
 from viseron.const import VISERON_SIGNAL_SHUTDOWN
 from viseron.domains.camera.const import DOMAIN as CAMERA_DOMAIN
 from viseron.domains.motion_detector.binary_sensor import MotionDetectionBinarySensor
@@ -53,6 +52,7 @@ from viseron.domains.motion_detector.const import (
     DESC_WIDTH,
     EVENT_MOTION_DETECTED,
 )
+from viseron.domains.motion_detector.contours import encode_contour
 from viseron.events import EventData
 from viseron.helpers import generate_mask, utcnow
 from viseron.helpers.schemas import (
@@ -141,7 +141,7 @@ class AbstractMotionDetector(ABC):
         self._logger = logging.getLogger(f"{self.__module__}.{camera_identifier}")
         self._motion_detected = False
         self._motion_contours: Contours | None = None
-        self._motion_id: int | None = None
+        self._motion_token: str | None = None
 
         vis.add_entity(component, MotionDetectionBinarySensor(vis, self, self._camera))
 
@@ -177,41 +177,27 @@ class AbstractMotionDetector(ABC):
         return self._motion_contours
 
     def _insert_motion(self) -> None:
-        """Insert motion event into database."""
-        with self._storage.get_session() as session:
-            stmt = (
-                insert(Motion)
-                .values(
-                    camera_identifier=self._camera.identifier,
-                    start_time=utcnow(),
-                    end_time=None,
-                )
-                .returning(Motion.id)
-            )
-            result = session.execute(stmt).scalars()
-            self._motion_id = result.one()
-            if self._motion_contours:
-                for contour in self._motion_contours.contours:
-                    stmt2 = insert(MotionContours).values(
-                        motion_id=self._motion_id,
-                        contour=contour,
-                    )
-                    session.execute(stmt2)
-
-            session.commit()
+        """Queue motion event to be inserted into database."""
+        self._motion_token = uuid.uuid4().hex
+        self._storage.motion_writer.insert(
+            {
+                "token": self._motion_token,
+                "camera_identifier": self._camera.identifier,
+                "start_time": utcnow(),
+                "contours": [
+                    encode_contour(rel_contour)
+                    for rel_contour in self._motion_contours.rel_contours
+                ]
+                if self._motion_contours
+                else [],
+            }
+        )
 
     def _update_motion(self) -> None:
-        """Update motion event to set end_time."""
-        with self._storage.get_session() as session:
-            stmt = (
-                update(Motion)
-                .values(
-                    end_time=utcnow(),
-                )
-                .where(Motion.id == self._motion_id)
-            )
-            session.execute(stmt)
-            session.commit()
+        """Queue motion event to be updated with end_time."""
+        self._storage.motion_writer.insert(
+            {"token": self._motion_token, "end_time": utcnow()}
+        )
 
     def _motion_detected_setter(
         self,
@@ -223,11 +209,11 @@ class AbstractMotionDetector(ABC):
         if self._motion_detected == motion_detected:
             return
 
-        if self._motion_id is None:
+        if self._motion_token is None:
             self._insert_motion()
         else:
             self._update_motion()
-            self._motion_id = None
+            self._motion_token = None
 
         self._motion_detected = motion_detected
         self._logger.debug("Motion detected" if motion_detected else "Motion stopped")
@@ -360,12 +346,18 @@ class AbstractMotionDetectorScanner(AbstractMotionDetector):
         )
 
     def _get_decoded_frame_rgb(self, shared_frame) -> np.ndarray:
-        """Return frame in rgb format."""
-        return self._camera.shared_frames.get_decoded_frame_rgb(shared_frame)
+        """Return a copy of the frame in rgb format."""
+        return self._camera.shared_frames.get_decoded_frame_rgb(shared_frame).copy()
 
     def _get_decoded_frame_gray(self, shared_frame) -> np.ndarray:
-        """Return frame in gray format."""
-        return self._camera.shared_frames.get_decoded_frame_gray(shared_frame)
+        """Return frame in gray format, downscaled to the motion detector resolution.
+
+        The luma plane of the frame is resized directly, which avoids copying and
+        converting the full resolution frame.
+        """
+        return self._camera.shared_frames.get_decoded_frame_gray_resized(
+            shared_frame, self._resolution
+        )
 
     def _motion_detection(self) -> None:
         """Perform motion detection and publish the results."""
@@ -375,7 +367,7 @@ class AbstractMotionDetectorScanner(AbstractMotionDetector):
             except Empty:
                 continue
 
-            decoded_frame = self._get_frame_function(shared_frame).copy()
+            decoded_frame = self._get_frame_function(shared_frame)
             preprocessed_frame = self.preprocess(decoded_frame)
             if self._mask:
                 preprocessed_frame = self._apply_mask(preprocessed_frame)
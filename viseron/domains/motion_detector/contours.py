@@ -8,6 +8,48 @@ import numpy as np
 
 from viseron.helpers import calculate_relative_contours
 
+# Encoded contours start with a version byte followed by int16 point pairs, which
+# makes their length 1 modulo 4. Contours stored before the encoding was added are
+# raw int32 point pairs whose length is always a multiple of 8.
+CONTOUR_ENCODING_VERSION = 1
+# Relative coordinates are stored as integers in the range 0-CONTOUR_SCALE
+CONTOUR_SCALE = 10000
+CONTOUR_SIMPLIFY_EPSILON = 0.002
+
+
+def encode_contour(
+    rel_contour: np.ndarray, epsilon: float = CONTOUR_SIMPLIFY_EPSILON
+) -> bytes:
+    """Encode a contour with relative coordinates to compact bytes.
+
+    The first point is stored as is and the following points as the difference to
+    the previous point, quantized to int16. If epsilon is set the contour is first
+    simplified, epsilon being the max distance from the original contour relative
+    to the frame size.
+    """
+    points = np.rint(np.asarray(rel_contour).reshape(-1, 2) * CONTOUR_SCALE).astype(
+        np.int32
+    )
+    if epsilon and len(points) > 2:
+        points = cv2.approxPolyDP(
+            points.reshape(-1, 1, 2), epsilon * CONTOUR_SCALE, True
+        ).reshape(-1, 2)
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), dtype=np.int32))
+    return bytes([CONTOUR_ENCODING_VERSION]) + deltas.astype("<i2").tobytes()
+
+
+def decode_contour(data: bytes) -> tuple[np.ndarray, bool]:
+    """Decode a contour stored in the database.
+
+    Returns the points with shape (N, 2) and whether they are relative to the
+    frame size. Contours stored before the compact encoding are absolute
+    coordinates in the motion detector resolution.
+    """
+    if len(data) % 4 == 1 and data[0] == CONTOUR_ENCODING_VERSION:
+        deltas = np.frombuffer(data, dtype="<i2", offset=1).reshape(-1, 2)
+        return np.cumsum(deltas, axis=0, dtype=np.int32) / CONTOUR_SCALE, True
+    return np.frombuffer(data, dtype=np.int32).reshape(-1, 2), False
+
 
 class Contours:
     """Represents motion contours."""
@@ -1,26 +1,26 @@
 """Object detector domain."""
 from __future__ import annotations
 
+import datetime
 import logging
 import time
 from abc import ABC, abstractmethod
 from collections import deque
+from functools import partial
 from queue import Empty, Queue
 from typing import TYPE_CHECKING, Any
 
 import voluptuous as vol
-from sqlalchemy import insert
 
 from viseron.components.data_stream import COMPONENT as DATA_STREAM_COMPONENT
 from viseron.components.nvr.const import EVENT_SCAN_FRAMES, OBJECT_DETECTOR
 from viseron.components.storage.const import COMPONENT as STORAGE_COMPONENT
-from viseron.components.storage.models import Objects
 from viseron.const import VISERON_SIGNAL_SHUTDOWN
 from viseron.domains.camera.const import DOMAIN as CAMERA_DOMAIN
 from viseron.domains.camera.shared_frames import SharedFrame
 from viseron.domains.motion_detector.const import DOMAIN as MOTION_DETECTOR_DOMAIN
 from viseron.exceptions import DomainNotRegisteredError
-from viseron.helpers import generate_mask
+from viseron.helpers import generate_mask, utcnow
 from viseron.helpers.filter import Filter
 from viseron.helpers.schemas import (
     COORDINATES_SCHEMA,
@@ -101,6 +101,8 @@ from .sensor import ObjectDetectorFPSSensor
 from .zone import Zone
 
 if TYPE_CHECKING:
+    import numpy as np
+
     from viseron import Event, Viseron
     from viseron.components.nvr.nvr import EventScanFrames
     from viseron.components.storage import Storage
@@ -375,25 +377,29 @@ class AbstractObjectDetector(ABC):
         return self._objects_in_fov
 
     def _insert_object(
-        self, obj: DetectedObject, snapshot_path: str | None, zone=None
+        self,
+        obj: DetectedObject,
+        snapshot_path: str | None,
+        zone=None,
+        created_at: datetime.datetime | None = None,
     ) -> None:
-        """Insert object into database."""
-        with self._storage.get_session() as session:
-            stmt = insert(Objects).values(
-                camera_identifier=self._camera.identifier,
-                label=obj.label,
-                confidence=obj.confidence,
-                width=obj.rel_width,
-                height=obj.rel_height,
-                x1=obj.rel_x1,
-                y1=obj.rel_y1,
-                x2=obj.rel_x2,
-                y2=obj.rel_y2,
-                snapshot_path=snapshot_path,
-                zone=zone,
-            )
-            session.execute(stmt)
-            session.commit()
+        """Queue object to be written to the database."""
+        self._storage.objects_writer.insert(
+            {
+                "camera_identifier": self._camera.identifier,
+                "label": obj.label,
+                "confidence": obj.confidence,
+                "width": obj.rel_width,
+                "height": obj.rel_height,
+                "x1": obj.rel_x1,
+                "y1": obj.rel_y1,
+                "x2": obj.rel_x2,
+                "y2": obj.rel_y2,
+                "snapshot_path": snapshot_path,
+                "zone": zone,
+                "created_at": created_at or utcnow(),
+            }
+        )
 
     def _objects_in_fov_setter(
         self, shared_frame: SharedFrame | None, objects: list[DetectedObject]
@@ -404,9 +410,9 @@ class AbstractObjectDetector(ABC):
 
         for obj in objects:
             if obj.store:
-                snapshot_path = None
                 if shared_frame:
-                    snapshot_path = self._camera.save_snapshot(
+                    # The row is inserted once the snapshot has been saved
+                    self._camera.save_snapshot_in_background(
                         shared_frame,
                         DOMAIN,
                         (
@@ -415,8 +421,10 @@ class AbstractObjectDetector(ABC):
                             obj.rel_x2,
                             obj.rel_y2,
                         ),
+                        callback=partial(self._insert_object, obj, created_at=utcnow()),
                     )
-                self._insert_object(obj, snapshot_path)
+                else:
+                    self._insert_object(obj, None)
 
         self._objects_in_fov = objects
         self._vis.dispatch_event(
@@ -435,6 +443,35 @@ class AbstractObjectDetector(ABC):
         for zone in self.zones:
             zone.filter_zone(shared_frame, objects)
 
+    @property
+    def preprocess_resolution(self) -> tuple[int, int] | None:
+        """Return (width, height) of the frame passed to preprocess.
+
+        Detectors that feed a fixed size image to their model should return that
+        size. The frame is then resized directly from the YUV planes, which avoids
+        converting the full resolution frame to rgb. None passes the full
+        resolution frame.
+        """
+        return None
+
+    @property
+    def preprocess_letterbox(self) -> bool:
+        """Return if the frame passed to preprocess should be letterboxed.
+
+        Only used when preprocess_resolution is set.
+        """
+        return False
+
+    def _get_frame_to_preprocess(self, shared_frame: SharedFrame) -> np.ndarray:
+        """Return the rgb frame that is passed to preprocess."""
+        if self.preprocess_resolution:
+            return self._camera.shared_frames.get_decoded_frame_rgb_resized(
+                shared_frame,
+                self.preprocess_resolution,
+                letterbox=self.preprocess_letterbox,
+            )
+        return self._camera.shared_frames.get_decoded_frame_rgb(shared_frame)
+
     @abstractmethod
     def preprocess(self, frame):
         """Perform preprocessing of frame before running detection."""
@@ -454,9 +491,7 @@ class AbstractObjectDetector(ABC):
                 self._logger.debug(f"Frame is {frame_age} seconds old. Discarding")
                 continue
 
-            decoded_frame = self._camera.shared_frames.get_decoded_frame_rgb(
-                shared_frame
-            )
+            decoded_frame = self._get_frame_to_preprocess(shared_frame)
             preprocessed_frame = self.preprocess(decoded_frame)
             self._preproc_fps.append(1 / (time.time() - frame_time))
 
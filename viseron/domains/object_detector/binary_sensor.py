@@ -28,6 +28,8 @@ class ObjectDetectedBinarySensor(CameraBinarySensor):
     ) -> None:
         super().__init__(vis, camera)
         self._objects: list[DetectedObject] = []
+        # Object coordinates change on every scanned frame
+        self.min_state_interval = 1
 
     def setup(self) -> None:
         """Set up event listener."""
@@ -29,6 +29,7 @@ class ObjectDetectorFPSSensor(CameraSensor):
         self.name = f"{camera.name} Object Detector FPS"
         self.icon = "mdi:speedometer"
         self.entity_category = "diagnostic"
+        self.volatile = True
 
     def setup(self) -> None:
         """Set up state updates."""
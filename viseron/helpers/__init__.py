@@ -10,6 +10,7 @@ import os
 import socket
 import tracemalloc
 import urllib.parse
+from collections.abc import Callable
 from queue import Full, Queue
 from typing import TYPE_CHECKING, Any
 
@@ -296,15 +297,24 @@ def pop_if_full(
     logger: logging.Logger = LOGGER,
     name: str = "unknown",
     warn: bool = False,
-) -> None:
-    """If queue is full, pop oldest item and put the new item."""
+    on_drop: Callable[[Any], None] | None = None,
+) -> bool:
+    """If queue is full, pop oldest item and put the new item.
+
+    on_drop is called with the popped item.
+    Returns True if an item was dropped to make room.
+    """
     try:
         queue.put_nowait(item)
     except (Full, tq.QueueFull):
         if warn:
             logger.warning(f"{name} queue is full. Removing oldest entry")
-        queue.get()
+        dropped = queue.get()
+        if on_drop:
+            on_drop(dropped)
         queue.put_nowait(item)
+        return True
+    return False
 
 
 def slugify(text: str) -> str:
@@ -26,6 +26,16 @@ class Entity(ABC):
     object_id: str | None = None
     _state: Any = "unknown"
 
+    # Volatile entities change often and their state changes are never stored in
+    # the database
+    volatile: bool = False
+    # Minimum seconds between state changes where only the attributes differ.
+    # Attribute updates arriving faster are coalesced and the latest one is sent
+    # when the interval has passed. Changes to the state itself are always sent
+    min_state_interval: float = 0
+    # Send state changes even if neither state nor attributes changed
+    force_update: bool = False
+
     # Used by Home Assistant, safe to override
     availability: list[dict[str, str]] | None = None
     availability_mode: str = "all"
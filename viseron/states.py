@@ -12,6 +12,8 @@ from viseron.events import EventData
 from viseron.helpers import slugify
 
 if TYPE_CHECKING:
+    from apscheduler.job import Job
+
     from viseron import Viseron
     from viseron.components import Component
     from viseron.helpers.entity import Entity
@@ -84,24 +86,49 @@ class States:
         self._registry_lock = threading.Lock()
 
         self._current_states: dict[str, State] = {}
+        self._states_lock = threading.Lock()
+        self._rate_limited: dict[str, Entity] = {}
+        self._rate_limited_job: Job | None = None
 
     def set_state(self, entity: Entity) -> None:
-        """Set the state in the states registry."""
-        LOGGER.debug(
-            "Setting state of %s to state: %s, attributes %s",
-            entity.entity_id,
-            entity.state,
-            entity.attributes,
-        )
+        """Set the state in the states registry.
 
-        previous_state = self._current_states.get(entity.entity_id, None)
+        Updates that change neither state nor attributes are skipped, and attribute
+        only updates are coalesced according to entity.min_state_interval.
+        """
         current_state = State(
             entity.entity_id,
             entity.state,
             entity.attributes,
         )
 
-        self._current_states[entity.entity_id] = current_state
+        with self._states_lock:
+            previous_state = self._current_states.get(entity.entity_id, None)
+            if (
+                previous_state
+                and not entity.force_update
+                and previous_state.state == current_state.state
+            ):
+                if previous_state.attributes == current_state.attributes:
+                    self._rate_limited.pop(entity.entity_id, None)
+                    return
+
+                if (
+                    current_state.timestamp - previous_state.timestamp
+                    < entity.min_state_interval
+                ):
+                    self._rate_limit(entity)
+                    return
+
+            self._rate_limited.pop(entity.entity_id, None)
+            self._current_states[entity.entity_id] = current_state
+
+        LOGGER.debug(
+            "Setting state of %s to state: %s, attributes %s",
+            entity.entity_id,
+            current_state.state,
+            current_state.attributes,
+        )
         self._vis.dispatch_event(
             EVENT_STATE_CHANGED,
             EventStateChangedData(
@@ -109,8 +136,38 @@ class States:
                 previous_state=previous_state,
                 current_state=current_state,
             ),
+            store=not entity.volatile,
         )
 
+    def _rate_limit(self, entity: Entity) -> None:
+        """Defer the state change of entity until its interval has passed."""
+        self._rate_limited[entity.entity_id] = entity
+        if self._rate_limited_job is None:
+            self._rate_limited_job = self._vis.background_scheduler.add_job(
+                self._set_rate_limited_states, "interval", seconds=1
+            )
+
+    def _set_rate_limited_states(self) -> None:
+        """Set the latest state of rate limited entities whose interval passed.
+
+        The job is removed once no entities are waiting.
+        """
+        now = time.time()
+        with self._states_lock:
+            entities = [
+                entity
+                for entity_id, entity in self._rate_limited.items()
+                if now - self._current_states[entity_id].timestamp
+                >= entity.min_state_interval
+            ]
+        for entity in entities:
+            self.set_state(entity)
+
+        with self._states_lock:
+            if not self._rate_limited and self._rate_limited_job:
+                self._rate_limited_job.remove()
+                self._rate_limited_job = None
+
     def add_entity(self, component: Component, entity: Entity):
         """Add entity to states registry."""
         with self._registry_lock: